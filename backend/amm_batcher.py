@@ -0,0 +1,233 @@
+# amm_batcher.py
+"""
+AMM micro-batcher - one pool transaction per window instead of one per product
+
+Registrations, sales, expiries and recalls each move a product's deposit
+in or out of the XRP/CUSD pool, and every product's LP tokens sit in the
+same CYCLR wallet. So, within a short window (about one ledger close),
+deposit and withdraw intents can be netted against each other and only
+the difference has to touch the pool:
+
+- D = CUSD to deposit, W = LP tokens to burn
+- at the pool's marginal rate a single-sided CUSD deposit mints
+  g * L / (2P) LP per CUSD, and a single-sided withdrawal pays
+  g * 2P / L CUSD per LP (L = LP supply, P = CUSD in the pool,
+  g = 1 - trading fee / 2, the fee a single-sided tx pays)
+- the matched part is priced at those rates, so each side gets what
+  its own unbatched tx would have (up to the curve's slippage), and
+  the fee it would have paid stays in the CYCLR wallet
+- if D covers W's payout, deposit the remainder. Withdrawers are paid
+  out of the incoming CUSD, and depositors share the minted LP plus
+  their share of the W tokens that were not burned.
+- otherwise burn the remaining LP. Depositors are credited LP out of
+  W, and withdrawers share the CUSD received plus D's worth.
+
+A window with only one side needs no rate: its deposits (or LP
+burns) are summed into one transaction. An empty pool (no CUSD or no
+LP supply) has no marginal rate, so a mixed window is then sent as one
+transaction per intent instead.
+
+Each caller gets the usual deposit_to_amm / withdraw_from_amm result
+dict with its own share. If the net transaction fails, every intent in
+the batch fails (nothing moved on the ledger).
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+# Below this the two sides cancel out and no transaction is sent
+DUST = 1e-9
+
+
+@dataclass
+class _Intent:
+    product_id: str
+    amount: float                           # CUSD for deposits, LP tokens for withdrawals
+    future: asyncio.Future
+    deposit_type: str = ""
+
+
+@dataclass
+class _Batch:
+    deposits: List[_Intent] = field(default_factory=list)
+    withdrawals: List[_Intent] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.deposits) + len(self.withdrawals)
+
+
+class AMMBatcher:
+    """Collects deposit/withdraw intents and settles them as one net AMM tx"""
+
+    def __init__(
+        self,
+        window: float,
+        max_batch: int,
+        deposit_fn: Callable[[float], Awaitable[Dict[str, Any]]],
+        withdraw_fn: Callable[[float], Awaitable[Dict[str, Any]]],
+        pool_state_fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ):
+        self.window = window
+        self.max_batch = max_batch
+        self.deposit_fn = deposit_fn
+        self.withdraw_fn = withdraw_fn
+        self.pool_state_fn = pool_state_fn
+
+        self._batch = _Batch()
+        self._timer: Optional[asyncio.Task] = None
+        self._settling: set = set()
+
+    async def deposit(self, cusd_amount: float, product_id: str, deposit_type: str) -> Dict[str, Any]:
+        return await self._enqueue(self._batch.deposits, cusd_amount, product_id, deposit_type)
+
+    async def withdraw(self, lp_tokens: float, product_id: str) -> Dict[str, Any]:
+        return await self._enqueue(self._batch.withdrawals, lp_tokens, product_id)
+
+    async def _enqueue(self, queue: List[_Intent], amount: float, product_id: str, deposit_type: str = ""):
+        future = asyncio.get_running_loop().create_future()
+        queue.append(_Intent(product_id, amount, future, deposit_type))
+        if len(self._batch) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self._timer = None
+        self._flush_now()
+
+    def _flush_now(self):
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        batch, self._batch = self._batch, _Batch()
+        if len(batch):
+            task = asyncio.create_task(self._settle(batch))
+            self._settling.add(task)
+            task.add_done_callback(self._settling.discard)
+
+    async def flush(self):
+        """Settle whatever is pending now (shutdown)"""
+        self._flush_now()
+        if self._settling:
+            await asyncio.gather(*self._settling, return_exceptions=True)
+
+    # ----------------------------------------
+    # Settlement
+    # ----------------------------------------
+
+    async def _settle(self, batch: _Batch):
+        try:
+            rates = None
+            if batch.deposits and batch.withdrawals:
+                rates = self._rates(await self.pool_state_fn())
+                if rates is None:
+                    await self._settle_each(batch)
+                    return
+            self._resolve(batch, await self._net(batch, rates))
+        except Exception as e:
+            self._fail(batch, str(e))
+
+    @staticmethod
+    def _rates(amm: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """(LP minted per CUSD deposited, CUSD paid per LP burned) at the margin, None for an empty pool"""
+        try:
+            pool_cusd = float(amm["amount2"]["value"])
+            lp_supply = float(amm["lp_token"]["value"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if pool_cusd <= 0 or lp_supply <= 0:
+            return None
+        after_fee = 1 - amm.get("trading_fee", 0) / 100_000 / 2
+        return after_fee * lp_supply / (2 * pool_cusd), after_fee * 2 * pool_cusd / lp_supply
+
+    async def _net(self, batch: _Batch, rates: Optional[Tuple[float, float]]) -> Dict[str, Any]:
+        """Send the net transaction (the plain sum if only one side is present); returns each side's totals"""
+        cusd_in = sum(i.amount for i in batch.deposits)
+        lp_out = sum(i.amount for i in batch.withdrawals)
+        lp_per_cusd, cusd_per_lp = rates or (0.0, 0.0)
+
+        tx_hash = None
+        if batch.deposits and cusd_in >= lp_out * cusd_per_lp:
+            # Net deposit: withdrawers are paid from the incoming CUSD
+            cusd_for_withdrawers = lp_out * cusd_per_lp
+            net = cusd_in - cusd_for_withdrawers
+            minted = 0.0
+            if net > DUST:
+                result = await self.deposit_fn(net)
+                if not result.get("success"):
+                    raise RuntimeError(result.get("error", "AMM deposit failed"))
+                minted, tx_hash = result.get("lp_tokens_received", 0.0), result.get("tx_hash")
+            lp_for_depositors = minted + cusd_for_withdrawers * lp_per_cusd
+        else:
+            # Net withdrawal (or withdrawals only): depositors are credited LP out of the withdrawn tokens
+            lp_for_depositors = cusd_in * lp_per_cusd
+            result = await self.withdraw_fn(lp_out - lp_for_depositors)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error", "AMM withdrawal failed"))
+            tx_hash = result.get("tx_hash")
+            cusd_for_withdrawers = result.get("cusd_received", 0.0) + lp_for_depositors * cusd_per_lp
+
+        return {
+            "tx_hash": tx_hash,
+            "cusd_in": cusd_in,
+            "lp_out": lp_out,
+            "lp_for_depositors": lp_for_depositors,
+            "cusd_for_withdrawers": cusd_for_withdrawers,
+        }
+
+    def _resolve(self, batch: _Batch, totals: Dict[str, Any]):
+        size = len(batch)
+        for intent in batch.deposits:
+            share = intent.amount / totals["cusd_in"] if totals["cusd_in"] else 0.0
+            lp_tokens = totals["lp_for_depositors"] * share
+            self._set(intent, {
+                "success": True,
+                "tx_hash": totals["tx_hash"],
+                "cusd_deposited": intent.amount,
+                # Backward compatibility
+                "rusd_deposited": intent.amount,
+                "lp_tokens_received": lp_tokens,
+                "deposit_type": intent.deposit_type,
+                "product_id": intent.product_id,
+                "batch_size": size
+            })
+        for intent in batch.withdrawals:
+            share = intent.amount / totals["lp_out"] if totals["lp_out"] else 0.0
+            cusd = totals["cusd_for_withdrawers"] * share
+            self._set(intent, {
+                "success": True,
+                "tx_hash": totals["tx_hash"],
+                "lp_tokens_burned": intent.amount,
+                "cusd_received": cusd,
+                # Backward compatibility
+                "rusd_received": cusd,
+                "product_id": intent.product_id,
+                "batch_size": size
+            })
+
+    async def _settle_each(self, batch: _Batch):
+        """One transaction per intent (no marginal rate to net at)"""
+        async def deposit(intent: _Intent):
+            result = await self.deposit_fn(intent.amount)
+            self._set(intent, {**result, "deposit_type": intent.deposit_type, "product_id": intent.product_id})
+
+        async def withdraw(intent: _Intent):
+            result = await self.withdraw_fn(intent.amount)
+            self._set(intent, {**result, "product_id": intent.product_id})
+
+        await asyncio.gather(
+            *(deposit(i) for i in batch.deposits),
+            *(withdraw(i) for i in batch.withdrawals)
+        )
+
+    def _fail(self, batch: _Batch, error: str):
+        for intent in batch.deposits + batch.withdrawals:
+            self._set(intent, {"success": False, "error": error, "product_id": intent.product_id})
+
+    @staticmethod
+    def _set(intent: _Intent, result: Dict[str, Any]):
+        if not intent.future.done():            # caller may have gone away
+            intent.future.set_result(result)
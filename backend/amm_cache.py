@@ -0,0 +1,82 @@
+# amm_cache.py
+"""
+Pool state cache - one AMMInfo per validated ledger
+
+The XRP/CUSD pool only changes when a ledger validates, but health checks,
+/amm/info, withdrawals and claims each asked rippled for AMMInfo (often
+several times per request). PoolStateCache keeps the last validated pool
+state and serves it until:
+
+- a newer validated ledger is observed (one of our txs validated in it), or
+- LEDGER_CLOSE_SECONDS have passed (the network has probably closed one)
+
+Concurrent misses share a single in-flight AMMInfo request.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.currencies import Currency
+from xrpl.models.requests import GenericRequest
+
+
+class PoolStateCache:
+    """Validated AMMInfo for one pool, keyed by ledger index"""
+
+    def __init__(self, client: Client, asset: Currency, asset2: Currency, max_age: float):
+        self.client = client
+        self.asset = asset
+        self.asset2 = asset2
+        self.max_age = max_age
+
+        self._amm: Optional[Dict[str, Any]] = None
+        self._ledger_index = 0
+        self._fetched_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def ledger_index(self) -> int:
+        return self._ledger_index
+
+    def _fresh(self) -> bool:
+        return self._amm is not None and time.monotonic() - self._fetched_at < self.max_age
+
+    async def get(self) -> Dict[str, Any]:
+        """The pool's `amm` object as of the latest validated ledger"""
+        if self._fresh():
+            return self._amm
+
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+        inflight = self._inflight
+        try:
+            return await asyncio.shield(inflight)
+        finally:
+            if self._inflight is inflight and inflight.done():
+                self._inflight = None
+
+    async def _fetch(self) -> Dict[str, Any]:
+        # xrpl-py's AMMInfo model has no ledger_index field
+        resp = await self.client.request(GenericRequest(
+            method="amm_info",
+            asset=self.asset.to_dict(),
+            asset2=self.asset2.to_dict(),
+            ledger_index="validated"
+        ))
+        if not resp.is_successful():
+            raise RuntimeError(resp.result.get("error_message") or resp.result.get("error", "AMMInfo failed"))
+
+        self._amm = resp.result["amm"]
+        self._ledger_index = int(resp.result.get("ledger_index", 0))
+        self._fetched_at = time.monotonic()
+        return self._amm
+
+    def observe_ledger(self, ledger_index: int):
+        """A tx validated in `ledger_index`; drop state from older ledgers"""
+        if ledger_index > self._ledger_index:
+            self.invalidate()
+
+    def invalidate(self):
+        self._amm = None
+        self._fetched_at = 0.0
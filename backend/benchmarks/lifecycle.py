@@ -0,0 +1,334 @@
+# lifecycle.py
+"""
+Lifecycle throughput benchmark - drives the API against the fake rippled
+
+Runs the product and purchase flows in-process (httpx over ASGI, with
+the app's lifespan) at a fixed concurrency and reports, per scenario:
+
+- requests/s over the HTTP calls, and p50 / p95 / p99 of their latency
+- XRPL RPC calls and XRP fees the backend spent per HTTP request
+  (the driver's own consumer-side transactions are not counted)
+
+Scenarios:
+    register-sell-expire     register → sell → expire        (CASE B)
+    register-expire          register → expire               (CASE D)
+    register-recall          register → recall
+    purchase-burn-recycle    purchase → offer/accept/burn → recycle
+
+purchase-burn-recycle flows run one at a time. /recycle withdraws the
+RecycleFi wallet's whole LP balance (TF_WITHDRAW_ALL), so overlapping
+flows take each other's LP and the later recycles answer 400. That is a
+known bug in run_recycle, and the benchmark must not measure around it.
+
+A run with failed flows exits with status 1 and is never saved as a
+baseline: its latencies would be mostly fast error responses.
+
+The ledger is fake_rippled.FakeLedger with a short close interval, every
+wallet is funded on first use, and the database and QR directory are
+temporary. Results can be saved as a baseline and later runs compared
+against it (exit status 1 on a regression).
+
+Usage (from backend/):
+    python benchmarks/lifecycle.py                        # compare with baseline.json
+    python benchmarks/lifecycle.py -n 200 -c 32 --close 0.5
+    python benchmarks/lifecycle.py --save                 # write baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+SCENARIOS = ("register-sell-expire", "register-expire", "register-recall", "purchase-burn-recycle")
+
+# Relative change that counts as a regression when comparing to the baseline
+TOLERANCE = {"rps": 0.25, "p95_ms": 0.50, "rpc_per_request": 0.10, "fee_xrp_per_request": 0.10}
+
+
+def configure_environment(args: argparse.Namespace):
+    """Point settings at the fake ledger and throwaway storage (before any backend import)"""
+    from xrpl.wallet import Wallet
+
+    workdir = tempfile.mkdtemp(prefix="cyclr-bench-")
+    os.environ.update({
+        "XRPL_RPC_URL": f"fake://bench?close={args.close}&latency_ms={args.latency_ms}&jitter_ms={args.jitter_ms}",
+        "LEDGER_CLOSE_SECONDS": str(args.close),
+        "TX_POLL_INTERVAL": str(args.close / 4),
+        "DATABASE_PATH": os.path.join(workdir, "cyclr.db"),
+        "QR_DIR": os.path.join(workdir, "qrcodes"),
+        "EXPIRY_SCHEDULER_ENABLED": "false",
+        "LOG_LEVEL": "DEBUG" if args.verbose else "WARNING",
+    })
+    for name in ("RECYCLEFI_SEED", "CYCLR_WALLET_SECRET"):
+        os.environ.setdefault(name, Wallet.create().seed)
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Driver:
+    """Runs one scenario N times with C workers and records every HTTP call"""
+
+    def __init__(self, http, ledger, wallets):
+        from fake_rippled import FakeRippledClient
+
+        class CountingClient(FakeRippledClient):
+            calls = 0
+
+            async def _request_impl(self, request, **kwargs):
+                self.calls += 1
+                return await super()._request_impl(request, **kwargs)
+
+        self.http = http
+        self.client = CountingClient("fake://driver", ledger)   # for the consumer-side txs
+        self.wallets = wallets
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.driver_fees = 0
+        self._recycling = asyncio.Lock()    # see the module docstring
+
+    async def call(self, step: str, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        start = time.perf_counter()
+        resp = await self.http.request(method, url, **kwargs)
+        self.latencies[step].append(time.perf_counter() - start)
+        body = resp.json()
+        if resp.status_code != 200 or (isinstance(body, dict) and body.get("success") is False):
+            self.errors[step] += 1
+            raise RuntimeError(f"{step}: {resp.status_code} {str(body)[:200]}")
+        return body
+
+    async def submit(self, tx, wallet) -> Dict[str, Any]:
+        """Consumer-side transaction; its RPCs and fee are subtracted from the backend's"""
+        from tx_sequencer import submit_tx
+
+        response = await submit_tx(tx, self.client, wallet)
+        self.driver_fees += int(response.result.get("tx_json", response.result).get("Fee", 0))
+        return response.result
+
+    # ----------------------------------------
+    # Scenarios
+    # ----------------------------------------
+
+    async def register(self, manufacturer: str) -> str:
+        body = await self.call("register", "POST", "/api/v1/products/register", json={
+            "name": "Bench Kettle", "price": 100.0, "manufacturer_wallet": manufacturer
+        })
+        return body["id"]
+
+    async def register_sell_expire(self, i: int):
+        product_id = await self.register(self.wallets["company"])
+        await self.call("sell", "POST", f"/api/v1/products/{product_id}/sell", json={
+            "product_id": product_id, "customer_wallet": self.wallets["consumers"][i].classic_address
+        })
+        await self.call("expire", "POST", f"/api/v1/products/{product_id}/expire")
+
+    async def register_expire(self, i: int):
+        product_id = await self.register(self.wallets["company"])
+        await self.call("expire", "POST", f"/api/v1/products/{product_id}/expire")
+
+    async def register_recall(self, i: int):
+        product_id = await self.register(self.wallets["company"])
+        await self.call("recall", "POST", f"/api/v1/products/{product_id}/recall", json={
+            "product_id": product_id, "recycle": False
+        })
+
+    async def purchase_burn_recycle(self, i: int):
+        async with self._recycling:
+            await self._purchase_burn_recycle(self.wallets["consumers"][i], self.wallets["recyclefi"])
+
+    async def _purchase_burn_recycle(self, consumer, recyclefi):
+        from xrpl.models import NFTokenAcceptOffer, NFTokenBurn, NFTokenCreateOffer, NFTokenCreateOfferFlag
+
+        body = await self.call("purchase", "POST", "/api/v1/purchase", data={
+            "price_xrp": "10", "company_wallet": self.wallets["company"],
+            "consumer_wallet": consumer.classic_address
+        })
+        nft_id = body["nft_id"]
+
+        # Hand the NFT to the consumer, who burns it to claim
+        offer = await self.submit(NFTokenCreateOffer(
+            account=recyclefi.classic_address, nftoken_id=nft_id, amount="0",
+            destination=consumer.classic_address, flags=NFTokenCreateOfferFlag.TF_SELL_NFTOKEN
+        ), recyclefi)
+        offer_index = next(
+            node["CreatedNode"]["LedgerIndex"] for node in offer["meta"]["AffectedNodes"]
+            if node.get("CreatedNode", {}).get("LedgerEntryType") == "NFTokenOffer"
+        )
+        await self.submit(NFTokenAcceptOffer(account=consumer.classic_address, nftoken_sell_offer=offer_index), consumer)
+        burn = await self.submit(NFTokenBurn(account=consumer.classic_address, nftoken_id=nft_id), consumer)
+
+        await self.call("recycle", "POST", "/api/v1/recycle", json={
+            "nft_id": nft_id, "user_wallet": consumer.classic_address, "burn_tx_hash": burn["hash"]
+        })
+
+    async def run(self, scenario: str, iterations: int, concurrency: int) -> float:
+        flow = getattr(self, scenario.replace("-", "_"))
+        queue = iter(range(iterations))
+
+        async def worker():
+            for i in queue:
+                try:
+                    await flow(i)
+                except Exception as e:
+                    self.errors["flow"] += 1
+                    if self.errors["flow"] == 1:
+                        print(f"   first error in {scenario}: {e}", file=sys.stderr)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+async def run_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    from xrpl.wallet import Wallet
+
+    import main
+    from config import settings
+    from xrpl_client import get_client
+
+    client = get_client()
+    ledger = client.ledger
+    wallets = {
+        "recyclefi": Wallet.from_seed(settings.RECYCLEFI_SEED),
+        "company": Wallet.create().classic_address,
+        "consumers": [Wallet.create() for _ in range(args.iterations)],
+    }
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            for scenario in args.scenarios:
+                driver = Driver(http, ledger, wallets)
+                rpc_before = sum(v for k, v in ledger.stats.items() if k.startswith("rpc:"))
+                fees_before = ledger.stats["fee_drops"]
+
+                elapsed = await driver.run(scenario, args.iterations, args.concurrency)
+
+                latencies = [s for samples in driver.latencies.values() for s in samples]
+                requests = len(latencies)
+                rpcs = sum(v for k, v in ledger.stats.items() if k.startswith("rpc:")) - rpc_before - driver.client.calls
+                fees = ledger.stats["fee_drops"] - fees_before - driver.driver_fees
+                results[scenario] = {
+                    "iterations": args.iterations,
+                    "requests": requests,
+                    "errors": sum(driver.errors.values()) - driver.errors["flow"],
+                    "failed_flows": driver.errors["flow"],
+                    "seconds": round(elapsed, 3),
+                    "rps": round(requests / elapsed, 2) if elapsed else 0.0,
+                    "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+                    "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+                    "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+                    "rpc_per_request": round(rpcs / requests, 2) if requests else 0.0,
+                    "fee_xrp_per_request": round(fees / requests / 1_000_000, 8) if requests else 0.0,
+                    "steps_p50_ms": {
+                        step: round(statistics.median(samples) * 1000, 1)
+                        for step, samples in driver.latencies.items()
+                    },
+                }
+    await client.close()
+    return results
+
+
+def report(results: Dict[str, Any]):
+    header = f"{'scenario':<24}{'req':>6}{'fail':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'rpc/req':>9}{'XRP fee/req':>13}"
+    print(header)
+    print("-" * len(header))
+    for scenario, r in results.items():
+        print(
+            f"{scenario:<24}{r['requests']:>6}{r['failed_flows']:>6}{r['rps']:>9.1f}"
+            f"{r['p50_ms']:>8.1f}ms{r['p95_ms']:>7.1f}ms{r['p99_ms']:>7.1f}ms"
+            f"{r['rpc_per_request']:>9.2f}{r['fee_xrp_per_request']:>13.6f}"
+        )
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Regressions against the baseline, as readable lines"""
+    regressions = []
+    for scenario, r in results.items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base:
+            continue
+        for metric, tolerance in TOLERANCE.items():
+            old, new = base[metric], r[metric]
+            worse = new < old * (1 - tolerance) if metric == "rps" else new > old * (1 + tolerance)
+            if old and worse:
+                regressions.append(f"{scenario}: {metric} {new} vs baseline {old} (±{tolerance:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CYCLR lifecycle throughput benchmark (fake ledger)")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="flows per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="flows in flight")
+    parser.add_argument("-s", "--scenario", dest="scenarios", action="append", choices=SCENARIOS,
+                        help="scenario to run (repeatable, default: all)")
+    parser.add_argument("--close", type=float, default=0.2, help="seconds between ledger closes")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every RPC")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--save", action="store_true", help=f"write the results to {BASELINE.name}")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    parser.add_argument("-v", "--verbose", action="store_true", help="backend logs at DEBUG (default: WARNING)")
+    args = parser.parse_args()
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    configure_environment(args)
+    results = asyncio.run(run_benchmarks(args))
+    report(results)
+
+    document = {
+        "config": {
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "close": args.close,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+        },
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(document, indent=2) + "\n")
+
+    failed = {scenario: r["failed_flows"] for scenario, r in results.items() if r["failed_flows"]}
+    if failed:
+        print("\nFailed flows (results are not comparable, nothing saved):")
+        for scenario, count in failed.items():
+            print(f"  {scenario}: {count} of {args.iterations}")
+        sys.exit(1)
+
+    if args.save:
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != document["config"]:
+            print(f"\nBaseline was recorded with {baseline.get('config')}; comparing anyway")
+        regressions = compare(results, baseline)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
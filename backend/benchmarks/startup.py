@@ -0,0 +1,196 @@
+# startup.py
+"""
+Startup benchmark - import time, lifespan startup and import side effects
+
+Every run is a fresh interpreter (what a worker spawn or a cold start
+pays), pointed at the fake rippled and a temporary database. Reports
+the medians of:
+
+- import_ms    `import main`
+- startup_ms   the app's lifespan up to serving (database, wallets,
+               XRPL client, catalog load, workers)
+- process_ms   interpreter start to exit, as seen by the parent
+
+plus the heaviest top-level imports of `import main` (from one extra
+run under `python -X importtime`) and anything that was opened or
+derived at import: importing main must not touch the database, derive
+a wallet, create the XRPL client or start the log writer thread.
+
+Usage (from backend/):
+    python benchmarks/startup.py                 # compare with startup_baseline.json
+    python benchmarks/startup.py -n 10 --top 20
+    python benchmarks/startup.py --save          # write startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE = Path(__file__).resolve().parent / "startup_baseline.json"
+
+# Relative change that counts as a regression when comparing to the baseline
+TOLERANCE = {"import_ms": 0.30, "startup_ms": 0.50}
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = """
+import asyncio, json, os, time
+started = time.perf_counter()
+import main
+import_s = time.perf_counter() - started
+
+import logging_config, xrpl_client, xrpl_helpers
+side_effects = [name for name, done in (
+    ("database", os.path.exists(os.environ["DATABASE_PATH"])),
+    ("xrpl_client", xrpl_client._client is not None),
+    ("recyclefi_wallet", xrpl_helpers._recyclefi is not None),
+    ("cyclr_wallet", "cyclr_wallet" in vars(main.xrpl_service)),
+    ("log_listener", logging_config._listener is not None),
+) if done]
+
+async def startup():
+    began = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        return time.perf_counter() - began
+
+startup_s = asyncio.run(startup())
+print(json.dumps({"import_s": import_s, "startup_s": startup_s, "side_effects": side_effects}))
+"""
+
+
+def child_environment(workdir: str) -> Dict[str, str]:
+    """Fake ledger, throwaway storage, fixed wallets"""
+    env = dict(os.environ)
+    env.update({
+        "XRPL_RPC_URL": "fake://startup?close=0.2",
+        "DATABASE_PATH": os.path.join(workdir, "cyclr.db"),
+        "QR_DIR": os.path.join(workdir, "qrcodes"),
+        "EXPIRY_SCHEDULER_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+    })
+    # Any valid seeds; derivation cost is the same for every seed
+    env.setdefault("RECYCLEFI_SEED", "sEdTM1uX8pu2do5XvTnutH6HsouMaM2")
+    env.setdefault("CYCLR_WALLET_SECRET", "sEdTM1uX8pu2do5XvTnutH6HsouMaM2")
+    return env
+
+
+def run_once(importtime: bool = False) -> Tuple[Dict[str, Any], str]:
+    """One fresh interpreter → (probe result, stderr)"""
+    with tempfile.TemporaryDirectory(prefix="cyclr-startup-") as workdir:
+        cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE]
+        began = time.perf_counter()
+        proc = subprocess.run(
+            cmd, cwd=BACKEND_DIR, env=child_environment(workdir), capture_output=True, text=True
+        )
+        process_s = time.perf_counter() - began
+    if proc.returncode != 0:
+        raise RuntimeError(f"probe failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_s"] = process_s
+    return result, proc.stderr
+
+
+def heaviest_imports(stderr: str, top: int) -> List[Tuple[str, float]]:
+    """Top-level imports under `import main`, by cumulative ms"""
+    entries = []                        # (depth, name, cumulative µs), in completion order
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+
+    # Children complete before their parent, so main's direct imports are
+    # the depth-1 entries just before it
+    try:
+        main_at = max(i for i, (depth, name, _) in enumerate(entries) if name == "main" and depth == 0)
+    except ValueError:
+        return []
+    children = []
+    for depth, name, cumulative in reversed(entries[:main_at]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cumulative / 1000))
+    return sorted(children, key=lambda c: c[1], reverse=True)[:top]
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    runs = [run_once()[0] for _ in range(args.runs)]
+    profile, stderr = run_once(importtime=True)
+
+    side_effects = sorted({name for r in runs + [profile] for name in r["side_effects"]})
+    return {
+        "import_ms": round(statistics.median(r["import_s"] for r in runs) * 1000, 1),
+        "startup_ms": round(statistics.median(r["startup_s"] for r in runs) * 1000, 1),
+        "process_ms": round(statistics.median(r["process_s"] for r in runs) * 1000, 1),
+        "import_side_effects": side_effects,
+        "heaviest_imports_ms": {name: round(ms, 1) for name, ms in heaviest_imports(stderr, args.top)},
+    }
+
+
+def report(results: Dict[str, Any]):
+    print(f"import main     {results['import_ms']:>8.1f} ms")
+    print(f"lifespan start  {results['startup_ms']:>8.1f} ms")
+    print(f"process         {results['process_ms']:>8.1f} ms")
+    print(f"side effects    {', '.join(results['import_side_effects']) or 'none'}")
+    print("\nHeaviest imports of main (cumulative, -X importtime):")
+    for name, ms in results["heaviest_imports_ms"].items():
+        print(f"  {name:<32}{ms:>8.1f} ms")
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Regressions against the baseline, as readable lines"""
+    regressions = []
+    base = baseline.get("results", {})
+    for metric, tolerance in TOLERANCE.items():
+        old, new = base.get(metric), results[metric]
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{metric} {new} vs baseline {old} (±{tolerance:.0%})")
+    new_effects = set(results["import_side_effects"]) - set(base.get("import_side_effects", []))
+    if new_effects:
+        regressions.append(f"importing main now creates: {', '.join(sorted(new_effects))}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CYCLR startup benchmark (import time, lifespan, side effects)")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=12, help="heaviest imports to list")
+    parser.add_argument("--save", action="store_true", help=f"write the results to {BASELINE.name}")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    report(results)
+
+    document = {"config": {"runs": args.runs, "python": sys.version.split()[0]}, "results": results}
+    if args.json:
+        args.json.write_text(json.dumps(document, indent=2) + "\n")
+    if args.save:
+        args.baseline.write_text(json.dumps(document, indent=2) + "\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != document["config"]:
+            print(f"\nBaseline was recorded with {baseline.get('config')}; comparing anyway")
+        regressions = compare(results, baseline)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
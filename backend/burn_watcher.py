@@ -0,0 +1,253 @@
+# burn_watcher.py
+"""
+Burn watcher - records burns of our recycling NFTs as their ledgers validate
+
+A recycle claim used to need the burn's hash from the client. The client
+had to poll Tx until the burn validated, and then the server fetched the
+same tx again. Instead the watcher keeps a subscription open on the
+RecycleFi account. Burning an NFT updates its issuer's BurnedNFTokens,
+so every burn of an NFT we minted appears on that account's stream.
+Each validated NFTokenBurn of a watched taxon is stored in nft_burns
+(NFT ID, burner, ledger):
+
+- /recycle verifies the claim against that row, a local read, and can
+  wait briefly for a burn that was submitted but has not validated yet
+- on_burn fires once per newly recorded burn (BURN_AUTO_SETTLE hooks
+  the recycle in here)
+- after a reconnect or a restart, the gap is filled from AccountTx,
+  starting at the last ledger the stream delivered
+
+The "ledger" stream is subscribed too, so a connection that has gone
+quiet is told apart from a ledger with nothing for us.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from xrpl.models.requests import AccountTx, Subscribe, Tx
+from xrpl.models.requests.subscribe import StreamParameter
+from xrpl.utils import parse_nftoken_id
+
+from models import db, burn_index
+from xrpl_client import get_client, stream_client
+
+logger = logging.getLogger(__name__)
+
+
+CURSOR_KEY = "burn_watcher:last_ledger"
+
+# No message at all (not even ledgerClosed) for this long → reconnect
+IDLE_TIMEOUT = 60.0
+
+
+def parse_burn(tx: Dict[str, Any], meta: Any, tx_hash: str, ledger_index: Optional[int]) -> Optional[Dict[str, Any]]:
+    """nft_burns row for a successful NFTokenBurn, else None"""
+    if tx.get("TransactionType") != "NFTokenBurn":
+        return None
+    if not isinstance(meta, dict) or meta.get("TransactionResult") != "tesSUCCESS":
+        return None
+    return {
+        "nft_id": tx["NFTokenID"].upper(),
+        "tx_hash": tx_hash.upper(),
+        "burner": tx["Account"],
+        "owner": tx.get("Owner", tx["Account"]),
+        "ledger_index": ledger_index,
+    }
+
+
+class BurnWatcher:
+    """Account subscription → nft_burns, plus waiters for burns not seen yet"""
+
+    def __init__(
+        self,
+        account_fn: Callable[[], str],
+        taxons: Iterable[int],
+        on_burn: Optional[Callable[[Dict[str, Any]], None]] = None,
+        reconnect_seconds: float = 5.0
+    ):
+        self.account_fn = account_fn        # issuer of the NFTs (resolved at start)
+        self.taxons = set(taxons)
+        self.on_burn = on_burn
+        self.reconnect_seconds = reconnect_seconds
+
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._last_ledger = 0
+        self._live = False                  # subscribed and caught up
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def live(self) -> bool:
+        """True while burns are being recorded as they validate"""
+        return self._live
+
+    def start(self):
+        cursor = db.get_state(CURSOR_KEY)
+        self._last_ledger = int(cursor) if cursor else 0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._live = False
+
+    # ----------------------------------------
+    # Lookups
+    # ----------------------------------------
+
+    async def wait_for(self, nft_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The NFT's recorded burn, waiting up to `timeout` for it to validate"""
+        nft_id = nft_id.upper()
+        burn = burn_index.get(nft_id)
+        if burn is not None or not self._live or timeout <= 0:
+            return burn
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(nft_id, []).append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(nft_id, [])
+            if waiter in waiters:
+                waiters.remove(waiter)
+            if not waiters:
+                self._waiters.pop(nft_id, None)
+        return burn_index.get(nft_id)
+
+    async def lookup(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        Burn by hash through Tx (watcher down, or the burn predates it).
+        Only burns of watched NFTs are recorded; any other burn is
+        returned as parsed.
+        """
+        resp = await get_client().request(Tx(transaction=tx_hash))
+        if not resp.is_successful() or not resp.result.get("validated", False):
+            return None
+        # API v2 nests the transaction fields under tx_json
+        tx = resp.result.get("tx_json") or resp.result
+        burn = parse_burn(tx, resp.result.get("meta"), resp.result.get("hash", tx_hash), resp.result.get("ledger_index"))
+        if burn is not None and self.watches(burn["nft_id"]):
+            self._record(burn)
+            burn = burn_index.get(burn["nft_id"])
+        return burn
+
+    # ----------------------------------------
+    # Recording
+    # ----------------------------------------
+
+    def watches(self, nft_id: str) -> bool:
+        """True for NFTs this watcher records burns of (our issuer, a watched taxon)"""
+        try:
+            fields = parse_nftoken_id(nft_id)
+        except Exception:
+            return False
+        return fields["issuer"] == self.account_fn() and (not self.taxons or fields["taxon"] in self.taxons)
+
+    def _record(self, burn: Dict[str, Any]):
+        if not burn_index.put(**burn):
+            return                          # seen before (backfill overlaps the stream)
+        logger.info("NFT burn recorded", extra=burn)
+        for waiter in self._waiters.pop(burn["nft_id"], []):
+            if not waiter.done():
+                waiter.set_result(None)
+        if self.on_burn:
+            try:
+                self.on_burn(burn)
+            except Exception as e:
+                logger.warning("Burn callback failed", extra={**burn, "error": str(e)})
+
+    def _observe(self, tx: Dict[str, Any], meta: Any, tx_hash: str, ledger_index: Optional[int]):
+        burn = parse_burn(tx, meta, tx_hash, ledger_index)
+        if burn is not None and self.watches(burn["nft_id"]):
+            self._record(burn)
+
+    def _advance(self, ledger_index: Optional[int]):
+        if ledger_index and int(ledger_index) > self._last_ledger:
+            self._last_ledger = int(ledger_index)
+            db.set_state(CURSOR_KEY, str(self._last_ledger))
+
+    # ----------------------------------------
+    # Stream
+    # ----------------------------------------
+
+    async def backfill(self, page_size: int = 400) -> int:
+        """
+        Page through the account's AccountTx from the last ledger seen
+        (inclusive, duplicates are ignored) and record the burns in it.
+        Returns the number of transactions read.
+        """
+        client = get_client()
+        marker = None
+        seen = 0
+        while True:
+            resp = await client.request(AccountTx(
+                account=self.account_fn(),
+                ledger_index_min=self._last_ledger or -1,
+                ledger_index_max=-1,
+                forward=True,
+                limit=page_size,
+                marker=marker
+            ))
+            if not resp.is_successful():
+                raise RuntimeError(f"AccountTx failed: {resp.result}")
+
+            for entry in resp.result.get("transactions", []):
+                tx = entry.get("tx") or entry.get("tx_json", {})
+                ledger_index = entry.get("ledger_index") or tx.get("ledger_index")
+                self._observe(tx, entry.get("meta"), entry.get("hash") or tx.get("hash", ""), ledger_index)
+                self._advance(ledger_index)
+                seen += 1
+
+            marker = resp.result.get("marker")
+            if not marker:
+                return seen
+
+    def _handle(self, message: Dict[str, Any]):
+        kind = message.get("type")
+        if kind == "transaction" and message.get("validated"):
+            # API v2 streams put the fields under tx_json, v1 under transaction
+            tx = message.get("tx_json") or message.get("transaction", {})
+            self._observe(tx, message.get("meta"), message.get("hash") or tx.get("hash", ""), message.get("ledger_index"))
+            self._advance(message.get("ledger_index"))
+        elif kind == "ledgerClosed":
+            self._advance(message.get("ledger_index"))
+
+    async def _follow(self):
+        async with stream_client() as stream:
+            resp = await stream.request(Subscribe(
+                streams=[StreamParameter.LEDGER],
+                accounts=[self.account_fn()]
+            ))
+            if not resp.is_successful():
+                raise RuntimeError(f"Subscribe failed: {resp.result}")
+
+            # Subscribed first, so nothing between the backfill and the
+            # stream is missed (the overlap is recorded once)
+            read = await self.backfill()
+            self._live = True
+            logger.info("Burn watcher live", extra={
+                "account": self.account_fn(), "backfilled_txs": read, "ledger_index": self._last_ledger
+            })
+
+            messages = stream.__aiter__()
+            while True:
+                try:
+                    message = await asyncio.wait_for(messages.__anext__(), IDLE_TIMEOUT)
+                except StopAsyncIteration:
+                    return
+                self._handle(message)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._follow()
+                logger.warning("Burn watcher stream closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Burn watcher disconnected", extra={"error": str(e) or type(e).__name__})
+            self._live = False
+            await asyncio.sleep(self.reconnect_seconds)
@@ -0,0 +1,192 @@
+# catalog.py
+"""
+Columnar product catalog - compact in-memory view of every product
+
+A loaded Product is a pydantic model with dozens of floats, datetimes,
+optional strings and a dict, several KB each. Anything that scans the
+catalog (pool totals, counts per status) only needs a handful of
+numbers per product, so the catalog keeps those in typed arrays
+instead:
+
+- amounts:    array('d'), one column per field
+- timestamps: array('q'), epoch seconds (0 = not set)
+- status:     array('b'), index into STATUSES
+- wallets:    array('i'), index into an interned string table
+
+That is about 240 bytes per product, measured with its id and row
+index, against about 3.7 KB for a loaded Product. Full Product objects
+are still read from the store (models.get_product) when a handler
+needs one.
+
+The catalog is filled from the store once and then kept current by the
+product listener. Each write also moves the row's contribution between
+running aggregates (a count and a sum per amount field), grouped by
+(status, sold) - enough for counts and totals per status and per
+settlement case - so those reads don't scan the catalog. The sums are
+integers of AGGREGATE_SCALE units per amount, so taking a row out
+removes exactly what putting it in added and they don't drift.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from models import Product, ProductStatus, product_store
+
+
+STATUSES = list(ProductStatus)
+_STATUS_CODE = {s: i for i, s in enumerate(STATUSES)}
+
+AMOUNT_FIELDS = (
+    "price",
+    "manufacturer_deposit", "customer_escrow", "total_in_amm",
+    "cyclr_fee", "manufacturer_payout",
+    "manufacturer_lp_tokens", "customer_lp_tokens", "total_lp_tokens",
+    "total_withdrawn", "apy_earned",
+    "customer_received", "manufacturer_received", "recycler_received",
+    "eco_fund_received", "cyclr_received",
+)
+TIME_FIELDS = ("created_at", "sold_at", "expires_at", "recycled_at")
+WALLET_FIELDS = ("manufacturer_wallet", "customer_wallet", "recycler_wallet")
+
+NO_WALLET = -1
+
+# Aggregated amounts are kept in micro-units (1e-6 CUSD / LP token)
+AGGREGATE_SCALE = 1_000_000
+
+# Settlement case of a finished product: (status, was sold) → case.
+# A manufacturer recall is CASE C (unsold, taken back out of the AMM)
+CASES = {
+    (ProductStatus.RECYCLED, True): "A",
+    (ProductStatus.EXPIRED, True): "B",
+    (ProductStatus.RECYCLED, False): "C",
+    (ProductStatus.RECALLED, False): "C",
+    (ProductStatus.EXPIRED, False): "D",
+}
+
+
+class ProductCatalog:
+    """Struct-of-arrays view of the product table"""
+
+    def __init__(self):
+        self._row: Dict[str, int] = {}          # product_id → row
+        self._ids: List[str] = []
+        self._status = array("b")
+        self._amounts = {f: array("d") for f in AMOUNT_FIELDS}
+        self._times = {f: array("q") for f in TIME_FIELDS}
+        self._wallets = {f: array("i") for f in WALLET_FIELDS}
+        self._wallet_ids: Dict[str, int] = {}
+        self._wallet_names: List[str] = []
+        self.loaded = False
+        self.version = 0                        # bumped on every write
+        # (status code, sold) → [count, sum of each AMOUNT_FIELDS column in micro-units]
+        self._groups: Dict[Tuple[int, bool], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, page_size: int = 1000):
+        """Fill the catalog from the store, one page at a time"""
+        after_id = None
+        while True:
+            page = product_store.page(None, after_id, page_size)
+            for data in page:
+                self.upsert(Product.model_validate_json(data))
+            if len(page) < page_size:
+                break
+            after_id = self._ids[-1]
+        self.loaded = True
+
+    # ----------------------------------------
+    # Writes
+    # ----------------------------------------
+
+    def _intern(self, wallet: Optional[str]) -> int:
+        if not wallet:
+            return NO_WALLET
+        wallet_id = self._wallet_ids.get(wallet)
+        if wallet_id is None:
+            wallet_id = self._wallet_ids[wallet] = len(self._wallet_names)
+            self._wallet_names.append(wallet)
+        return wallet_id
+
+    def _group_key(self, row: int) -> Tuple[int, bool]:
+        return self._status[row], self._times["sold_at"][row] != 0
+
+    def _aggregate(self, row: int, sign: int):
+        """Add (sign=1) or remove (sign=-1) the row's contribution"""
+        totals = self._groups.setdefault(self._group_key(row), [0] * (1 + len(AMOUNT_FIELDS)))
+        totals[0] += sign
+        for i, column in enumerate(self._amounts.values(), 1):
+            totals[i] += sign * round(column[row] * AGGREGATE_SCALE)
+
+    def upsert(self, product: Product):
+        """Product listener: add or overwrite the product's row"""
+        row = self._row.get(product.id)
+        if row is not None:
+            self._aggregate(row, -1)
+        else:
+            row = self._row[product.id] = len(self._ids)
+            self._ids.append(product.id)
+            self._status.append(0)
+            for column in self._amounts.values():
+                column.append(0.0)
+            for column in self._times.values():
+                column.append(0)
+            for column in self._wallets.values():
+                column.append(NO_WALLET)
+
+        self._status[row] = _STATUS_CODE[product.status]
+        for field, column in self._amounts.items():
+            column[row] = getattr(product, field)
+        for field, column in self._times.items():
+            value = getattr(product, field)
+            column[row] = int(value.timestamp()) if value else 0
+        for field, column in self._wallets.items():
+            column[row] = self._intern(getattr(product, field))
+        self._aggregate(row, 1)
+        self.version += 1
+
+    # ----------------------------------------
+    # Reads
+    # ----------------------------------------
+
+    def row(self, product_id: str) -> Optional[int]:
+        return self._row.get(product_id)
+
+    def column(self, field: str) -> array:
+        """Raw column of an amount or time field, or "status" (codes into STATUSES)"""
+        if field == "status":
+            return self._status
+        return self._amounts[field] if field in self._amounts else self._times[field]
+
+    def status(self, product_id: str) -> Optional[ProductStatus]:
+        row = self._row.get(product_id)
+        return None if row is None else STATUSES[self._status[row]]
+
+    def _matching(self, keys: Callable[[ProductStatus, bool], bool]) -> List[List[int]]:
+        return [totals for (code, sold), totals in self._groups.items() if keys(STATUSES[code], sold)]
+
+    @staticmethod
+    def _sum(groups: List[List[int]], field: str) -> float:
+        i = 1 + AMOUNT_FIELDS.index(field)
+        return sum(g[i] for g in groups) / AGGREGATE_SCALE
+
+    def count(self, statuses: Optional[Iterable[ProductStatus]] = None) -> int:
+        wanted = None if statuses is None else set(statuses)
+        return sum(g[0] for g in self._matching(lambda status, _: wanted is None or status in wanted))
+
+    def total(self, field: str, statuses: Optional[Iterable[ProductStatus]] = None) -> float:
+        wanted = None if statuses is None else set(statuses)
+        return self._sum(self._matching(lambda status, _: wanted is None or status in wanted), field)
+
+    def case_totals(self, case: str, fields: Iterable[str]) -> Dict[str, float]:
+        """Products settled under `case` ("A"-"D"): count and totals of `fields`"""
+        groups = self._matching(lambda status, sold: CASES.get((status, sold)) == case)
+        totals = {"count": sum(g[0] for g in groups)}
+        for field in fields:
+            totals[field] = self._sum(groups, field)
+        return totals
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns (excluding the id/wallet strings)"""
+        columns = [self._status, *self._amounts.values(), *self._times.values(), *self._wallets.values()]
+        return sum(c.itemsize * len(c) for c in columns)
@@ -9,6 +9,7 @@ Business Model:
 """
 import os
 from pathlib import Path
+from typing import Dict, List
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -29,6 +30,12 @@ class Settings(BaseSettings):
 
     NETWORK: str = os.getenv("XRPL_NETWORK", "testnet")
     RPC_URL: str = os.getenv("XRPL_RPC_URL", "https://s.altnet.rippletest.net:51234")
+    WS_URL: str = os.getenv("XRPL_WS_URL", "wss://s.altnet.rippletest.net:51233")
+    
+    # Shared client: "http" (keep-alive JSON-RPC pool) or "ws" (one persistent WebSocket)
+    XRPL_TRANSPORT: str = os.getenv("XRPL_TRANSPORT", "http")
+    XRPL_MAX_CONNECTIONS: int = 20      # pooled HTTP connections to rippled
+    XRPL_MAX_IN_FLIGHT: int = 64        # concurrent requests to rippled
     
     # CUSD Token (CYCLR USD - Issued Currency)
     CUSD_ISSUER: str = os.getenv("CUSD_ISSUER", "rpWYyReCdfisZEd99q14gg96NrAEpcauMt")
@@ -76,12 +83,79 @@ class Settings(BaseSettings):
     RECYCLER_REWARD_PERCENT: float = 20.0       # Recycler gets 20% of APY
     ECO_FUND_REWARD_PERCENT: float = 20.0       # Ecological fund gets 20% of APY
     
+    # Submit the reward payouts together (consecutive sequences) instead of one per ledger
+    CONCURRENT_REWARD_DISTRIBUTION: bool = True
+    
     # ===================================
     # AMM Pool Info
     # ===================================
     AMM_ACCOUNT: str = os.getenv("AMM_ACCOUNT", "rN66ywBQKiGV2X2kYsuQsB2uJyG5cJLiKT")
     AMM_TRADING_FEE_PERCENT: float = 0.1        # 0.1% trading fee
     
+    # Pool state (AMMInfo) is reused until a newer ledger validates or this many seconds pass
+    LEDGER_CLOSE_SECONDS: float = 3.5
+    TX_POLL_INTERVAL: float = 1.0       # seconds between Tx polls while waiting for validation
+    
+    # Single-flight reads: identical concurrent reads share one request, and
+    # successful ones are reused for this many seconds (per request method)
+    XRPL_READ_TTLS: Dict[str, float] = {"account_info": 1.0, "account_lines": 1.0}
+    XRPL_READ_CACHE_SIZE: int = 10000   # responses kept
+    
+    # Batch balances (/wallets/balances), read from the last validated ledger
+    BALANCE_BATCH_MAX: int = 500        # addresses per request
+    BALANCE_CONCURRENCY: int = 16       # accounts read at once
+    
+    # Async mode for /recycle and /purchase (202 + job ID)
+    JOB_WORKERS: int = 8
+    JOB_HISTORY_LIMIT: int = 10000
+    
+    # Product listing pagination
+    PRODUCT_PAGE_SIZE: int = 100        # default page for /products/page
+    PRODUCT_PAGE_MAX: int = 1000        # largest page a client may ask for
+    PRODUCT_ENCODING_CACHE_SIZE: int = 50000  # encoded ProductResponses kept in memory
+    
+    # AMM micro-batching: net deposits/withdrawals over a window (0 = off,
+    # LEDGER_CLOSE_SECONDS = about one tx per ledger close)
+    AMM_BATCH_WINDOW: float = 0.0
+    AMM_BATCH_MAX: int = 500            # settle early once this many intents are queued
+    
+    # Batch registration (/products/register/batch)
+    REGISTER_BATCH_MAX: int = 10000     # products per request
+    REGISTER_BATCH_CHUNK: int = 1000    # products per aggregated AMM deposit
+    
+    # Automatic expiry (CASE B / D) when expires_at passes
+    EXPIRY_SCHEDULER_ENABLED: bool = True
+    EXPIRY_WINDOW: int = 10000          # products held in the in-memory heap
+    EXPIRY_BATCH_SIZE: int = 100        # due products handled per wake-up
+    EXPIRY_CONCURRENCY: int = 4         # expirations running at once
+    EXPIRY_RETRY_SECONDS: float = 300.0 # retry delay after a failed AMM withdrawal
+    
+    # Burn watcher: validated NFTokenBurns of our recycling NFTs, recorded
+    # from the RecycleFi account stream (see burn_watcher.py)
+    BURN_WATCHER_ENABLED: bool = True
+    BURN_WATCH_TAXONS: List[int] = [2025]   # taxons RecycleFi mints recycling NFTs with
+    BURN_WAIT_SECONDS: float = 10.0     # /recycle waits this long for a burn to validate
+    BURN_AUTO_SETTLE: bool = False      # settle the recycle as soon as its burn validates
+    BURN_WATCHER_RECONNECT_SECONDS: float = 5.0
+    
+    # QR codes (rendered off the event loop, content-addressed by URL)
+    QR_DIR: str = os.getenv("QR_DIR", str(BASE_DIR / "qrcodes"))
+    QR_FORMAT: str = os.getenv("QR_FORMAT", "png")      # "png" or "svg" (much cheaper)
+    QR_LAZY: bool = False               # render on first GET /qrcodes/... instead of at purchase
+    QR_EXECUTOR: str = "thread"         # "thread" or "process"
+    QR_WORKERS: int = 2
+    
+    # Logging (queued, written by a background thread)
+    LOG_LEVEL: str = "INFO"             # DEBUG shows every step of each request
+    LOG_FORMAT: str = "text"            # "text" or "json"
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # share of DEBUG records kept
+    
+    # Prometheus metrics on /metrics (XRPL request / submit_tx / route latency)
+    METRICS_ENABLED: bool = True
+    
+    # Persistence (SQLite, WAL mode)
+    DATABASE_PATH: str = os.getenv("DATABASE_PATH", str(BASE_DIR / "data" / "cyclr.db"))
+    
     # Frontend
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:3000")
     RECYCLE_DAPP_URL: str = "http://localhost:3000"
@@ -0,0 +1,335 @@
+# database.py
+"""
+CYCLR Persistence - SQLite (WAL mode)
+
+Products are stored as JSON documents with the fields we query on
+promoted to indexed columns:
+
+    status, manufacturer_wallet, customer_wallet, nft_id, expires_at
+
+so lookups and "what is due" queries are index range scans instead of
+full scans over every product ever registered.
+
+The amm_deposits table maps each recycling NFT to the AMMDeposit that
+locked its funds, so redeem/recycle is a keyed read instead of a scan
+of the wallet's transaction history. nft_burns holds the validated
+NFTokenBurn of each recycling NFT (see burn_watcher.py) and whether
+its recycle reward has been claimed.
+
+Conversion to/from the pydantic models lives in models.py; this module
+only deals with rows.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id                  TEXT PRIMARY KEY,
+    status              TEXT NOT NULL,
+    manufacturer_wallet TEXT NOT NULL,
+    customer_wallet     TEXT,
+    nft_id              TEXT,
+    created_at          REAL NOT NULL,
+    expires_at          REAL,
+    data                TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_products_status ON products(status, created_at);
+CREATE INDEX IF NOT EXISTS ix_products_manufacturer ON products(manufacturer_wallet);
+CREATE INDEX IF NOT EXISTS ix_products_customer ON products(customer_wallet);
+CREATE INDEX IF NOT EXISTS ix_products_nft ON products(nft_id);
+CREATE INDEX IF NOT EXISTS ix_products_expires ON products(expires_at);
+CREATE INDEX IF NOT EXISTS ix_products_status_expires ON products(status, expires_at);
+CREATE INDEX IF NOT EXISTS ix_products_page ON products(created_at, id);
+CREATE INDEX IF NOT EXISTS ix_products_status_page ON products(status, created_at, id);
+
+CREATE TABLE IF NOT EXISTS amm_deposits (
+    nft_id              TEXT PRIMARY KEY,
+    tx_hash             TEXT NOT NULL,
+    account             TEXT NOT NULL,
+    lp_tokens           REAL NOT NULL DEFAULT 0,
+    ledger_index        INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS nft_burns (
+    nft_id              TEXT PRIMARY KEY,
+    tx_hash             TEXT NOT NULL,
+    burner              TEXT NOT NULL,
+    owner               TEXT NOT NULL,
+    ledger_index        INTEGER,
+    claimed_at          REAL,
+    recycle_tx          TEXT
+);
+
+CREATE TABLE IF NOT EXISTS qr_codes (
+    digest              TEXT PRIMARY KEY,
+    url                 TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key                 TEXT PRIMARY KEY,
+    value               TEXT NOT NULL
+);
+"""
+
+
+def to_epoch(value: Optional[datetime]) -> Optional[float]:
+    """Datetime → epoch seconds (indexed column form)"""
+    return value.timestamp() if value else None
+
+
+class Database:
+    """
+    Single shared SQLite connection.
+
+    sqlite3 connections are not safe for concurrent use, so every
+    statement goes through one lock. WAL mode keeps readers from
+    blocking on the writer and lets other processes (scripts, a second
+    worker) read while we write.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Open the file and apply the schema (first use, not import)"""
+        with self._lock:
+            if self._conn is None:
+                if self.path != ":memory:":
+                    Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                self._conn = conn
+            return self._conn
+
+    def execute(self, sql: str, params: Any = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.connect().execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run several statements atomically"""
+        with self._lock:
+            conn = self.connect()
+            conn.execute("BEGIN")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def get_state(self, key: str) -> Optional[str]:
+        """Read a sync cursor / bookkeeping value"""
+        rows = self.execute("SELECT value FROM sync_state WHERE key = ?", (key,))
+        return rows[0]["value"] if rows else None
+
+    def set_state(self, key: str, value: str):
+        self.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class ProductStore:
+    """Product table - rows in, JSON documents out"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    _UPSERT = """
+        INSERT INTO products (id, status, manufacturer_wallet, customer_wallet,
+                              nft_id, created_at, expires_at, data)
+        VALUES (:id, :status, :manufacturer_wallet, :customer_wallet,
+                :nft_id, :created_at, :expires_at, :data)
+        ON CONFLICT(id) DO UPDATE SET
+            status = excluded.status,
+            manufacturer_wallet = excluded.manufacturer_wallet,
+            customer_wallet = excluded.customer_wallet,
+            nft_id = excluded.nft_id,
+            created_at = excluded.created_at,
+            expires_at = excluded.expires_at,
+            data = excluded.data
+    """
+
+    def put(self, columns: Dict[str, Any], data: str):
+        self.db.execute(self._UPSERT, {**columns, "data": data})
+
+    def put_many(self, rows: List[Tuple[Dict[str, Any], str]]):
+        """Upsert many products in one transaction"""
+        with self.db.transaction() as conn:
+            conn.executemany(self._UPSERT, [{**columns, "data": data} for columns, data in rows])
+
+    def get(self, product_id: str) -> Optional[str]:
+        rows = self.db.execute("SELECT data FROM products WHERE id = ?", (product_id,))
+        return rows[0]["data"] if rows else None
+
+    def all(self) -> List[str]:
+        rows = self.db.execute("SELECT data FROM products ORDER BY created_at")
+        return [r["data"] for r in rows]
+
+    def page(self, status: Optional[str], after_id: Optional[str], limit: int) -> Optional[List[str]]:
+        """
+        Up to `limit` products in (created_at, id) order, starting after `after_id`.
+        Returns None if `after_id` is not a known product.
+        """
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        if after_id is not None:
+            rows = self.db.execute("SELECT created_at FROM products WHERE id = ?", (after_id,))
+            if not rows:
+                return None
+            where.append("(created_at, id) > (?, ?)")
+            params += [rows[0]["created_at"], after_id]
+
+        rows = self.db.execute(
+            f"""
+            SELECT data FROM products
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY created_at, id
+            LIMIT ?
+            """,
+            (*params, limit)
+        )
+        return [r["data"] for r in rows]
+
+    def find(self, column: str, value: Any) -> List[str]:
+        """Equality lookup on one of the indexed columns"""
+        if column not in ("status", "manufacturer_wallet", "customer_wallet", "nft_id"):
+            raise ValueError(f"Column is not indexed: {column}")
+        rows = self.db.execute(
+            f"SELECT data FROM products WHERE {column} = ? ORDER BY created_at",
+            (value,)
+        )
+        return [r["data"] for r in rows]
+
+    def expiring_before(self, statuses: List[str], before: float) -> List[str]:
+        """Products in one of `statuses` whose expires_at is earlier than `before`"""
+        marks = ",".join("?" for _ in statuses)
+        rows = self.db.execute(
+            f"""
+            SELECT data FROM products
+            WHERE status IN ({marks}) AND expires_at IS NOT NULL AND expires_at < ?
+            ORDER BY expires_at
+            """,
+            (*statuses, before)
+        )
+        return [r["data"] for r in rows]
+
+    def next_expiring(self, statuses: List[str], from_ts: float, limit: int) -> List[sqlite3.Row]:
+        """(id, expires_at) of the `limit` earliest-expiring products at or after `from_ts`"""
+        marks = ",".join("?" for _ in statuses)
+        return self.db.execute(
+            f"""
+            SELECT id, expires_at FROM products
+            WHERE status IN ({marks}) AND expires_at >= ?
+            ORDER BY expires_at
+            LIMIT ?
+            """,
+            (*statuses, from_ts, limit)
+        )
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) AS n FROM products")[0]["n"]
+
+
+class DepositIndex:
+    """NFT ID → AMMDeposit that locked its funds"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def put(self, nft_id: str, tx_hash: str, account: str, lp_tokens: float, ledger_index: Optional[int]):
+        self.db.execute(
+            """
+            INSERT INTO amm_deposits (nft_id, tx_hash, account, lp_tokens, ledger_index)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(nft_id) DO UPDATE SET
+                tx_hash = excluded.tx_hash,
+                account = excluded.account,
+                lp_tokens = excluded.lp_tokens,
+                ledger_index = excluded.ledger_index
+            """,
+            (nft_id.upper(), tx_hash, account, lp_tokens, ledger_index)
+        )
+
+    def get(self, nft_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db.execute("SELECT * FROM amm_deposits WHERE nft_id = ?", (nft_id.upper(),))
+        return dict(rows[0]) if rows else None
+
+
+class BurnIndex:
+    """NFT ID → the validated NFTokenBurn that destroyed it, and its claim"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def put(self, nft_id: str, tx_hash: str, burner: str, owner: str, ledger_index: Optional[int]) -> bool:
+        """Record a burn; False if the NFT's burn was already known"""
+        rows = self.db.execute(
+            """
+            INSERT INTO nft_burns (nft_id, tx_hash, burner, owner, ledger_index)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(nft_id) DO NOTHING
+            RETURNING nft_id
+            """,
+            (nft_id.upper(), tx_hash.upper(), burner, owner, ledger_index)
+        )
+        return bool(rows)
+
+    def get(self, nft_id: str) -> Optional[Dict[str, Any]]:
+        rows = self.db.execute("SELECT * FROM nft_burns WHERE nft_id = ?", (nft_id.upper(),))
+        return dict(rows[0]) if rows else None
+
+    def claim(self, nft_id: str, at: float) -> bool:
+        """Take the burn's reward claim; False if someone already holds it"""
+        rows = self.db.execute(
+            "UPDATE nft_burns SET claimed_at = ? WHERE nft_id = ? AND claimed_at IS NULL RETURNING nft_id",
+            (at, nft_id.upper())
+        )
+        return bool(rows)
+
+    def release(self, nft_id: str):
+        """Give a claim back (the recycle failed before paying anything)"""
+        self.db.execute(
+            "UPDATE nft_burns SET claimed_at = NULL WHERE nft_id = ? AND recycle_tx IS NULL",
+            (nft_id.upper(),)
+        )
+
+    def settle(self, nft_id: str, recycle_tx: str):
+        self.db.execute("UPDATE nft_burns SET recycle_tx = ? WHERE nft_id = ?", (recycle_tx, nft_id.upper()))
+
+
+class QRCodeIndex:
+    """QR content digest → the URL it encodes (for render-on-first-GET)"""
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    def put(self, digest: str, url: str):
+        self.db.execute(
+            "INSERT INTO qr_codes (digest, url) VALUES (?, ?) ON CONFLICT(digest) DO NOTHING",
+            (digest, url)
+        )
+
+    def get(self, digest: str) -> Optional[str]:
+        rows = self.db.execute("SELECT url FROM qr_codes WHERE digest = ?", (digest,))
+        return rows[0]["url"] if rows else None
@@ -0,0 +1,185 @@
+# expiry.py
+"""
+Expiry scheduler - runs CASE B / CASE D when a product's expires_at passes
+
+Products are kept ordered by expires_at in a min-heap. The loop sleeps
+until the earliest one is due (or until an earlier one is scheduled),
+then expires everything that is due in bounded-concurrency batches.
+
+The heap only holds a window of the earliest EXPIRY_WINDOW products; the
+rest stay in SQLite and are paged in through the (status, expires_at)
+index when the window drains. Work and memory therefore scale with the
+number of products about to expire, not with the size of the catalog.
+
+Entries are never removed from the heap eagerly: when one comes due it
+is checked against `_scheduled` and skipped if the product was sold,
+recycled or rescheduled in the meantime.
+
+A failed expiry is retried after EXPIRY_RETRY_SECONDS, unless expire_fn
+raised ExpiryRejected (the product cannot expire as it is, e.g. it has
+no LP tokens): then it is dropped until the product changes.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models import Product, ProductStatus, product_store, get_product
+
+logger = logging.getLogger(__name__)
+
+
+# Statuses that still have a deposit in the AMM and can expire
+EXPIRABLE = (ProductStatus.REGISTERED, ProductStatus.SOLD)
+
+# Never sleep longer than this (guards against clock jumps)
+MAX_SLEEP_SECONDS = 60.0
+
+
+class ExpiryRejected(Exception):
+    """Raised by expire_fn when retrying cannot help"""
+
+
+class ExpiryScheduler:
+    """Min-heap of (expires_at, product_id) driving automatic expiry"""
+
+    def __init__(
+        self,
+        expire_fn: Callable[[Product], Awaitable[bool]],
+        window: int,
+        batch_size: int,
+        concurrency: int,
+        retry_seconds: float
+    ):
+        self.expire_fn = expire_fn
+        self.window = window
+        self.batch_size = batch_size
+        self.retry_seconds = retry_seconds
+        self._slots = asyncio.Semaphore(concurrency)
+
+        self._heap: List[Tuple[float, str]] = []
+        self._scheduled: Dict[str, float] = {}      # product_id → expires_at currently in the heap
+        self._rejected: Dict[str, float] = {}       # product_id → expires_at it was rejected at
+        self._loaded_until = -math.inf              # every product expiring ≤ this is in the heap
+        self._exhausted = False                     # store has nothing beyond _loaded_until
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._refill()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # ----------------------------------------
+    # Scheduling
+    # ----------------------------------------
+
+    def on_product_change(self, product: Product):
+        """Product listener: (re)schedule or forget a product"""
+        self._rejected.pop(product.id, None)        # changed, so worth another try
+        if product.status not in EXPIRABLE or not product.expires_at:
+            self._scheduled.pop(product.id, None)
+            return
+
+        ts = product.expires_at.timestamp()
+        if self._scheduled.get(product.id) == ts:
+            return
+        if ts > self._loaded_until and not self._exhausted:
+            # Beyond the window - it will be paged in from the store later
+            self._scheduled.pop(product.id, None)
+            return
+        self._push(product.id, ts)
+        if len(self._scheduled) > 2 * self.window:
+            self._trim()
+
+    def _push(self, product_id: str, ts: float):
+        earliest = self._heap[0][0] if self._heap else math.inf
+        self._scheduled[product_id] = ts
+        heapq.heappush(self._heap, (ts, product_id))
+        if ts < earliest:
+            self._wakeup.set()
+
+    def _trim(self):
+        """Shrink the heap back to one window; the rest is paged in again later"""
+        self._loaded_until = sorted(self._scheduled.values())[self.window - 1]
+        self._exhausted = False
+        self._scheduled = {pid: ts for pid, ts in self._scheduled.items() if ts <= self._loaded_until}
+        self._heap = [(ts, pid) for pid, ts in self._scheduled.items()]
+        heapq.heapify(self._heap)
+
+    def _refill(self):
+        """Page the next window of expiring products in from the store"""
+        rows = product_store.next_expiring(
+            [s.value for s in EXPIRABLE],
+            self._loaded_until if self._loaded_until > -math.inf else 0.0,
+            self.window
+        )
+        for row in rows:
+            if row["expires_at"] not in (self._scheduled.get(row["id"]), self._rejected.get(row["id"])):
+                self._push(row["id"], row["expires_at"])
+        if len(rows) < self.window:
+            self._exhausted = True
+            self._loaded_until = math.inf
+        else:
+            self._exhausted = False
+            self._loaded_until = rows[-1]["expires_at"]
+
+    # ----------------------------------------
+    # Loop
+    # ----------------------------------------
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            ts, product_id = heapq.heappop(self._heap)
+            if self._scheduled.get(product_id) == ts:
+                del self._scheduled[product_id]
+                due.append(product_id)
+        return due
+
+    async def _expire_one(self, product_id: str):
+        async with self._slots:
+            product = get_product(product_id)
+            if not product or product.status not in EXPIRABLE or not product.expires_at:
+                return
+            if product.expires_at.timestamp() > time.time():
+                self.on_product_change(product)     # pushed back since it was scheduled
+                return
+            try:
+                ok = await self.expire_fn(product)
+            except ExpiryRejected as e:
+                logger.warning("Scheduled expiry rejected, not retrying", extra={"product_id": product_id, "error": str(e)})
+                self._rejected[product_id] = product.expires_at.timestamp()
+                return
+            except Exception as e:
+                logger.warning("Scheduled expiry failed", extra={"product_id": product_id, "error": str(e)})
+                ok = False
+            if not ok:
+                self._push(product_id, time.time() + self.retry_seconds)
+
+    async def _run(self):
+        while True:
+            if not self._exhausted and (not self._heap or self._heap[0][0] > self._loaded_until):
+                self._refill()
+
+            now = time.time()
+            due = self._pop_due(now)
+            if due:
+                await asyncio.gather(*(self._expire_one(pid) for pid in due))
+                continue
+
+            timeout = MAX_SLEEP_SECONDS
+            if self._heap:
+                timeout = min(timeout, max(0.0, self._heap[0][0] - now))
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
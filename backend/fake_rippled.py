@@ -0,0 +1,1038 @@
+# fake_rippled.py
+"""
+Fake rippled - an in-process XRPL stand-in for offline benchmarks and load tests
+
+Implements the slice of the rippled API the backend uses, with just
+enough ledger semantics for xrpl-py's autofill/sign/submit and our own
+tx_sequencer and tx_meta to work unchanged:
+
+- requests:     server_info, fee, ledger, account_info, account_lines,
+                account_nfts, account_tx, amm_info, tx, submit
+- streams:      subscribe to "ledger" and to `accounts` (validated
+                transactions), through FakeStreamClient
+- transactions: Payment (XRP / issued), TrustSet, AccountSet (no-op),
+                AMMDeposit, AMMWithdraw (constant-product math, XLS-30
+                formulas), NFTokenMint, NFTokenBurn, NFTokenCreateOffer /
+                NFTokenAcceptOffer (sell offers for XRP)
+- Sequence handling like rippled: tefPAST_SEQ, terPRE_SEQ (held until
+  the gap fills), tefMAX_LEDGER
+- ledgers close every `close_seconds`; a tx shows as validated after the
+  close that follows its submission
+- metadata has AccountRoot / RippleState / NFTokenPage nodes, so
+  xrpl.utils.get_balance_changes works on it
+- optional latency (+ jitter) on every request
+
+Simplifications: signatures are not checked, reserves are ignored, every
+AMM is XRP/<issued currency>, and state changes are visible as soon as a
+tx applies (not only once its ledger validates). Unknown accounts are
+funded on first use (auto_fund), including their issued-currency lines,
+so any seed can be used without a faucet.
+
+Two ways to point the backend at it (settings.RPC_URL):
+
+    fake://local?close=1.0&latency_ms=20&jitter_ms=5      in-process
+    python fake_rippled.py --port 5005                     standalone,
+        then XRPL_RPC_URL=http://127.0.0.1:5005
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal, getcontext
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrpl.asyncio.clients.client import REQUEST_TIMEOUT
+from xrpl.asyncio.clients.utils import json_to_response, request_to_json_rpc
+from xrpl.core.addresscodec import decode_classic_address, encode_classic_address
+from xrpl.core.binarycodec import decode
+from xrpl.models.requests.request import Request
+from xrpl.models.response import Response
+
+
+getcontext().prec = 34
+
+DROPS_PER_XRP = 1_000_000
+BASE_FEE = 10
+ACCOUNT_ZERO = "rrrrrrrrrrrrrrrrrrrrrhoLvTp"
+BUILD_VERSION = "2.3.0"
+
+# Flags
+TF_LP_TOKEN = 0x00010000
+TF_WITHDRAW_ALL = 0x00020000
+TF_ONE_ASSET_WITHDRAW_ALL = 0x00040000
+TF_SINGLE_ASSET = 0x00080000
+TF_TWO_ASSET = 0x00100000
+TF_ONE_ASSET_LP_TOKEN = 0x00200000
+NFT_BURNABLE = 0x0001
+TF_SELL_NFTOKEN = 0x00000001
+
+RESULT_MESSAGES = {
+    "tesSUCCESS": "The transaction was applied. Only final in a validated ledger.",
+    "terPRE_SEQ": "Missing/inapplicable prior transaction.",
+    "tefPAST_SEQ": "This sequence number has already passed.",
+    "tefMAX_LEDGER": "Ledger sequence too high.",
+    "tefALREADY": "The exact transaction was already in this ledger.",
+    "terNO_ACCOUNT": "The source account does not exist.",
+    "temMALFORMED": "Malformed transaction.",
+    "temDISABLED": "The transaction requires logic that is not implemented here.",
+    "tecUNFUNDED_PAYMENT": "Insufficient XRP balance to send.",
+    "tecPATH_DRY": "Path could not send partial amount.",
+    "tecNO_ENTRY": "No matching entry found.",
+    "tecNO_PERMISSION": "No permission to perform requested operation.",
+    "tecAMM_INVALID_TOKENS": "AMM invalid LP tokens.",
+    "tecAMM_BALANCE": "AMM has invalid balance.",
+    "tecUNFUNDED_AMM": "Insufficient balance to fund AMM.",
+    "tecOBJECT_NOT_FOUND": "A requested object could not be located.",
+    "tecINSUFFICIENT_FUNDS": "Not enough funds available to complete requested transaction.",
+}
+
+
+def _sha512_half(data: bytes) -> bytes:
+    return hashlib.sha512(data).digest()[:32]
+
+
+def _fmt(value: Decimal) -> str:
+    text = format(value.normalize(), "f")
+    return "0" if text in ("-0", "") else text
+
+
+def _account_key(address: str) -> bytes:
+    return decode_classic_address(address)
+
+
+def _is_xrp(amount: Any) -> bool:
+    return isinstance(amount, str)
+
+
+class _MetaBuilder:
+    """Snapshots ledger entries on first touch and diffs them into AffectedNodes"""
+
+    def __init__(self, ledger: "FakeLedger"):
+        self.ledger = ledger
+        self.accounts: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.lines: Dict[Tuple[str, str, str], Optional[Decimal]] = {}
+        self.extra: List[Dict[str, Any]] = []
+
+    def account(self, address: str):
+        if address not in self.accounts:
+            root = self.ledger.accounts.get(address)
+            self.accounts[address] = dict(root) if root else None
+
+    def line(self, key: Tuple[str, str, str]):
+        if key not in self.lines:
+            self.lines[key] = self.ledger.lines.get(key)
+
+    def affected(self) -> Set[str]:
+        touched = set(self.accounts)
+        for low, high, _ in self.lines:
+            touched.update((low, high))
+        return touched
+
+    def nodes(self) -> List[Dict[str, Any]]:
+        nodes = []
+        for address, before in self.accounts.items():
+            after = self.ledger.accounts[address]
+            index = _sha512_half(b"a" + _account_key(address)).hex().upper()
+            if before is None:
+                nodes.append({"CreatedNode": {
+                    "LedgerEntryType": "AccountRoot",
+                    "LedgerIndex": index,
+                    "NewFields": {"Account": address, "Balance": str(after["Balance"]), "Sequence": after["Sequence"]},
+                }})
+            else:
+                previous = {k: (str(v) if k == "Balance" else v) for k, v in before.items() if after.get(k) != v}
+                nodes.append({"ModifiedNode": {
+                    "LedgerEntryType": "AccountRoot",
+                    "LedgerIndex": index,
+                    "FinalFields": {**after, "Balance": str(after["Balance"])},
+                    "PreviousFields": previous,
+                }})
+
+        for (low, high, currency), before in self.lines.items():
+            after = self.ledger.lines.get((low, high, currency), Decimal(0))
+            index = _sha512_half(b"r" + _account_key(low) + _account_key(high) + currency.encode()).hex().upper()
+            fields = {
+                "Balance": {"currency": currency, "issuer": ACCOUNT_ZERO, "value": _fmt(after)},
+                "LowLimit": {"currency": currency, "issuer": low, "value": "0"},
+                "HighLimit": {"currency": currency, "issuer": high, "value": "0"},
+                "Flags": 0,
+            }
+            if before is None:
+                nodes.append({"CreatedNode": {"LedgerEntryType": "RippleState", "LedgerIndex": index, "NewFields": fields}})
+            elif before != after:
+                nodes.append({"ModifiedNode": {
+                    "LedgerEntryType": "RippleState",
+                    "LedgerIndex": index,
+                    "FinalFields": fields,
+                    "PreviousFields": {"Balance": {"currency": currency, "issuer": ACCOUNT_ZERO, "value": _fmt(before)}},
+                }})
+        return nodes + self.extra
+
+
+class _Reject(Exception):
+    """Stops a transaction with a result code (nothing but the fee is applied)"""
+
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeLedger:
+    """Ledger state, transaction engine and RPC handlers"""
+
+    def __init__(
+        self,
+        close_seconds: float = 1.0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        auto_fund_xrp: float = 100_000,
+        auto_fund_iou: float = 100_000,
+        start_ledger: int = 1000
+    ):
+        self.close_seconds = close_seconds
+        self.latency = latency
+        self.jitter = jitter
+        self.auto_fund_drops = int(auto_fund_xrp * DROPS_PER_XRP)
+        self.auto_fund_iou = Decimal(str(auto_fund_iou))
+
+        self.accounts: Dict[str, Dict[str, Any]] = {}
+        self.lines: Dict[Tuple[str, str, str], Decimal] = {}          # (low, high, currency) → low's balance
+        self._lines_of: Dict[str, Set[Tuple[str, str, str]]] = defaultdict(set)
+        self.amms: Dict[Tuple[str, str], Dict[str, Any]] = {}         # (currency, issuer) of asset2 → pool
+        self._amm_accounts: Set[str] = set()
+        self.nfts: Dict[str, Dict[str, Any]] = {}
+        self.nft_offers: Dict[str, Dict[str, Any]] = {}               # offer index → sell offer
+
+        self.validated_index = start_ledger
+        self.current_index = start_ledger + 1
+        self._ledger_hashes: Dict[int, str] = {start_ledger: self._random_hash()}
+        self._txs: Dict[str, Dict[str, Any]] = {}                     # hash → tx entry
+        self._open: List[str] = []                                    # applied, not yet validated
+        self._held: Dict[Tuple[str, int], Tuple[str, Dict[str, Any], str]] = {}
+        self._history: Dict[str, List[str]] = defaultdict(list)      # account → validated tx hashes
+
+        self._streams: List[Tuple[Dict[str, Any], asyncio.Queue]] = []   # (subscription, messages)
+
+        self.stats: Counter = Counter()
+        self._closer: Optional[asyncio.Task] = None
+
+    # ----------------------------------------
+    # Setup
+    # ----------------------------------------
+
+    @staticmethod
+    def _random_hash() -> str:
+        return "%064X" % random.getrandbits(256)
+
+    def fund(self, address: str, xrp: float = 0, iou: Optional[Dict[Tuple[str, str], float]] = None):
+        """Create/top up an account (and issued-currency balances)"""
+        root = self._root(address, create=True)
+        root["Balance"] += int(xrp * DROPS_PER_XRP)
+        for (currency, issuer), value in (iou or {}).items():
+            self._add_iou(address, issuer, currency, Decimal(str(value)))
+
+    def create_amm(
+        self, creator: str, xrp: float, currency: str, issuer: str, value: float, trading_fee: int = 500
+    ) -> Dict[str, Any]:
+        """XRP/<currency> pool funded by `creator` (who gets the initial LP tokens)"""
+        seed = _sha512_half(b"amm" + currency.encode() + _account_key(issuer))
+        amm_account = encode_classic_address(seed[:20])
+        lp_currency = "03" + _sha512_half(b"lpt" + seed).hex().upper()[:38]
+        self._amm_accounts.add(amm_account)
+        self.accounts[amm_account] = {
+            "Account": amm_account, "Balance": int(xrp * DROPS_PER_XRP), "Sequence": 0,
+            "OwnerCount": 1, "Flags": 0, "LedgerEntryType": "AccountRoot",
+        }
+        self._add_iou(amm_account, issuer, currency, Decimal(str(value)))
+        lp_supply = (Decimal(int(xrp * DROPS_PER_XRP)) * Decimal(str(value))).sqrt()
+        pool = {
+            "account": amm_account,
+            "currency": currency,
+            "issuer": issuer,
+            "lp_currency": lp_currency,
+            "lp_supply": lp_supply,
+            "trading_fee": trading_fee,
+        }
+        self.amms[(currency, issuer)] = pool
+        self._root(creator, create=True)
+        self._add_iou(creator, amm_account, lp_currency, lp_supply)
+        return pool
+
+    # ----------------------------------------
+    # Ledger closes
+    # ----------------------------------------
+
+    def start(self):
+        if self._closer is None or self._closer.done():
+            self._closer = asyncio.get_running_loop().create_task(self._close_loop())
+
+    async def stop(self):
+        if self._closer is not None:
+            self._closer.cancel()
+            await asyncio.gather(self._closer, return_exceptions=True)
+            self._closer = None
+
+    async def _close_loop(self):
+        while True:
+            await asyncio.sleep(self.close_seconds)
+            self.close_ledger()
+
+    def close_ledger(self):
+        """Validate everything applied since the last close"""
+        index = self.current_index
+        close_time = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        for position, tx_hash in enumerate(self._open):
+            entry = self._txs[tx_hash]
+            entry.update(validated=True, ledger_index=index, close_time_iso=close_time)
+            entry["meta"]["TransactionIndex"] = position
+            for account in entry["affected"]:
+                self._history[account].append(tx_hash)
+        closed, self._open = self._open, []
+        self._ledger_hashes[index] = self._random_hash()
+        self.validated_index = index
+        self.current_index = index + 1
+        self._publish(index, closed)
+
+        # Held txs whose LastLedgerSequence has passed are dropped, like rippled does
+        for key, (_, tx, _) in list(self._held.items()):
+            if tx.get("LastLedgerSequence", self.current_index) < self.current_index:
+                del self._held[key]
+        self.stats["ledgers_closed"] += 1
+
+    # ----------------------------------------
+    # Subscriptions
+    # ----------------------------------------
+
+    def subscribe(self, subscription: Dict[str, Any]) -> asyncio.Queue:
+        """
+        Stream messages for `subscription` ({"streams": [...], "accounts":
+        set(...)}, read again at every close so it can grow) until
+        unsubscribe()
+        """
+        messages: asyncio.Queue = asyncio.Queue()
+        self._streams.append((subscription, messages))
+        return messages
+
+    def unsubscribe(self, messages: asyncio.Queue):
+        self._streams = [s for s in self._streams if s[1] is not messages]
+
+    def _publish(self, index: int, tx_hashes: List[str]):
+        for subscription, messages in self._streams:
+            if "ledger" in subscription.get("streams", ()):
+                messages.put_nowait({
+                    "type": "ledgerClosed",
+                    "ledger_index": index,
+                    "ledger_hash": self._ledger_hashes[index],
+                    "txn_count": len(tx_hashes),
+                    "fee_base": BASE_FEE,
+                })
+            accounts = subscription.get("accounts", ())
+            for tx_hash in tx_hashes:
+                entry = self._txs[tx_hash]
+                if accounts and entry["affected"] & set(accounts):
+                    code = entry["meta"]["TransactionResult"]
+                    messages.put_nowait({
+                        **self._tx_entry(tx_hash, 2),
+                        "type": "transaction",
+                        "engine_result": code,
+                        "engine_result_code": 0 if code == "tesSUCCESS" else 100,
+                        "engine_result_message": RESULT_MESSAGES.get(code, code),
+                    })
+                    self.stats["stream:transaction"] += 1
+
+    # ----------------------------------------
+    # State helpers
+    # ----------------------------------------
+
+    def _root(self, address: str, create: bool = False) -> Optional[Dict[str, Any]]:
+        root = self.accounts.get(address)
+        if root is None and (create or self.auto_fund_drops):
+            root = self.accounts[address] = {
+                "Account": address, "Balance": self.auto_fund_drops if not create else 0,
+                "Sequence": self.current_index, "OwnerCount": 0, "Flags": 0,
+                "LedgerEntryType": "AccountRoot",
+            }
+        return root
+
+    @staticmethod
+    def _line_key(a: str, b: str, currency: str) -> Tuple[str, str, str]:
+        return (a, b, currency) if _account_key(a) < _account_key(b) else (b, a, currency)
+
+    def _iou_balance(self, holder: str, issuer: str, currency: str) -> Decimal:
+        key = self._line_key(holder, issuer, currency)
+        if key not in self.lines:
+            if self.auto_fund_iou and not currency.startswith("03") and holder not in self._amm_accounts:
+                self._set_line(key, self.auto_fund_iou if holder == key[0] else -self.auto_fund_iou)
+            else:
+                return Decimal(0)
+        balance = self.lines[key]
+        return balance if holder == key[0] else -balance
+
+    def _set_line(self, key: Tuple[str, str, str], value: Decimal):
+        self.lines[key] = value
+        self._lines_of[key[0]].add(key)
+        self._lines_of[key[1]].add(key)
+
+    def _add_iou(self, holder: str, issuer: str, currency: str, delta: Decimal, meta: Optional[_MetaBuilder] = None):
+        current = self._iou_balance(holder, issuer, currency)
+        key = self._line_key(holder, issuer, currency)
+        if meta is not None:
+            meta.line(key)
+        new = current + delta
+        self._set_line(key, new if holder == key[0] else -new)
+
+    def _add_xrp(self, address: str, drops: int, meta: _MetaBuilder):
+        meta.account(address)
+        self._root(address, create=True)["Balance"] += drops
+
+    def _check_funds(self, sender: str, amount: Any, code: str):
+        if _is_xrp(amount):
+            if self.accounts[sender]["Balance"] < int(amount):
+                raise _Reject(code)
+        elif sender != amount["issuer"]:
+            if self._iou_balance(sender, amount["issuer"], amount["currency"]) < Decimal(amount["value"]):
+                raise _Reject("tecPATH_DRY" if code == "tecUNFUNDED_PAYMENT" else code)
+
+    def _debit(self, sender: str, amount: Any, meta: _MetaBuilder, code: str = "tecUNFUNDED_PAYMENT"):
+        """Take `amount` (drops string or issued amount) from `sender`"""
+        self._check_funds(sender, amount, code)
+        if _is_xrp(amount):
+            self._add_xrp(sender, -int(amount), meta)
+        elif sender != amount["issuer"]:
+            self._add_iou(sender, amount["issuer"], amount["currency"], -Decimal(amount["value"]), meta)
+
+    def _credit(self, receiver: str, amount: Any, meta: _MetaBuilder):
+        if _is_xrp(amount):
+            self._add_xrp(receiver, int(amount), meta)
+        elif receiver != amount["issuer"]:
+            self._add_iou(receiver, amount["issuer"], amount["currency"], Decimal(amount["value"]), meta)
+
+    # ----------------------------------------
+    # Transactions
+    # ----------------------------------------
+
+    def submit(self, tx_blob: str) -> Dict[str, Any]:
+        tx = decode(tx_blob)
+        tx_hash = _sha512_half(bytes.fromhex("54584E00" + tx_blob)).hex().upper()
+        tx["hash"] = tx_hash
+        self.stats[f"tx:{tx.get('TransactionType')}"] += 1
+
+        code = self._accept(tx, tx_blob, tx_hash)
+        return {
+            "engine_result": code,
+            "engine_result_code": 0 if code == "tesSUCCESS" else -1,
+            "engine_result_message": RESULT_MESSAGES.get(code, code),
+            "tx_blob": tx_blob,
+            "tx_json": tx,
+            "accepted": code[:3] in ("tes", "tec", "ter"),
+            "applied": code[:3] in ("tes", "tec"),
+            "broadcast": code[:3] in ("tes", "tec"),
+            "kept": code[:3] in ("tes", "tec", "ter"),
+            "queued": False,
+            "validated_ledger_index": self.validated_index,
+        }
+
+    def _accept(self, tx: Dict[str, Any], tx_blob: str, tx_hash: str) -> str:
+        if tx_hash in self._txs:
+            return "tefALREADY"
+        account = tx["Account"]
+        root = self._root(account)
+        if root is None:
+            return "terNO_ACCOUNT"
+        if tx.get("LastLedgerSequence", self.current_index) < self.current_index:
+            return "tefMAX_LEDGER"
+        if tx["Sequence"] < root["Sequence"]:
+            return "tefPAST_SEQ"
+        if tx["Sequence"] > root["Sequence"]:
+            self._held[(account, tx["Sequence"])] = (tx_hash, tx, tx_blob)
+            return "terPRE_SEQ"
+
+        code = self._apply(tx, tx_hash)
+        # Anything held behind this one can go now
+        while (account, root["Sequence"]) in self._held:
+            held_hash, held_tx, _ = self._held.pop((account, root["Sequence"]))
+            self._apply(held_tx, held_hash)
+        return code
+
+    def _apply(self, tx: Dict[str, Any], tx_hash: str) -> str:
+        account = tx["Account"]
+        fee = int(tx.get("Fee", BASE_FEE))
+        if self.accounts[account]["Balance"] < fee:
+            return "terINSUF_FEE_B"
+
+        handler = getattr(self, f"_tx_{tx['TransactionType']}", None)
+        if handler is None:
+            return "temDISABLED"
+
+        # Handlers check everything before they change state, so a rejected
+        # tx has nothing to roll back
+        meta = _MetaBuilder(self)
+        try:
+            handler(tx, meta)
+            code = "tesSUCCESS"
+        except _Reject as rejected:
+            code = rejected.code
+            meta = _MetaBuilder(self)
+        if code[:3] in ("tem", "tef", "ter"):
+            return code
+
+        meta.account(account)
+        root = self.accounts[account]
+        root["Balance"] -= fee
+        root["Sequence"] += 1
+        self.stats["fee_drops"] += fee
+
+        result_meta = {"AffectedNodes": meta.nodes(), "TransactionResult": code, "TransactionIndex": 0}
+        if code == "tesSUCCESS" and tx["TransactionType"] == "NFTokenMint":
+            result_meta["nftoken_id"] = meta.extra[0]["CreatedNode"]["NewFields"]["NFTokens"][0]["NFToken"]["NFTokenID"]
+        self._txs[tx_hash] = {
+            "hash": tx_hash,
+            "tx_json": {k: v for k, v in tx.items() if k != "hash"},
+            "meta": result_meta,
+            "validated": False,
+            "ledger_index": None,
+            "affected": meta.affected(),
+        }
+        self._open.append(tx_hash)
+        return code
+
+    # Payment / TrustSet
+
+    def _tx_Payment(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        amount = tx["Amount"]
+        destination = tx["Destination"]
+        if destination == tx["Account"] and _is_xrp(amount):
+            return
+        self._debit(tx["Account"], amount, meta)
+        self._credit(destination, amount, meta)
+
+    def _tx_AccountSet(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        pass                                # no flags modelled; fee and Sequence only
+
+    def _tx_TrustSet(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        limit = tx["LimitAmount"]
+        self._add_iou(tx["Account"], limit["issuer"], limit["currency"], Decimal(0), meta)
+
+    # AMM
+
+    def _pool(self, tx: Dict[str, Any]) -> Dict[str, Any]:
+        asset2 = tx.get("Asset2", {})
+        pool = self.amms.get((asset2.get("currency"), asset2.get("issuer")))
+        if pool is None or tx.get("Asset", {}).get("currency") != "XRP":
+            raise _Reject("terNO_AMM")          # not applied, Sequence not consumed
+        return pool
+
+    def _reserves(self, pool: Dict[str, Any]) -> Tuple[Decimal, Decimal]:
+        xrp = Decimal(self.accounts[pool["account"]]["Balance"])
+        iou = self._iou_balance(pool["account"], pool["issuer"], pool["currency"])
+        return xrp, iou
+
+    def _lp_amount(self, pool: Dict[str, Any], value: Decimal) -> Dict[str, str]:
+        return {"currency": pool["lp_currency"], "issuer": pool["account"], "value": _fmt(value)}
+
+    def _asset_amount(self, pool: Dict[str, Any], is_xrp: bool, value: Decimal) -> Any:
+        if is_xrp:
+            return str(int(value))
+        return {"currency": pool["currency"], "issuer": pool["issuer"], "value": _fmt(value)}
+
+    def _tx_AMMDeposit(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        pool = self._pool(tx)
+        account, flags = tx["Account"], tx.get("Flags", 0)
+        fee = Decimal(pool["trading_fee"]) / Decimal(100_000)
+        xrp, iou = self._reserves(pool)
+        supply = pool["lp_supply"]
+
+        if flags & TF_LP_TOKEN:
+            ratio = Decimal(tx["LPTokenOut"]["value"]) / supply
+            deposits = [(True, xrp * ratio), (False, iou * ratio)]
+            minted = supply * ratio
+        elif flags & TF_TWO_ASSET:
+            ratio = min(Decimal(tx["Amount"]) / xrp, Decimal(tx["Amount2"]["value"]) / iou)
+            deposits = [(True, xrp * ratio), (False, iou * ratio)]
+            minted = supply * ratio
+        elif flags & TF_SINGLE_ASSET:
+            amount = tx.get("Amount")
+            if amount is None:
+                raise _Reject("temMALFORMED")
+            is_xrp = _is_xrp(amount)
+            value = Decimal(amount) if is_xrp else Decimal(amount["value"])
+            balance = xrp if is_xrp else iou
+            minted = supply * ((1 + value * (1 - fee / 2) / balance).sqrt() - 1)
+            deposits = [(is_xrp, value)]
+        else:
+            raise _Reject("temMALFORMED")
+
+        assets = [
+            self._asset_amount(pool, is_xrp, value.to_integral_value() if is_xrp else value)
+            for is_xrp, value in deposits
+        ]
+        for asset in assets:
+            self._check_funds(account, asset, "tecUNFUNDED_AMM")
+        for asset in assets:
+            self._debit(account, asset, meta)
+            self._credit(pool["account"], asset, meta)
+        pool["lp_supply"] = supply + minted
+        self._add_iou(account, pool["account"], pool["lp_currency"], minted, meta)
+
+    def _tx_AMMWithdraw(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        pool = self._pool(tx)
+        account, flags = tx["Account"], tx.get("Flags", 0)
+        fee = Decimal(pool["trading_fee"]) / Decimal(100_000)
+        xrp, iou = self._reserves(pool)
+        supply = pool["lp_supply"]
+        held = self._iou_balance(account, pool["account"], pool["lp_currency"])
+
+        one_asset = flags & (TF_SINGLE_ASSET | TF_ONE_ASSET_WITHDRAW_ALL | TF_ONE_ASSET_LP_TOKEN)
+        if one_asset and "Amount" not in tx:
+            raise _Reject("temMALFORMED")
+        is_xrp = one_asset and _is_xrp(tx["Amount"])
+        balance = xrp if is_xrp else iou
+
+        if flags & (TF_WITHDRAW_ALL | TF_ONE_ASSET_WITHDRAW_ALL):
+            burned = held
+        elif flags & (TF_LP_TOKEN | TF_ONE_ASSET_LP_TOKEN) and "LPTokenIn" in tx:
+            burned = Decimal(tx["LPTokenIn"]["value"])
+        elif flags & TF_SINGLE_ASSET:
+            # LP needed for an exact single-asset amount
+            value = Decimal(tx["Amount"]) if is_xrp else Decimal(tx["Amount"]["value"])
+            burned = supply * (1 - (1 - value / (balance * (1 - fee / 2))).sqrt())
+        else:
+            raise _Reject("temMALFORMED")
+
+        if burned <= 0 or burned > held or burned >= supply:
+            raise _Reject("tecAMM_INVALID_TOKENS")
+
+        if flags & (TF_LP_TOKEN | TF_WITHDRAW_ALL):
+            ratio = burned / supply
+            payouts = [(True, (xrp * ratio).to_integral_value()), (False, iou * ratio)]
+        elif one_asset:
+            out = balance * (1 - (1 - burned / supply) ** 2) * (1 - fee / 2)
+            payouts = [(is_xrp, out.to_integral_value() if is_xrp else out)]
+        else:
+            raise _Reject("temMALFORMED")
+
+        self._add_iou(account, pool["account"], pool["lp_currency"], -burned, meta)
+        pool["lp_supply"] = supply - burned
+        for is_xrp, value in payouts:
+            asset = self._asset_amount(pool, is_xrp, value)
+            self._debit(pool["account"], asset, meta, "tecAMM_BALANCE")
+            self._credit(account, asset, meta)
+
+    # NFTs
+
+    def _tx_NFTokenMint(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        issuer = tx.get("Issuer", tx["Account"])
+        meta.account(issuer)
+        root = self._root(issuer, create=True)
+        sequence = root.get("MintedNFTokens", 0)
+        root["MintedNFTokens"] = sequence + 1
+
+        flags = tx.get("Flags", 0) & 0xFFFF
+        taxon = tx["NFTokenTaxon"]
+        scrambled = taxon ^ ((384160001 * sequence + 2459) & 0xFFFFFFFF)
+        nft_id = (
+            flags.to_bytes(2, "big") + tx.get("TransferFee", 0).to_bytes(2, "big")
+            + _account_key(issuer) + scrambled.to_bytes(4, "big") + sequence.to_bytes(4, "big")
+        ).hex().upper()
+
+        token = {"NFTokenID": nft_id}
+        if "URI" in tx:
+            token["URI"] = tx["URI"]
+        self.nfts[nft_id] = {"owner": tx["Account"], "issuer": issuer, "flags": flags, "taxon": taxon, **token}
+        meta.extra.append({"CreatedNode": {
+            "LedgerEntryType": "NFTokenPage",
+            "LedgerIndex": (_account_key(tx["Account"]) + bytes.fromhex(nft_id)[-12:]).hex().upper(),
+            "NewFields": {"NFTokens": [{"NFToken": token}]},
+        }})
+
+    def _tx_NFTokenBurn(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        nft = self.nfts.get(tx["NFTokenID"])
+        owner = tx.get("Owner", tx["Account"])
+        if nft is None or nft["owner"] != owner:
+            raise _Reject("tecNO_ENTRY")
+        if tx["Account"] != owner and not (tx["Account"] == nft["issuer"] and nft["flags"] & NFT_BURNABLE):
+            raise _Reject("tecNO_PERMISSION")
+
+        del self.nfts[tx["NFTokenID"]]
+        meta.account(nft["issuer"])
+        issuer_root = self.accounts[nft["issuer"]]
+        issuer_root["BurnedNFTokens"] = issuer_root.get("BurnedNFTokens", 0) + 1
+        token = {k: nft[k] for k in ("NFTokenID", "URI") if k in nft}
+        meta.extra.append({"DeletedNode": {
+            "LedgerEntryType": "NFTokenPage",
+            "LedgerIndex": (_account_key(owner) + bytes.fromhex(nft["NFTokenID"])[-12:]).hex().upper(),
+            "FinalFields": {"NFTokens": [{"NFToken": token}]},
+        }})
+
+    def _tx_NFTokenCreateOffer(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        # Sell offers for XRP only (what the purchase flow hands to consumers)
+        nft = self.nfts.get(tx["NFTokenID"])
+        if not tx.get("Flags", 0) & TF_SELL_NFTOKEN or not _is_xrp(tx["Amount"]):
+            raise _Reject("temDISABLED")
+        if nft is None or nft["owner"] != tx["Account"]:
+            raise _Reject("tecNO_ENTRY")
+
+        index = _sha512_half(b"offer" + _account_key(tx["Account"]) + tx["Sequence"].to_bytes(4, "big")).hex().upper()
+        offer = {
+            "NFTokenID": tx["NFTokenID"],
+            "Owner": tx["Account"],
+            "Amount": tx["Amount"],
+            "Flags": TF_SELL_NFTOKEN,
+        }
+        if "Destination" in tx:
+            offer["Destination"] = tx["Destination"]
+        self.nft_offers[index] = offer
+        meta.extra.append({"CreatedNode": {"LedgerEntryType": "NFTokenOffer", "LedgerIndex": index, "NewFields": offer}})
+
+    def _tx_NFTokenAcceptOffer(self, tx: Dict[str, Any], meta: _MetaBuilder):
+        index = tx.get("NFTokenSellOffer")
+        offer = self.nft_offers.get(index)
+        if offer is None:
+            raise _Reject("tecOBJECT_NOT_FOUND" if index else "temMALFORMED")
+        nft = self.nfts.get(offer["NFTokenID"])
+        if nft is None or nft["owner"] != offer["Owner"]:
+            raise _Reject("tecNO_ENTRY")
+        if offer.get("Destination", tx["Account"]) != tx["Account"]:
+            raise _Reject("tecNO_PERMISSION")
+        if int(offer["Amount"]):
+            self._debit(tx["Account"], offer["Amount"], meta, "tecINSUFFICIENT_FUNDS")
+            self._credit(offer["Owner"], offer["Amount"], meta)
+
+        del self.nft_offers[index]
+        nft["owner"] = tx["Account"]
+        meta.account(offer["Owner"])
+        meta.extra.append({"DeletedNode": {"LedgerEntryType": "NFTokenOffer", "LedgerIndex": index, "FinalFields": offer}})
+
+    # ----------------------------------------
+    # RPC
+    # ----------------------------------------
+
+    async def rpc(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """One JSON-RPC call → its `result` object (status included)"""
+        self.start()
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        self.stats[f"rpc:{method}"] += 1
+
+        handler = getattr(self, f"_rpc_{method}", None)
+        if handler is None:
+            return self._error("unknownCmd", "Unknown method.")
+        try:
+            result = handler(params)
+        except KeyError as e:
+            return self._error("invalidParams", f"Missing field {e}.")
+        result.setdefault("status", "success")
+        return result
+
+    @staticmethod
+    def _error(error: str, message: str) -> Dict[str, Any]:
+        return {"status": "error", "error": error, "error_message": message}
+
+    def _rpc_ping(self, params):
+        return {}
+
+    def _rpc_server_info(self, params):
+        return {"info": {
+            "build_version": BUILD_VERSION,
+            "network_id": 1,
+            "server_state": "full",
+            "complete_ledgers": f"{min(self._ledger_hashes)}-{self.validated_index}",
+            "validated_ledger": {
+                "seq": self.validated_index,
+                "hash": self._ledger_hashes[self.validated_index],
+                "base_fee_xrp": BASE_FEE / DROPS_PER_XRP,
+                "reserve_base_xrp": 1,
+                "reserve_inc_xrp": 0.2,
+                "age": 0,
+            },
+        }}
+
+    def _rpc_fee(self, params):
+        fee = str(BASE_FEE)
+        return {
+            "current_ledger_size": str(len(self._open)),
+            "current_queue_size": str(len(self._held)),
+            "drops": {"base_fee": fee, "median_fee": "5000", "minimum_fee": fee, "open_ledger_fee": fee},
+            "expected_ledger_size": "1000",
+            "ledger_current_index": self.current_index,
+            "levels": {"median_level": "128000", "minimum_level": "256",
+                       "open_ledger_level": "256", "reference_level": "256"},
+            "max_queue_size": "20000",
+        }
+
+    def _ledger_index(self, params) -> int:
+        index = params.get("ledger_index", "current")
+        if index in ("validated", "closed"):
+            return self.validated_index
+        if index == "current":
+            return self.current_index
+        return int(index)
+
+    def _rpc_ledger(self, params):
+        index = self._ledger_index(params)
+        validated = index <= self.validated_index
+        return {
+            "ledger_index": index,
+            "ledger_hash": self._ledger_hashes.get(index, ""),
+            "validated": validated,
+            "ledger": {"ledger_index": str(index), "closed": validated},
+        }
+
+    def _ledger_fields(self, params) -> Dict[str, Any]:
+        """ledger_index / ledger_current_index part of an account_* answer"""
+        if params.get("ledger_index") == "validated" or isinstance(params.get("ledger_index"), int):
+            return {"ledger_index": self._ledger_index(params), "validated": True}
+        return {"ledger_current_index": self.current_index, "validated": False}
+
+    def _rpc_account_info(self, params):
+        root = self.accounts.get(params["account"])
+        if root is None and self.auto_fund_drops:
+            root = self._root(params["account"])
+        if root is None:
+            return self._error("actNotFound", "Account not found.")
+        data = {**root, "Balance": str(root["Balance"])}
+        return {"account_data": data, **self._ledger_fields(params)}
+
+    def _rpc_account_lines(self, params):
+        account = params["account"]
+        if account not in self.accounts and not self.auto_fund_drops:
+            return self._error("actNotFound", "Account not found.")
+        lines = []
+        for key in sorted(self._lines_of.get(account, ())):
+            low, high, currency = key
+            peer = high if account == low else low
+            if params.get("peer") and peer != params["peer"]:
+                continue
+            balance = self.lines[key] if account == low else -self.lines[key]
+            lines.append({
+                "account": peer, "balance": _fmt(balance), "currency": currency,
+                "limit": "1000000000", "limit_peer": "0", "quality_in": 0, "quality_out": 0,
+            })
+        # Paged like rippled (limit 10-400, default 200), resumed with the marker
+        limit = min(max(params.get("limit") or 200, 10), 400)
+        start = (params.get("marker") or {}).get("seq", 0)
+        result = {"account": account, "lines": lines[start:start + limit], **self._ledger_fields(params)}
+        if start + limit < len(lines):
+            result["marker"] = {"seq": start + limit}
+        return result
+
+    def _rpc_account_nfts(self, params):
+        account = params["account"]
+        nfts = [
+            {"NFTokenID": n["NFTokenID"], "Issuer": n["issuer"], "NFTokenTaxon": n["taxon"],
+             "Flags": n["flags"], "URI": n.get("URI", ""), "nft_serial": int(n["NFTokenID"][-8:], 16)}
+            for n in self.nfts.values() if n["owner"] == account
+        ]
+        return {"account": account, "account_nfts": nfts, "ledger_current_index": self.current_index}
+
+    def _tx_entry(self, tx_hash: str, api_version: int) -> Dict[str, Any]:
+        entry = self._txs[tx_hash]
+        result = {
+            "hash": tx_hash,
+            "meta": entry["meta"],
+            "validated": entry["validated"],
+        }
+        if entry["validated"]:
+            result["ledger_index"] = entry["ledger_index"]
+            result["ledger_hash"] = self._ledger_hashes[entry["ledger_index"]]
+            result["close_time_iso"] = entry["close_time_iso"]
+        if api_version >= 2:
+            result["tx_json"] = dict(entry["tx_json"])
+        else:
+            result.update(entry["tx_json"])
+        return result
+
+    def _rpc_tx(self, params):
+        tx_hash = params["transaction"].upper()
+        if tx_hash not in self._txs:
+            return self._error("txnNotFound", "Transaction not found.")
+        return self._tx_entry(tx_hash, params.get("api_version", 1))
+
+    def _rpc_account_tx(self, params):
+        account = params["account"]
+        api_version = params.get("api_version", 1)
+        low = params.get("ledger_index_min", -1)
+        high = params.get("ledger_index_max", -1)
+        low = 0 if low in (-1, None) else low
+        high = self.validated_index if high in (-1, None) else high
+        limit = params.get("limit") or 200
+        forward = params.get("forward", False)
+
+        history = [h for h in self._history.get(account, []) if low <= self._txs[h]["ledger_index"] <= high]
+        if not forward:
+            history.reverse()
+        start = (params.get("marker") or {}).get("seq", 0)
+        page = history[start:start + limit]
+
+        transactions = []
+        for tx_hash in page:
+            entry = self._tx_entry(tx_hash, api_version)
+            if api_version < 2:
+                tx = {k: v for k, v in entry.items() if k not in ("meta", "validated", "ledger_index")}
+                entry = {"tx": tx, "meta": entry["meta"], "validated": True, "ledger_index": entry["ledger_index"]}
+            transactions.append(entry)
+
+        result = {
+            "account": account, "transactions": transactions, "limit": limit,
+            "ledger_index_min": low, "ledger_index_max": high, "validated": True,
+        }
+        if start + limit < len(history):
+            result["marker"] = {"ledger": self._txs[page[-1]]["ledger_index"], "seq": start + limit}
+        return result
+
+    def _rpc_amm_info(self, params):
+        asset2 = params.get("asset2", {})
+        pool = self.amms.get((asset2.get("currency"), asset2.get("issuer")))
+        if pool is None or params.get("asset", {}).get("currency") != "XRP":
+            return self._error("actNotFound", "Account not found.")
+        xrp, iou = self._reserves(pool)
+        return {
+            "amm": {
+                "account": pool["account"],
+                "amount": str(int(xrp)),
+                "amount2": {"currency": pool["currency"], "issuer": pool["issuer"], "value": _fmt(iou)},
+                "lp_token": self._lp_amount(pool, pool["lp_supply"]),
+                "trading_fee": pool["trading_fee"],
+                "vote_slots": [],
+                "asset2_frozen": False,
+            },
+            "ledger_index": self._ledger_index(params),
+            "validated": params.get("ledger_index") == "validated",
+        }
+
+    def _rpc_submit(self, params):
+        if "tx_blob" not in params:
+            return self._error("invalidParams", "Only signed tx_blob submission is supported.")
+        return self.submit(params["tx_blob"])
+
+
+class FakeRippledClient(AsyncJsonRpcClient):
+    """xrpl-py client that talks to a FakeLedger in the same process"""
+
+    def __init__(self, url: str, ledger: Optional[FakeLedger] = None):
+        super().__init__(url)
+        self.ledger = ledger or ledger_from_url(url)
+
+    async def _request_impl(self, request: Request, *, timeout: float = REQUEST_TIMEOUT) -> Response:
+        payload = request_to_json_rpc(request)
+        result = await self.ledger.rpc(payload["method"], payload["params"][0])
+        return json_to_response({"result": result})
+
+    async def close(self):
+        await self.ledger.stop()
+
+
+class FakeStreamClient:
+    """
+    Subscription side of a FakeLedger, with the part of xrpl-py's
+    AsyncWebsocketClient that subscribers use: open/close (or async with),
+    request(Subscribe(...)) and `async for message in client`
+    """
+
+    def __init__(self, ledger: FakeLedger):
+        self.ledger = ledger
+        self._subscription: Dict[str, Any] = {"streams": set(), "accounts": set()}
+        self._messages: Optional[asyncio.Queue] = None
+
+    def is_open(self) -> bool:
+        return self._messages is not None
+
+    async def open(self):
+        self.ledger.start()
+        self._messages = self.ledger.subscribe(self._subscription)
+
+    async def close(self):
+        if self._messages is not None:
+            self.ledger.unsubscribe(self._messages)
+            self._messages = None
+
+    async def __aenter__(self) -> "FakeStreamClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def request(self, request: Request) -> Response:
+        payload = request_to_json_rpc(request)
+        method, params = payload["method"], payload["params"][0]
+        if method == "subscribe":
+            self._subscription["streams"].update(params.get("streams") or ())
+            self._subscription["accounts"].update(params.get("accounts") or ())
+            result = {"status": "success"}
+            if "ledger" in self._subscription["streams"]:
+                result["ledger_index"] = self.ledger.validated_index
+            return json_to_response({"result": result})
+        return json_to_response({"result": await self.ledger.rpc(method, params)})
+
+    async def __aiter__(self):
+        while self.is_open():
+            yield await self._messages.get()
+
+
+def ledger_from_url(url: str) -> FakeLedger:
+    """FakeLedger configured by fake://...?close=&latency_ms=&jitter_ms= (+ the CUSD pool)"""
+    from config import settings
+
+    query = {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+    ledger = FakeLedger(
+        close_seconds=float(query.get("close", 1.0)),
+        latency=float(query.get("latency_ms", 0)) / 1000,
+        jitter=float(query.get("jitter_ms", 0)) / 1000,
+    )
+    ledger.create_amm(
+        creator=settings.POOL_CREATOR,
+        xrp=float(query.get("pool_xrp", 100_000)),
+        currency=settings.CUSD_HEX,
+        issuer=settings.CUSD_ISSUER,
+        value=float(query.get("pool_cusd", 100_000)),
+    )
+    return ledger
+
+
+def create_app(ledger: FakeLedger):
+    """Standalone JSON-RPC server (Starlette) in front of a FakeLedger"""
+    from contextlib import asynccontextmanager
+
+    from starlette.applications import Starlette
+    from starlette.requests import Request as HTTPRequest
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    async def rpc(request: HTTPRequest):
+        body = await request.json()
+        params = (body.get("params") or [{}])[0]
+        return JSONResponse({"result": await ledger.rpc(body.get("method", ""), params)})
+
+    async def stats(request: HTTPRequest):
+        return JSONResponse(dict(ledger.stats))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        ledger.start()
+        yield
+        await ledger.stop()
+
+    return Starlette(
+        routes=[Route("/", rpc, methods=["POST"]), Route("/stats", stats, methods=["GET"])],
+        lifespan=lifespan,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake rippled JSON-RPC server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--close", type=float, default=1.0, help="seconds between ledger closes")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    url = f"fake://local?close={args.close}&latency_ms={args.latency_ms}&jitter_ms={args.jitter_ms}"
+    uvicorn.run(create_app(ledger_from_url(url)), host=args.host, port=args.port, log_level="warning")
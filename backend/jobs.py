@@ -0,0 +1,110 @@
+# jobs.py
+"""
+Background job runner - async mode for the long lifecycle endpoints
+
+/api/v1/recycle and /api/v1/purchase chain several ledger transactions
+and can hold an HTTP connection for 20-40 s. In async mode the handler
+only validates the request, enqueues the work here and answers 202 with
+a job ID; a fixed pool of workers runs the steps and the client polls
+GET /api/v1/jobs/{id} or streams /api/v1/jobs/{id}/events.
+
+Jobs live in memory. Once there are more than JOB_HISTORY_LIMIT, the
+oldest finished ones are dropped; queued and running jobs never are.
+"""
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from models import JobResponse, JobStatus
+
+
+JobFn = Callable[[], Awaitable[Dict[str, Any]]]
+
+TERMINAL = (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+
+class JobQueue:
+    """In-process job queue drained by a fixed number of workers"""
+
+    def __init__(self, workers: int, history_limit: int):
+        self.workers = workers
+        self.history_limit = history_limit
+        self._jobs: "OrderedDict[str, JobResponse]" = OrderedDict()
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, kind: str, fn: JobFn) -> JobResponse:
+        if self._queue is None:
+            raise RuntimeError("Job workers are not running")
+        job = JobResponse(kind=kind)
+        self._jobs[job.id] = job
+        self._changed[job.id] = asyncio.Event()
+        self._prune()
+        self._queue.put_nowait((job.id, fn))
+        return job
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        return self._jobs.get(job_id)
+
+    def change_event(self, job_id: str) -> Optional[asyncio.Event]:
+        """Event set on the job's next state change (grab it before reading the job)"""
+        return self._changed.get(job_id)
+
+    def _update(self, job: JobResponse, **fields):
+        for name, value in fields.items():
+            setattr(job, name, value)
+        event = self._changed.get(job.id)
+        if event is not None:
+            self._changed[job.id] = asyncio.Event()
+            event.set()
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the history limit (queued / running ones are kept)"""
+        excess = len(self._jobs) - self.history_limit
+        if excess <= 0:
+            return
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in TERMINAL][:excess]
+        for job_id in finished:
+            self._jobs.pop(job_id)
+            self._changed.pop(job_id, None)
+
+    async def _worker(self):
+        while True:
+            job_id, fn = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                self._queue.task_done()
+                continue
+            self._update(job, status=JobStatus.RUNNING, started_at=datetime.now(timezone.utc))
+            try:
+                result = await fn()
+                self._update(
+                    job, status=JobStatus.SUCCEEDED, result=result, status_code=200,
+                    finished_at=datetime.now(timezone.utc)
+                )
+            except HTTPException as e:
+                self._update(
+                    job, status=JobStatus.FAILED, error=str(e.detail), status_code=e.status_code,
+                    finished_at=datetime.now(timezone.utc)
+                )
+            except Exception as e:
+                self._update(
+                    job, status=JobStatus.FAILED, error=str(e), status_code=500,
+                    finished_at=datetime.now(timezone.utc)
+                )
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,111 @@
+# logging_config.py
+"""
+Logging - structured log records written off the event loop
+
+print() wrote straight to stdout (unbuffered under docker-compose), so
+every banner line a handler printed held up the event loop until the
+write finished. Now:
+
+- every logger feeds a queue (QueueHandler) and one background thread
+  (QueueListener) formats and writes the records
+- LOG_LEVEL: per-step progress is DEBUG, outcomes are INFO, so the
+  per-request banners disappear at the default level
+- LOG_FORMAT: "json" (one object per line) or "text"
+- LOG_DEBUG_SAMPLE_RATE: share of DEBUG records kept, so DEBUG can be
+  switched on under load
+
+Fields passed as `extra` (product_id, nft_id, tx_hash, duration_ms, ...)
+become keys of the JSON object, or key=value pairs in text mode.
+
+The app's lifespan calls setup_logging() on startup and
+shutdown_logging() on shutdown, so importing main starts no thread.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from config import settings
+
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        return json.dumps(doc, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        line = f"{ts} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class DebugSampler(logging.Filter):
+    """Keeps a random `rate` share of DEBUG records (INFO and up always pass)"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+
+def setup_logging():
+    """Route the root logger through the queue (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    enqueue = logging.handlers.QueueHandler(records)
+    enqueue.addFilter(DebugSampler(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [enqueue]
+    root.setLevel(settings.LOG_LEVEL.upper())
+    # httpx logs every rippled round trip at INFO
+    for noisy in ("httpx", "httpcore"):
+        logging.getLogger(noisy).setLevel(max(root.level, logging.WARNING))
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush what is still queued, stop the writer thread and detach the queue"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger()
+        root.handlers[:] = [h for h in root.handlers if not isinstance(h, logging.handlers.QueueHandler)]
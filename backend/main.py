@@ -16,53 +16,95 @@ CASE D: NOT Sold & Expired → Manufacturer gets deposit, CYCLR keeps 100% APY
 """
 
 import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Union
 
-from pydantic import BaseModel
-
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Form, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from xrpl.models import (
-    Payment, Memo, AMMDeposit, AMMWithdraw, IssuedCurrencyAmount,
-    AMMDepositFlag, AMMWithdrawFlag, NFTokenBurn
-)
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from xrpl.core.addresscodec import is_valid_classic_address
+from xrpl.models import Payment, AMMWithdraw, IssuedCurrencyAmount, AMMWithdrawFlag
 from xrpl.models.currencies import XRP, IssuedCurrency
+from xrpl.models.requests import AccountLines
+from xrpl.utils import xrp_to_drops
+from xrpl.wallet import Wallet
+
 from config import settings
+from logging_config import setup_logging, shutdown_logging
 from models import (
     Product, ProductStatus,
-    RegisterProductRequest, SellProductRequest, RecycleProductRequest, RecallProductRequest,
-    ProductResponse, RecycleResponse, HealthResponse, AMMInfoResponse,
-    save_product, get_product, get_all_products, update_product, get_products_by_status
+    RegisterProductRequest, RegisterProductBatchRequest, BatchProductItem, SellProductRequest, RecycleProductRequest, RecallProductRequest,
+    ProductResponse, ProductPageResponse, ProductBatchResponse, BatchDeposit, RecycleResponse, HealthResponse, AMMInfoResponse,
+    PlatformStatsResponse, CaseTotals,
+    WalletBalancesRequest, WalletBalancesResponse,
+    JobResponse, JobStatus, EXPIRY_YEARS,
+    db, save_product, save_products, get_product, update_product,
+    get_products_page, get_product_by_nft_id, deposit_index, burn_index, add_product_listener
 )
-from xrpl.utils import xrp_to_drops
-from xrpl.wallet import Wallet
-from xrpl.asyncio.clients import AsyncJsonRpcClient
-from xrpl.asyncio.transaction import autofill, sign, submit_and_wait
-
-from xrpl_service import xrpl_service
-from xrpl_helpers import client, RECYCLEFI, create_recyclable_item_v3
-from fastapi import FastAPI, Form, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
-from pydantic import BaseModel
-import os
-from typing import Optional
-
-from xrpl.asyncio.clients import AsyncJsonRpcClient
-from xrpl.asyncio.transaction import autofill, sign, submit_and_wait
-from xrpl.models import (
-    Payment, Memo, AMMDeposit, AMMWithdraw, IssuedCurrencyAmount,
-    AMMDepositFlag, AMMWithdrawFlag, NFTokenBurn
+from jobs import JobQueue
+from expiry import ExpiryScheduler, ExpiryRejected
+from burn_watcher import BurnWatcher
+from catalog import ProductCatalog, CASES
+from yield_estimator import YieldEstimator
+from qr_service import qr_service, FORMATS as QR_FORMATS
+from serialization import ProductEncodingCache, RawJSONResponse, encode_cursor
+from tx_sequencer import submit_tx
+from tx_meta import xrp_received
+import metrics
+
+from xrpl_service import xrpl_service, iou_value
+from xrpl_client import get_client, close_client
+from xrpl_helpers import get_recyclefi_wallet, create_recyclable_item_v3, backfill_deposit_index
+
+logger = logging.getLogger(__name__)
+
+# Background workers for async-mode /recycle and /purchase
+job_queue = JobQueue(workers=settings.JOB_WORKERS, history_limit=settings.JOB_HISTORY_LIMIT)
+
+# Automatic CASE B / D expiry, driven by expires_at
+async def _expire_due(product: Product) -> bool:
+    try:
+        return (await run_expire(product)).success
+    except HTTPException as e:
+        # 4xx: the product itself is the problem (e.g. no LP tokens), retrying won't help
+        if e.status_code < 500:
+            raise ExpiryRejected(e.detail)
+        return False
+
+expiry_scheduler = ExpiryScheduler(
+    expire_fn=_expire_due,
+    window=settings.EXPIRY_WINDOW,
+    batch_size=settings.EXPIRY_BATCH_SIZE,
+    concurrency=settings.EXPIRY_CONCURRENCY,
+    retry_seconds=settings.EXPIRY_RETRY_SECONDS
 )
-from xrpl.models.requests import AccountTx, AMMInfo, Tx, AccountLines
-from xrpl.models.currencies import XRP, IssuedCurrency
-from xrpl.models import NFTokenBurn as NFTokenBurnTransaction, AccountInfo
-from xrpl.utils import xrp_to_drops
-from xrpl.wallet import Wallet
+add_product_listener(expiry_scheduler.on_product_change)
+
+# Validated burns of our recycling NFTs, recorded from the ledger stream
+def _settle_burn(burn: dict):
+    """BURN_AUTO_SETTLE: queue the recycle as soon as the burn validates"""
+    if not settings.BURN_AUTO_SETTLE or burn["burner"] == get_recyclefi_wallet().classic_address:
+        return
+    product = get_product_by_nft_id(burn["nft_id"])
+    request = RecycleRequest(
+        nft_id=burn["nft_id"],
+        user_wallet=burn["burner"],
+        burn_tx_hash=burn["tx_hash"],
+        product_id=product.id if product else None
+    )
+    job_queue.submit("recycle", lambda: run_recycle(request))
 
-from xrpl_helpers import client, RECYCLEFI, create_recyclable_item_v3
-from config import settings
+burn_watcher = BurnWatcher(
+    account_fn=lambda: get_recyclefi_wallet().classic_address,
+    taxons=settings.BURN_WATCH_TAXONS,
+    on_burn=_settle_burn,
+    reconnect_seconds=settings.BURN_WATCHER_RECONNECT_SECONDS
+)
 
 # Fee constants (should be moved to config.py)
 MANUFACTURER_DEPOSIT_PERCENT = 5.0
@@ -79,18 +121,50 @@ APY_ECO_FUND_SHARE = 0.20    # 20% to ecological fund
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle - startup and shutdown"""
-    print("=" * 60)
-    print("CYCLR Backend Starting - Circular Economy Platform")
-    print(f"XRPL Network: {settings.RPC_URL}")
-    print(f"CYCLR Wallet: {settings.CYCLR_WALLET}")
-    print(f"CUSD Issuer: {settings.CUSD_ISSUER}")
-    print(f"Fee Structure:")
-    print(f"  - Manufacturer deposit: {MANUFACTURER_DEPOSIT_PERCENT}%")
-    print(f"  - Customer escrow: {CUSTOMER_ESCROW_PERCENT}%")
-    print(f"  - CYCLR fee on sale: {CYCLR_FEE_PERCENT}%")
-    print("=" * 60)
+    # The log writer thread lives as long as the app (importing main starts nothing)
+    setup_logging()
+    logger.info("CYCLR backend starting", extra={
+        "xrpl_network": settings.RPC_URL,
+        "cyclr_wallet": settings.CYCLR_WALLET,
+        "cusd_issuer": settings.CUSD_ISSUER,
+        "manufacturer_deposit_percent": MANUFACTURER_DEPOSIT_PERCENT,
+        "customer_escrow_percent": CUSTOMER_ESCROW_PERCENT,
+        "cyclr_fee_percent": CYCLR_FEE_PERCENT,
+    })
+
+    # Nothing is opened or derived at import: database, wallets and the
+    # XRPL client are created here (and fail here if misconfigured)
+    db.connect()
+    get_recyclefi_wallet()
+    xrpl_service.load()
+
+    # Catch the NFT → deposit index up with anything deposited while we were down
+    async def _backfill():
+        try:
+            indexed = await backfill_deposit_index()
+            logger.info("Deposit index backfill complete", extra={"deposits_indexed": indexed})
+        except Exception as e:
+            logger.warning("Deposit index backfill failed", extra={"error": str(e)})
+    backfill_task = asyncio.create_task(_backfill())
+    catalog.load()
+    logger.info("Catalog loaded", extra={"products": len(catalog), "kib": catalog.nbytes() // 1024})
+    job_queue.start()
+    if settings.EXPIRY_SCHEDULER_ENABLED:
+        expiry_scheduler.start()
+    if settings.BURN_WATCHER_ENABLED:
+        burn_watcher.start()
+
     yield
-    print("CYCLR Backend Shutting Down")
+    await burn_watcher.stop()
+    await expiry_scheduler.stop()
+    if xrpl_service.amm_batcher:
+        await xrpl_service.amm_batcher.flush()
+    await job_queue.stop()
+    backfill_task.cancel()
+    qr_service.shutdown()
+    await close_client()
+    logger.info("CYCLR backend shutting down")
+    shutdown_logging()
     
 
 CUSD_HEX = "4355534400000000000000000000000000000000"  # CUSD
@@ -114,6 +188,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@lru_cache(maxsize=1)
+def fallback_company_wallet() -> str:
+    """Company address used until deposits record it (derived once, not per recycle)"""
+    return Wallet.from_seed("sEd71jnhCy64g8kpBYzkfddYfRyQCHZ").classic_address
+
 
 class BurnClaimRequest(BaseModel):
     nft_id: str           # Full NFTokenID (e.g. 000813...)
@@ -131,9 +213,10 @@ async def redeem_expired_nft(
 ):
     nft_id = nft_id.strip().upper()
     company_wallet = company_wallet.strip()
+    client = get_client()
+    recyclefi = get_recyclefi_wallet()
 
-    print(f"\n[REDEEM-EXPIRED] Triggered for NFT: ...{nft_id[-12:]}")
-    print(f"               Company wallet: {company_wallet}")
+    logger.debug("Redeem expired NFT", extra={"nft_id": nft_id, "company_wallet": company_wallet})
 
     # Find deposit via memo
     deposit = await find_deposit_by_nft_id(nft_id)
@@ -141,13 +224,11 @@ async def redeem_expired_nft(
         raise HTTPException(404, "No AMM deposit found for this NFT")
 
     # Get AMM info
-    amm_info = await client.request(AMMInfo(asset=XRP_ASSET, asset2=CUSD_ASSET))
-    amm = amm_info.result["amm"]
+    amm = await xrpl_service.get_amm_state()
     lp_token = amm["lp_token"]
-    print(f"[REDEEM] LP Token: {lp_token['currency']} from {lp_token['issuer'][:8]}...")
 
     # Get LP balance
-    lines = await client.request(AccountLines(account=RECYCLEFI.classic_address))
+    lines = await client.request(AccountLines(account=recyclefi.classic_address))
     lp_balance = 0.0
     for line in lines.result.get("lines", []):
         if line.get("currency") == lp_token["currency"] and line.get("account") == lp_token["issuer"]:
@@ -156,39 +237,35 @@ async def redeem_expired_nft(
 
     if lp_balance <= 0:
         raise HTTPException(400, "No LP tokens")
-    print(f"[REDEEM] Withdrawing {lp_balance:.6f} LP tokens...")
+    logger.debug("Redeem: withdrawing LP tokens", extra={"nft_id": nft_id, "lp_tokens": lp_balance})
 
     # === CORRECT FIELD NAME FOR xrpl-py 4.3.1 ===
     try:
         withdraw_tx = AMMWithdraw(
-            account=RECYCLEFI.classic_address,
+            account=recyclefi.classic_address,
             asset=XRP_ASSET,
             asset2=CUSD_ASSET,
             lp_token_in=IssuedCurrencyAmount(  # ← THIS IS THE ONE THAT WORKS
                 currency=lp_token["currency"],
                 issuer=lp_token["issuer"],
-                value=str(lp_balance)
+                value=iou_value(lp_balance)
             ),
             flags=AMMWithdrawFlag.TF_WITHDRAW_ALL
         )
 
-        before = await client.request(AccountInfo(account=RECYCLEFI.classic_address))
-        before_xrp = int(before.result["account_data"]["Balance"]) / 1_000_000
-
-        signed = sign(await autofill(withdraw_tx, client), RECYCLEFI)
-        result = await submit_and_wait(signed, client)
+        result = await submit_tx(withdraw_tx, client, recyclefi)
 
         if result.result["meta"]["TransactionResult"] != "tesSUCCESS":
             raise Exception(result.result["meta"]["TransactionResult"])
 
-        await asyncio.sleep(5)
-        after = await client.request(AccountInfo(account=RECYCLEFI.classic_address))
-        after_xrp = int(after.result["account_data"]["Balance"]) / 1_000_000
-        received_xrp = after_xrp - before_xrp
+        # Withdrawn amount straight from the AMMWithdraw metadata
+        received_xrp = xrp_received(result.result, recyclefi.classic_address)
 
-        print(f"[REDEEM] SUCCESS! Received {received_xrp:.4f} XRP")
+        logger.info("Redeem withdrawal complete", extra={
+            "nft_id": nft_id, "xrp_received": received_xrp, "tx_hash": result.result.get("hash")
+        })
     except Exception as e:
-        print(f"[REDEEM] WITHDRAW FAILED: {e}")
+        logger.warning("Redeem withdrawal failed", extra={"nft_id": nft_id, "error": str(e)})
         raise HTTPException(500, f"Withdraw failed: {e}")
 
     # Distribute 80/20
@@ -197,62 +274,55 @@ async def redeem_expired_nft(
 
     async def pay(to, amt, label):
         if amt < 0.0001: return None
-        tx = Payment(account=RECYCLEFI.classic_address, destination=to, amount=xrp_to_drops(amt))
-        signed = sign(await autofill(tx, client), RECYCLEFI)
-        resp = await submit_and_wait(signed, client)
+        if to == recyclefi.classic_address: return None  # protocol share stays in the wallet
+        tx = Payment(account=recyclefi.classic_address, destination=to, amount=xrp_to_drops(amt))
+        resp = await submit_tx(tx, client, recyclefi)
         h = resp.result["hash"]
-        print(f"   → {label}: {amt:.4f} XRP → {h[:10]}...")
+        logger.debug("Redeem payout", extra={"nft_id": nft_id, "to": label, "xrp": amt, "tx_hash": h})
         return h
 
     await pay(company_wallet, company_share, "Company 80%")
-    await pay(RECYCLEFI.classic_address, protocol_share, "RecycleFi 20%")
+    await pay(recyclefi.classic_address, protocol_share, "RecycleFi 20%")
 
     return {"success": True, "withdrawn_xrp": round(received_xrp, 4), "company_80%": round(company_share, 4)}
 
 async def find_deposit_by_nft_id(nft_id: str) -> dict | None:
-    """Find AMMDeposit that contains this NFT ID in its memo"""
+    """Find the AMMDeposit that locked this NFT's funds (indexed by NFT ID)"""
+    deposit = deposit_index.get(nft_id)
+    if deposit:
+        return deposit
+
+    # Not indexed yet (e.g. deposited by another worker) — catch up from the last indexed ledger
     try:
-        resp = await client.request(AccountTx(
-            account=RECYCLEFI.classic_address,
-            limit=1000
-        ))
-    except:
+        await backfill_deposit_index()
+    except Exception as e:
+        logger.warning("Deposit index backfill failed", extra={"nft_id": nft_id, "error": str(e)})
         return None
-
-    target_hex = nft_id.upper().encode("utf-8").hex().upper()
-
-    for entry in resp.result["transactions"]:
-        tx = entry.get("tx") or entry.get("tx_json", {})
-        meta = entry.get("meta", {})
-
-        if tx.get("TransactionType") != "AMMDeposit":
-            continue
-        if meta.get("TransactionResult") != "tesSUCCESS":
-            continue
-
-        for memo in tx.get("Memos", []):
-            data = memo["Memo"].get("MemoData", "").upper()
-            if data == target_hex:
-                return {
-                    "tx": tx,
-                    "meta": meta,
-                    "amm_account": meta.get("amm_account")
-                }
-    return None
+    return deposit_index.get(nft_id)
 
 
 async def get_lp_balance() -> float:
     try:
-        info = await client.request(AMMInfo(asset=XRP_ASSET, asset2=CUSD_ASSET))
-        lp_token = info.result["amm"]["lp_token"]
+        amm = await xrpl_service.get_amm_state()
+        lp_token = amm["lp_token"]
         for bal in lp_token.get("balance", []):
-            if bal["account"] == RECYCLEFI.classic_address:
+            if bal["account"] == get_recyclefi_wallet().classic_address:
                 return float(bal["value"])
         return 0.0
     except Exception as e:
-        print(f"AMMInfo failed: {e}")
+        logger.warning("AMMInfo failed", extra={"error": str(e)})
         return 0.0
 
+def job_accepted(job: JobResponse) -> JSONResponse:
+    """202 response for a request handed to the background workers"""
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status.value,
+        "status_url": f"/api/v1/jobs/{job.id}",
+        "events_url": f"/api/v1/jobs/{job.id}/events"
+    })
+
+
 @app.post("/api/v1/purchase")
 async def process_circular_purchase(
     product_name: str = Form("Eco Bottle"),
@@ -260,8 +330,35 @@ async def process_circular_purchase(
     deposit_percent: float = Form(6.0),
     company_wallet: str = Form(...),
     consumer_wallet: str = Form(...),
-    metadata: Optional[str] = Form(None)
+    metadata: Optional[str] = Form(None),
+    async_mode: bool = Form(False)
 ):
+    if not async_mode:
+        return await run_purchase(product_name, price_xrp, deposit_percent, company_wallet, consumer_wallet)
+
+    # Validate up front so bad requests still fail synchronously
+    if price_xrp <= 0:
+        raise HTTPException(400, "price_xrp must be positive")
+    if not 0 < deposit_percent < 100:
+        raise HTTPException(400, "deposit_percent must be between 0 and 100")
+    for label, address in (("company_wallet", company_wallet), ("consumer_wallet", consumer_wallet)):
+        if not is_valid_classic_address(address.strip()):
+            raise HTTPException(400, f"Invalid {label}: {address}")
+
+    job = job_queue.submit("purchase", lambda: run_purchase(
+        product_name, price_xrp, deposit_percent, company_wallet.strip(), consumer_wallet.strip()
+    ))
+    return job_accepted(job)
+
+
+async def run_purchase(
+    product_name: str,
+    price_xrp: float,
+    deposit_percent: float,
+    company_wallet: str,
+    consumer_wallet: str
+) -> dict:
+    """Mint, deposit, pay the company and render the QR (the /purchase steps)"""
     item = await create_recyclable_item_v3(
         product_name=product_name,
         price_xrp=price_xrp,
@@ -271,14 +368,14 @@ async def process_circular_purchase(
     )
 
     # Pay company 93% instantly
+    recyclefi = get_recyclefi_wallet()
     company_share = price_xrp * 0.93
     pay_tx = Payment(
-        account=RECYCLEFI.classic_address,
+        account=recyclefi.classic_address,
         destination=company_wallet,
         amount=xrp_to_drops(company_share)
     )
-    signed = sign(await autofill(pay_tx, client), RECYCLEFI)
-    await submit_and_wait(signed, client)
+    await submit_tx(pay_tx, get_client(), recyclefi)
 
     return {
         "success": True,
@@ -293,14 +390,15 @@ async def process_circular_purchase(
         "burn_to_claim": True
     }
 
+def days_until_expiry(product: Product) -> Optional[int]:
+    if not product.expires_at:
+        return None
+    return max(0, (product.expires_at - datetime.now(timezone.utc)).days)
+
+
 def product_to_response(product: Product) -> ProductResponse:
     """Convert Product model to ProductResponse"""
-    # Calculate days until expiry
-    days_until_expiry = None
-    if product.expires_at:
-        days = (product.expires_at - datetime.now(timezone.utc)).days
-        days_until_expiry = max(0, days)
-    
+    estimated_value, estimated_apy = yield_estimator.estimate(product.id)
     return ProductResponse(
         id=product.id,
         name=product.name,
@@ -328,7 +426,7 @@ def product_to_response(product: Product) -> ProductResponse:
         sold_at=product.sold_at,
         expires_at=product.expires_at,
         recycled_at=product.recycled_at,
-        days_until_expiry=days_until_expiry,
+        days_until_expiry=days_until_expiry(product),
         
         # Rewards
         total_withdrawn=product.total_withdrawn,
@@ -337,14 +435,44 @@ def product_to_response(product: Product) -> ProductResponse:
         manufacturer_received=product.manufacturer_received,
         recycler_received=product.recycler_received,
         eco_fund_received=product.eco_fund_received,
-        cyclr_received=product.cyclr_received
+        cyclr_received=product.cyclr_received,
+        
+        # Live estimate (active products, from the last pool snapshot)
+        estimated_current_value=estimated_value,
+        estimated_apy=estimated_apy
     )
 
 
+# Encoded ProductResponse, reused until the product changes, a day
+# passes or its yield estimate moves
+product_encoding = ProductEncodingCache(
+    build=product_to_response,
+    stamp=lambda product: (days_until_expiry(product), yield_estimator.estimate(product.id)),
+    max_size=settings.PRODUCT_ENCODING_CACHE_SIZE
+)
+add_product_listener(product_encoding.forget)
+
+# Columnar view of every product for totals and counts (filled in lifespan)
+catalog = ProductCatalog()
+add_product_listener(catalog.upsert)
+
+# estimated_current_value / estimated_apy of every active product in one
+# pass per pool snapshot; refreshed before products are served
+yield_estimator = YieldEstimator(catalog, xrpl_service.get_amm_state)
+
+
 # ========================================
 # HEALTH & INFO ENDPOINTS
 # ========================================
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(404, "Metrics disabled")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/api/v1/health", response_model=HealthResponse)
 async def health_check():
     """Check API health and XRPL connection"""
@@ -369,12 +497,41 @@ async def get_amm_info():
             error=amm_info.get("error", "AMM not available")
         )
     
+    in_pool = (ProductStatus.REGISTERED, ProductStatus.SOLD)
     return AMMInfoResponse(
         success=True,
         amm_account=amm_info.get("amm_account"),
         xrp_pool=amm_info.get("xrp_pool", 0),
         cusd_pool=amm_info.get("cusd_pool", 0),
-        trading_fee_percent=amm_info.get("trading_fee", 0)
+        trading_fee_percent=amm_info.get("trading_fee", 0),
+        total_products_in_pool=catalog.count(in_pool),
+        total_value_locked=round(catalog.total("total_in_amm", in_pool), 6)
+    )
+
+
+@app.get("/api/v1/stats", response_model=PlatformStatsResponse)
+async def get_platform_stats():
+    """
+    Product counts, value locked and settlements per case (running
+    aggregates, no scan). CASE C counts recycled unsold products and
+    manufacturer recalls.
+    """
+    in_pool = (ProductStatus.REGISTERED, ProductStatus.SOLD)
+    cases = {}
+    for case in sorted(set(CASES.values())):
+        totals = catalog.case_totals(case, ("total_withdrawn", "apy_earned"))
+        cases[case] = CaseTotals(
+            count=totals["count"],
+            total_withdrawn=round(totals["total_withdrawn"], 6),
+            apy_earned=round(totals["apy_earned"], 6)
+        )
+    
+    return PlatformStatsResponse(
+        total_products=catalog.count(),
+        products_by_status={status.value: catalog.count([status]) for status in ProductStatus},
+        total_value_locked=round(catalog.total("total_in_amm", in_pool), 6),
+        lp_tokens_outstanding=round(catalog.total("total_lp_tokens", in_pool), 6),
+        cases=cases
     )
 
 
@@ -385,10 +542,50 @@ async def get_wallet_balance(address: str):
     return balance
 
 
+@app.post("/api/v1/wallets/balances", response_model=WalletBalancesResponse)
+async def get_wallet_balances(request: WalletBalancesRequest):
+    """
+    Balances of many wallets (XRP and CUSD), read from the last validated
+    ledger. Accounts are read concurrently, trust lines are followed past
+    the first page, and a missing account gets an error entry of its own.
+    """
+    if not request.addresses:
+        raise HTTPException(status_code=400, detail="No addresses given")
+    if len(request.addresses) > settings.BALANCE_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.BALANCE_BATCH_MAX} addresses per request"
+        )
+    addresses = [address.strip() for address in request.addresses]
+    invalid = [address for address in addresses if not is_valid_classic_address(address)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid addresses: {', '.join(invalid[:10])}")
+    
+    return {"balances": await xrpl_service.get_balances(addresses)}
+
+
 # ========================================
 # STEP 1: MANUFACTURER REGISTRATION
 # ========================================
 
+def new_product(item: Union[RegisterProductRequest, BatchProductItem], manufacturer_wallet: str) -> Product:
+    """Product record for a registration, with the manufacturer's 5% deposit"""
+    manufacturer_deposit = item.price * (MANUFACTURER_DEPOSIT_PERCENT / 100)
+    
+    product = Product(
+        name=item.name,
+        description=item.description,
+        serial_number=item.serial_number,
+        price=item.price,
+        manufacturer_deposit=manufacturer_deposit,
+        total_in_amm=manufacturer_deposit,
+        manufacturer_wallet=manufacturer_wallet
+    )
+    # Unsold products expire too (CASE D); the sale restarts the clock
+    product.expires_at = product.created_at + timedelta(days=EXPIRY_YEARS * 365)
+    return product
+
+
 @app.post("/api/v1/products/register", response_model=ProductResponse)
 async def register_product(request: RegisterProductRequest):
     """
@@ -403,20 +600,9 @@ async def register_product(request: RegisterProductRequest):
     - Manufacturer deposit = 50 CUSD (5%)
     - Deposit goes to AMM → earns APY
     """
-    
-    # Calculate manufacturer deposit
-    manufacturer_deposit = request.price * (MANUFACTURER_DEPOSIT_PERCENT / 100)
-    
-    # Create product record
-    product = Product(
-        name=request.name,
-        description=request.description,
-        serial_number=request.serial_number,
-        price=request.price,
-        manufacturer_deposit=manufacturer_deposit,
-        total_in_amm=manufacturer_deposit,
-        manufacturer_wallet=request.manufacturer_wallet
-    )
+    started = time.perf_counter()
+    product = new_product(request, request.manufacturer_wallet)
+    manufacturer_deposit = product.manufacturer_deposit
     
     # Deposit manufacturer's 5% to AMM
     amm_result = await xrpl_service.deposit_to_amm(
@@ -431,18 +617,92 @@ async def register_product(request: RegisterProductRequest):
         product.registration_tx = amm_result.get("tx_hash")
     else:
         # Log error but still create product
-        print(f"⚠️ AMM deposit failed: {amm_result.get('error')}")
+        logger.warning("AMM deposit failed", extra={"product_id": product.id, "error": amm_result.get("error")})
     
     # Save product
     save_product(product)
     
-    print(f"✅ Product registered: {product.name} (ID: {product.id})")
-    print(f"   Price: {product.price} CUSD")
-    print(f"   Manufacturer deposit: {manufacturer_deposit} CUSD → AMM")
+    logger.info("Product registered", extra={
+        "product_id": product.id,
+        "price": product.price,
+        "manufacturer_deposit": manufacturer_deposit,
+        "tx_hash": product.registration_tx,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
     
     return product_to_response(product)
 
 
+@app.post("/api/v1/products/register/batch", response_model=ProductBatchResponse, response_class=RawJSONResponse)
+async def register_products_batch(request: RegisterProductBatchRequest):
+    """
+    STEP 1 for a whole production run.
+    
+    The manufacturer's 5% deposits are summed and sent as one AMMDeposit
+    per REGISTER_BATCH_CHUNK products instead of one per product. The LP
+    tokens of each deposit are split across its products in proportion
+    to their deposit.
+    """
+    if not request.products:
+        raise HTTPException(status_code=400, detail="No products given")
+    if len(request.products) > settings.REGISTER_BATCH_MAX:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.REGISTER_BATCH_MAX} products per batch"
+        )
+    
+    products = [new_product(item, request.manufacturer_wallet) for item in request.products]
+    chunks = [
+        products[i:i + settings.REGISTER_BATCH_CHUNK]
+        for i in range(0, len(products), settings.REGISTER_BATCH_CHUNK)
+    ]
+    
+    async def deposit(chunk: List[Product]) -> BatchDeposit:
+        total = sum(p.manufacturer_deposit for p in chunk)
+        amm_result = await xrpl_service.deposit_to_amm(
+            cusd_amount=total,
+            product_id=f"batch:{chunk[0].id}+{len(chunk) - 1}",
+            deposit_type="manufacturer"
+        )
+        if not amm_result.get("success"):
+            # Like single registration: log it and still create the products
+            logger.warning("AMM batch deposit failed", extra={
+                "product_id": chunk[0].id, "products": len(chunk), "error": amm_result.get("error")
+            })
+            return BatchDeposit(
+                success=False, product_count=len(chunk), cusd_deposited=0.0,
+                error=amm_result.get("error")
+            )
+        
+        lp_tokens = amm_result.get("lp_tokens_received", 0)
+        assigned = 0.0
+        for i, product in enumerate(chunk):
+            if i == len(chunk) - 1:
+                share = lp_tokens - assigned     # remainder, so the shares add up exactly
+            else:
+                share = lp_tokens * product.manufacturer_deposit / total if total else 0.0
+            assigned += share
+            product.manufacturer_lp_tokens = share
+            product.total_lp_tokens = share
+            product.registration_tx = amm_result.get("tx_hash")
+        
+        return BatchDeposit(
+            success=True, tx_hash=amm_result.get("tx_hash"), product_count=len(chunk),
+            cusd_deposited=total, lp_tokens_received=lp_tokens
+        )
+    
+    deposits = await asyncio.gather(*(deposit(chunk) for chunk in chunks))
+    save_products(products)
+    
+    logger.info("Product batch registered", extra={"products": len(products), "amm_deposits": len(chunks)})
+    
+    return RawJSONResponse(
+        b'{"registered":' + str(len(products)).encode()
+        + b',"deposits":[' + b",".join(d.model_dump_json().encode() for d in deposits)
+        + b'],"products":' + product_encoding.encode_list(products) + b"}"
+    )
+
+
 # ========================================
 # STEP 2: SALE
 # ========================================
@@ -464,7 +724,7 @@ async def sell_product(product_id: str, request: SellProductRequest):
     - Manufacturer receives: 990 CUSD (99% of 1000)
     - Customer escrow to AMM: 50 CUSD (5% of 1000)
     """
-    
+    started = time.perf_counter()
     product = get_product(product_id)
     
     if not product:
@@ -493,7 +753,6 @@ async def sell_product(product_id: str, request: SellProductRequest):
     product.total_in_amm = product.manufacturer_deposit + customer_escrow
     product.sold_at = datetime.now(timezone.utc)
     # Set expiry to 6 years from now
-    from models import EXPIRY_YEARS
     product.expires_at = datetime.now(timezone.utc) + timedelta(days=EXPIRY_YEARS * 365)
     
     # Deposit customer's escrow to AMM
@@ -507,18 +766,24 @@ async def sell_product(product_id: str, request: SellProductRequest):
         product.customer_lp_tokens = amm_result.get("lp_tokens_received", 0)
         product.total_lp_tokens = product.manufacturer_lp_tokens + product.customer_lp_tokens
         product.sale_deposit_tx = amm_result.get("tx_hash")
+    else:
+        logger.warning("AMM deposit failed", extra={"product_id": product.id, "error": amm_result.get("error")})
     
     # Pay manufacturer (99% of price)
     # In production: await xrpl_service.pay_manufacturer(...)
     
     update_product(product)
     
-    print(f"✅ Product sold: {product.name}")
-    print(f"   Customer: {request.customer_wallet}")
-    print(f"   Customer paid: {total_customer_pays} CUSD")
-    print(f"   CYCLR fee: {cyclr_fee} CUSD")
-    print(f"   Manufacturer receives: {manufacturer_payment} CUSD")
-    print(f"   Customer escrow to AMM: {customer_escrow} CUSD")
+    logger.info("Product sold", extra={
+        "product_id": product.id,
+        "customer_wallet": request.customer_wallet,
+        "customer_paid": total_customer_pays,
+        "cyclr_fee": cyclr_fee,
+        "manufacturer_payment": manufacturer_payment,
+        "customer_escrow": customer_escrow,
+        "tx_hash": product.sale_deposit_tx,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
     
     return product_to_response(product)
 
@@ -527,30 +792,91 @@ async def sell_product(product_id: str, request: SellProductRequest):
 # PRODUCT QUERIES
 # ========================================
 
-@app.get("/api/v1/products", response_model=List[ProductResponse])
+def parse_status(status: Optional[str]) -> Optional[ProductStatus]:
+    """?status= filter shared by the listing endpoints"""
+    if not status:
+        return None
+    try:
+        return ProductStatus(status)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+
+
+def product_pages(product_status: Optional[ProductStatus]):
+    """Products in created_at order, loaded PRODUCT_PAGE_MAX at a time"""
+    after_id = None
+    while True:
+        products = get_products_page(product_status, after_id, settings.PRODUCT_PAGE_MAX)
+        if products:
+            yield products
+        if len(products) < settings.PRODUCT_PAGE_MAX:
+            return
+        after_id = products[-1].id
+
+
+@app.get("/api/v1/products", response_model=List[ProductResponse], response_class=RawJSONResponse)
 async def list_products(status: Optional[str] = None):
     """List all products, optionally filtered by status"""
-    if status:
-        try:
-            product_status = ProductStatus(status)
-            products = get_products_by_status(product_status)
-        except ValueError:
-            raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
-    else:
-        products = get_all_products()
+    product_status = parse_status(status)
+    await yield_estimator.refresh()
+    
+    # Only one page of Product objects is alive at a time
+    async def body():
+        yield b"["
+        first = True
+        for products in product_pages(product_status):
+            yield (b"" if first else b",") + product_encoding.encode_list(products)[1:-1]
+            first = False
+        yield b"]"
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.get("/api/v1/products/page", response_model=ProductPageResponse, response_class=RawJSONResponse)
+async def list_products_page(
+    status: Optional[str] = None,
+    after_id: Optional[str] = None,
+    limit: int = Query(settings.PRODUCT_PAGE_SIZE, ge=1, le=settings.PRODUCT_PAGE_MAX)
+):
+    """
+    Cursor-paginated listing, oldest first.
+    Pass the returned next_cursor as after_id; it is null on the last page.
+    """
+    await yield_estimator.refresh()
+    products = get_products_page(parse_status(status), after_id, limit)
+    if products is None:
+        raise HTTPException(status_code=400, detail=f"Unknown cursor: {after_id}")
+    
+    next_cursor = products[-1].id if len(products) == limit else None
+    return RawJSONResponse(
+        b'{"items":' + product_encoding.encode_list(products)
+        + b',"next_cursor":' + encode_cursor(next_cursor) + b"}"
+    )
+
+
+@app.get("/api/v1/products/stream")
+async def stream_products(status: Optional[str] = None):
+    """Every product as NDJSON (one ProductResponse per line), read page by page"""
+    product_status = parse_status(status)
+    await yield_estimator.refresh()
     
-    return [product_to_response(p) for p in products]
+    async def lines():
+        for products in product_pages(product_status):
+            yield product_encoding.encode_lines(products)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
-@app.get("/api/v1/products/{product_id}", response_model=ProductResponse)
+@app.get("/api/v1/products/{product_id}", response_model=ProductResponse, response_class=RawJSONResponse)
 async def get_product_details(product_id: str):
     """Get product details with current APY estimate"""
+    await yield_estimator.refresh()
     product = get_product(product_id)
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    return product_to_response(product)
+    return RawJSONResponse(product_encoding.encode(product))
 
 
 # ========================================
@@ -563,11 +889,29 @@ class RecycleRequest(BaseModel):
     """Unified request model for recycling"""
     nft_id: str
     user_wallet: str  # Can be recycler or customer
-    burn_tx_hash: str
+    burn_tx_hash: Optional[str] = None  # Optional when the burn watcher runs: the burn is found by NFT ID
     product_id: Optional[str] = None  # Optional: for product lifecycle tracking
+    async_mode: bool = False  # True = answer 202 with a job ID, settle in the background
 
 @app.post("/api/v1/recycle")
 async def recycle_product_unified(request: RecycleRequest):
+    """Recycle claim - synchronous by default, or queued as a job with async_mode"""
+    if not request.async_mode:
+        return await run_recycle(request)
+
+    # Validate up front so bad requests still fail synchronously
+    if not is_valid_classic_address(request.user_wallet.strip()):
+        raise HTTPException(400, f"Invalid user_wallet: {request.user_wallet}")
+    if len(request.nft_id.strip()) != 64 or (request.burn_tx_hash and len(request.burn_tx_hash.strip()) != 64):
+        raise HTTPException(400, "nft_id and burn_tx_hash must be 64 hex characters")
+    if request.product_id and not get_product(request.product_id):
+        raise HTTPException(404, "Product not found")
+
+    job = job_queue.submit("recycle", lambda: run_recycle(request))
+    return job_accepted(job)
+
+
+async def run_recycle(request: RecycleRequest) -> dict:
     """
     UNIFIED RECYCLE ENDPOINT
     
@@ -576,7 +920,8 @@ async def recycle_product_unified(request: RecycleRequest):
     2. Product lifecycle tracking (CYCLR business logic)
     
     Process:
-    1. Verify burn transaction on XRPL
+    1. Verify the burn (recorded by the burn watcher, or looked up by hash)
+       and claim its reward
     2. Withdraw LP tokens from AMM
     3. Distribute rewards (70% recycler, 20% company, 10% protocol)
     4. Update product record if product_id provided
@@ -584,48 +929,64 @@ async def recycle_product_unified(request: RecycleRequest):
     
     nft_id = request.nft_id.strip().upper()
     user_wallet = request.user_wallet.strip()
-    burn_hash = request.burn_tx_hash.strip()
+    burn_hash = (request.burn_tx_hash or "").strip().upper()
+    client = get_client()
+    recyclefi = get_recyclefi_wallet()
+    started = time.perf_counter()
+    fields = {"nft_id": nft_id, "user_wallet": user_wallet, "burn_tx_hash": burn_hash}
 
-    print(f"\n{'='*60}")
-    print(f"[RECYCLE] Processing claim for NFT ...{nft_id[-10:]}")
-    print(f"[RECYCLE] Recycler: {user_wallet}")
-    print(f"[RECYCLE] Burn TX: {burn_hash[:10]}...")
-    print(f"{'='*60}")
+    logger.debug("Recycle claim received", extra=fields)
 
     # ========================================
     # STEP 1: VERIFY BURN TRANSACTION
     # ========================================
     try:
-        tx_resp = await client.request(Tx(transaction=burn_hash))
-        tx = tx_resp.result
+        # Already recorded by the burn watcher, else looked up by hash. Only a
+        # claim without a hash, for one of our NFTs, waits for the stream
+        # (the burn may not have validated yet)
+        burn = burn_index.get(nft_id)
+        if burn is None and burn_hash:
+            burn = await burn_watcher.lookup(burn_hash)
+        elif burn is None and burn_watcher.watches(nft_id):
+            burn = await burn_watcher.wait_for(nft_id, settings.BURN_WAIT_SECONDS)
 
         # Critical validations only
-        if not tx.get("validated", False):
-            raise ValueError("Transaction not confirmed on ledger")
+        if burn is None:
+            raise ValueError("No validated burn found for this NFT")
 
-        if tx.get("NFTokenID", "").upper() != nft_id:
-            raise ValueError(f"NFT mismatch: expected {nft_id}, got {tx.get('NFTokenID')}")
+        if burn["nft_id"] != nft_id:
+            raise ValueError(f"NFT mismatch: expected {nft_id}, got {burn['nft_id']}")
 
-        if tx.get("Account") != user_wallet:
-            raise ValueError(f"Wallet mismatch: expected {user_wallet}, got {tx.get('Account')}")
+        if burn_hash and burn["tx_hash"] != burn_hash:
+            raise ValueError(f"Burn mismatch: this NFT was burned by {burn['tx_hash']}")
 
-        print(f"[RECYCLE] ✓ Burn verified on-chain")
+        if burn["burner"] != user_wallet:
+            raise ValueError(f"Wallet mismatch: expected {user_wallet}, got {burn['burner']}")
+
+        if not burn_watcher.watches(nft_id):
+            raise ValueError("This NFT was not issued for recycling here")
+
+        burn_hash = fields["burn_tx_hash"] = burn["tx_hash"]
+        logger.debug("Recycle: burn verified", extra={**fields, "ledger_index": burn["ledger_index"]})
 
     except Exception as e:
-        print(f"[RECYCLE] ✗ Burn verification failed: {e}")
+        logger.warning("Recycle: burn verification failed", extra={**fields, "error": str(e)})
         raise HTTPException(400, f"Invalid burn transaction: {e}")
 
+    # One reward per burn (a manual claim and BURN_AUTO_SETTLE may race)
+    if not burn_index.claim(nft_id, time.time()):
+        raise HTTPException(409, "The reward for this burn was already claimed")
+
     # ========================================
     # STEP 2: WITHDRAW FROM AMM
     # ========================================
     try:
         # Get AMM info
-        amm_info = await client.request(AMMInfo(asset=XRP_ASSET, asset2=CUSD_ASSET))
-        lp_token = amm_info.result["amm"]["lp_token"]
-        print(f"[RECYCLE] LP Token: {lp_token['currency'][:8]}...")
+        amm = await xrpl_service.get_amm_state()
+        lp_token = amm["lp_token"]
 
         # Get current LP balance
-        lines = await client.request(AccountLines(account=RECYCLEFI.classic_address))
+        lines = await client.request(AccountLines(account=recyclefi.classic_address))
         lp_balance = 0.0
         for line in lines.result.get("lines", []):
             if (line.get("currency") == lp_token["currency"] and 
@@ -636,45 +997,40 @@ async def recycle_product_unified(request: RecycleRequest):
         if lp_balance < 0.0001:
             raise HTTPException(400, "No LP tokens available for withdrawal")
 
-        print(f"[RECYCLE] Withdrawing {lp_balance:.6f} LP tokens...")
-
-        # Record XRP before withdrawal
-        before = await client.request(AccountInfo(account=RECYCLEFI.classic_address))
-        before_xrp = int(before.result["account_data"]["Balance"]) / 1_000_000
+        logger.debug("Recycle: withdrawing LP tokens", extra={**fields, "lp_tokens": lp_balance})
 
         # Execute withdrawal
         withdraw_tx = AMMWithdraw(
-            account=RECYCLEFI.classic_address,
+            account=recyclefi.classic_address,
             asset=XRP_ASSET,
             asset2=CUSD_ASSET,
             lp_token_in=IssuedCurrencyAmount(
                 currency=lp_token["currency"],
                 issuer=lp_token["issuer"],
-                value=str(lp_balance)
+                value=iou_value(lp_balance)
             ),
             flags=AMMWithdrawFlag.TF_WITHDRAW_ALL
         )
 
-        signed = sign(await autofill(withdraw_tx, client), RECYCLEFI)
-        withdraw_result = await submit_and_wait(signed, client)
+        withdraw_result = await submit_tx(withdraw_tx, client, recyclefi)
 
         if withdraw_result.result["meta"]["TransactionResult"] != "tesSUCCESS":
             raise Exception(f"Withdrawal failed: {withdraw_result.result['meta']['TransactionResult']}")
 
-        # Wait for settlement
-        await asyncio.sleep(5)
+        # Calculate received amount from the AMMWithdraw metadata
+        received_xrp = max(0.01, xrp_received(withdraw_result.result, recyclefi.classic_address))
+        burn_index.settle(nft_id, withdraw_result.result["hash"])
 
-        # Calculate received amount
-        after = await client.request(AccountInfo(account=RECYCLEFI.classic_address))
-        after_xrp = int(after.result["account_data"]["Balance"]) / 1_000_000
-        received_xrp = max(0.01, after_xrp - before_xrp)
-
-        print(f"[RECYCLE] ✓ Withdrew {received_xrp:.4f} XRP from AMM")
+        logger.debug("Recycle: withdrawal validated", extra={
+            **fields, "xrp_received": received_xrp, "tx_hash": withdraw_result.result.get("hash")
+        })
 
     except HTTPException:
+        burn_index.release(nft_id)
         raise
     except Exception as e:
-        print(f"[RECYCLE] ✗ AMM withdrawal failed: {e}")
+        burn_index.release(nft_id)
+        logger.warning("Recycle: AMM withdrawal failed", extra={**fields, "error": str(e)})
         raise HTTPException(500, f"Withdrawal failed: {e}")
 
     # ========================================
@@ -686,46 +1042,45 @@ async def recycle_product_unified(request: RecycleRequest):
     company_wallet = None
     
     if deposit:
-        # Try to extract company wallet from memo or transaction
-        tx_data = deposit.get("tx", {})
+        # Company wallet is not stored with the deposit yet
         # You might need to adjust this based on how you store company wallet
         # For now, using a fallback
-        company_wallet = Wallet.from_seed("sEd71jnhCy64g8kpBYzkfddYfRyQCHZ").classic_address
+        company_wallet = fallback_company_wallet()
     else:
         # Fallback company wallet
-        company_wallet = Wallet.from_seed("sEd71jnhCy64g8kpBYzkfddYfRyQCHZ").classic_address
+        company_wallet = fallback_company_wallet()
 
     # Calculate distribution
     recycler_reward = received_xrp * 0.70
     company_bonus = received_xrp * 0.20
     protocol_fee = received_xrp * 0.10
 
-    print(f"[RECYCLE] Distributing rewards:")
-    print(f"          Recycler (70%): {recycler_reward:.4f} XRP")
-    print(f"          Company (20%):  {company_bonus:.4f} XRP")
-    print(f"          Protocol (10%): {protocol_fee:.4f} XRP")
+    logger.debug("Recycle: distributing rewards", extra={
+        **fields, "recycler_xrp": recycler_reward, "company_xrp": company_bonus, "protocol_xrp": protocol_fee
+    })
 
     async def pay(to: str, amount: float, label: str):
         """Helper to send payment"""
         if amount < 0.0001:
             return None
+        if to == recyclefi.classic_address:
+            return None  # Protocol fee simply stays in the RecycleFi wallet
         
         payment_tx = Payment(
-            account=RECYCLEFI.classic_address,
+            account=recyclefi.classic_address,
             destination=to,
             amount=xrp_to_drops(amount)
         )
-        signed = sign(await autofill(payment_tx, client), RECYCLEFI)
-        result = await submit_and_wait(signed, client)
+        result = await submit_tx(payment_tx, client, recyclefi)
         tx_hash = result.result["hash"]
-        print(f"          → {label}: {amount:.4f} XRP (TX: {tx_hash[:10]}...)")
+        logger.debug("Recycle payout", extra={**fields, "to": label, "xrp": amount, "tx_hash": tx_hash})
         return tx_hash
 
     # Execute payments
     tx_hashes = {}
     tx_hashes["recycler"] = await pay(user_wallet, recycler_reward, "Recycler")
     tx_hashes["company"] = await pay(company_wallet, company_bonus, "Company")
-    tx_hashes["protocol"] = await pay(RECYCLEFI.classic_address, protocol_fee, "Protocol")
+    tx_hashes["protocol"] = await pay(recyclefi.classic_address, protocol_fee, "Protocol")
 
     # ========================================
     # STEP 4: UPDATE PRODUCT RECORD (if provided)
@@ -757,17 +1112,22 @@ async def recycle_product_unified(request: RecycleRequest):
                     "status": product.status.value
                 }
                 
-                print(f"[RECYCLE] ✓ Product record updated (Case {case})")
+                fields.update(product_id=product.id, case=case)
         except Exception as e:
-            print(f"[RECYCLE] ⚠ Failed to update product record: {e}")
+            logger.warning("Recycle: failed to update product record", extra={
+                **fields, "product_id": request.product_id, "error": str(e)
+            })
             # Don't fail the entire operation if product update fails
 
     # ========================================
     # RESPONSE
     # ========================================
-    print(f"{'='*60}")
-    print(f"[RECYCLE] ✅ RECYCLING COMPLETE")
-    print(f"{'='*60}\n")
+    logger.info("Recycle complete", extra={
+        **fields,
+        "xrp_received": received_xrp,
+        "tx_hash": withdraw_result.result["hash"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
 
     return {
         "success": True,
@@ -796,6 +1156,64 @@ async def recycle_product_unified(request: RecycleRequest):
         "message": "♻️ Recycling successful! Rewards distributed."
     }
 
+# ========================================
+# QR CODES
+# ========================================
+
+@app.get("/qrcodes/{filename}")
+async def get_qr_code(filename: str):
+    """Recycle QR image (rendered on first request in lazy mode)"""
+    path = await qr_service.file_for(filename)
+    if path is None:
+        raise HTTPException(status_code=404, detail="QR code not found")
+    
+    # Content-addressed: the file for a name never changes
+    return FileResponse(
+        path,
+        media_type=QR_FORMATS[filename.rsplit(".", 1)[-1]],
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
+
+# ========================================
+# BACKGROUND JOBS (async mode)
+# ========================================
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Poll a background job"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Server-sent events: one `data:` line per job state change until it finishes"""
+    if not job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        while True:
+            changed = job_queue.change_event(job_id)
+            job = job_queue.get(job_id)
+            if job is None:
+                return
+            if job.status != last_status:
+                last_status = job.status
+                yield f"data: {job.model_dump_json()}\n\n"
+            if job.status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 # ========================================
 # CASE B & D: EXPIRE ENDPOINT
 # ========================================
@@ -822,6 +1240,12 @@ async def expire_product(product_id: str):
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    return await run_expire(product)
+
+
+async def run_expire(product: Product) -> RecycleResponse:
+    """CASE B / CASE D settlement (shared by the endpoint and the expiry scheduler)"""
+    started = time.perf_counter()
     if product.status not in [ProductStatus.REGISTERED, ProductStatus.SOLD]:
         raise HTTPException(
             status_code=400,
@@ -843,6 +1267,9 @@ async def expire_product(product_id: str):
     )
     
     if not withdraw_result.get("success"):
+        logger.warning("Expire: AMM withdrawal failed", extra={
+            "product_id": product.id, "error": withdraw_result.get("error")
+        })
         return RecycleResponse(
             success=False,
             product_id=product.id,
@@ -865,8 +1292,6 @@ async def expire_product(product_id: str):
     
     if was_sold:
         # CASE B: Sold but NOT recycled
-        print(f"📦 CASE B: Sold product expired without recycling")
-        
         # Return deposits
         distribution["manufacturer_deposit_return"] = product.manufacturer_deposit
         distribution["customer_escrow_return"] = product.customer_escrow
@@ -881,8 +1306,6 @@ async def expire_product(product_id: str):
         
     else:
         # CASE D: Not sold, expired
-        print(f"📦 CASE D: Unsold product expired")
-        
         # Return manufacturer deposit
         distribution["manufacturer_deposit_return"] = product.manufacturer_deposit
         
@@ -901,9 +1324,14 @@ async def expire_product(product_id: str):
     update_product(product)
     
     case = "B" if was_sold else "D"
-    print(f"⏰ Product expired (Case {case}): {product.name}")
-    print(f"   Total withdrawn: {total_withdrawn} CUSD")
-    print(f"   APY earned (CYCLR keeps): {apy_earned} CUSD")
+    logger.info("Product expired", extra={
+        "product_id": product.id,
+        "case": case,
+        "total_withdrawn": total_withdrawn,
+        "apy_earned": apy_earned,
+        "tx_hash": tx_hashes["withdrawal"],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
     
     return RecycleResponse(
         success=True,
@@ -961,13 +1389,18 @@ async def recall_product(product_id: str, request: RecallProductRequest):
             product.total_withdrawn = total_back
             product.apy_earned = total_back - product.manufacturer_deposit
             product.manufacturer_received = total_back
-            print(f"   Returned to manufacturer: {total_back} CUSD")
+        else:
+            logger.warning("Recall: AMM withdrawal failed", extra={
+                "product_id": product.id, "error": withdraw_result.get("error")
+            })
     
     # Update product
     product.status = ProductStatus.RECALLED
     update_product(product)
     
-    print(f"🔙 Product recalled: {product.name}")
+    logger.info("Product recalled", extra={
+        "product_id": product.id, "total_withdrawn": product.total_withdrawn
+    })
     
     return product_to_response(product)
 
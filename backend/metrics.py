@@ -0,0 +1,206 @@
+# metrics.py
+"""
+Metrics - latency histograms and counters served as Prometheus text on /metrics
+
+Small, dependency-free implementation of the three Prometheus metric
+types (counter, gauge, histogram with cumulative buckets). Everything
+runs on the event loop thread, so no locking.
+
+Exported:
+- xrpl_request_seconds{method}            every XRPL request (account_info, amm_info, tx, ...)
+- xrpl_tx_step_seconds{step,tx_type}      autofill / sign / submit / wait of submit_tx
+- xrpl_submit_and_wait_seconds{tx_type}   whole submit_tx, retries included
+- xrpl_tx_results_total{stage,result}     preliminary engine results and validated results
+- xrpl_submissions_in_flight{wallet}      submit_tx calls running per signing wallet
+- xrpl_reads_total{method,outcome}        single-flight reads: sent, shared (in flight) or cached
+- http_request_seconds{method,route}      per FastAPI route (path template, not the raw URL)
+- http_requests_total{method,route,status}
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from xrpl.asyncio.clients.client import Client
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}   # bucket counts, +Inf, sum, count
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1   # len(buckets) is the +Inf bucket
+        series[-2] += value
+        series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        for key, series in self._series.items():
+            cumulative = 0.0
+            labels = _labels(self.labelnames, key)
+            for bound, count in zip((*self.buckets, float("inf")), series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, le)} {int(cumulative)}"
+            yield f"{self.name}_sum{labels} {_number(series[-2])}"
+            yield f"{self.name}_count{labels} {int(series[-1])}"
+
+
+def render() -> str:
+    """Prometheus text exposition (format 0.0.4) of every metric"""
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+
+# ----------------------------------------
+# Metrics
+# ----------------------------------------
+
+xrpl_request_seconds = Histogram(
+    "xrpl_request_seconds", "XRPL request latency by request method", ["method"]
+)
+xrpl_tx_step_seconds = Histogram(
+    "xrpl_tx_step_seconds", "Time per submit_tx step (autofill, sign, submit, wait)", ["step", "tx_type"]
+)
+xrpl_submit_and_wait_seconds = Histogram(
+    "xrpl_submit_and_wait_seconds", "submit_tx latency until validation, retries included", ["tx_type"]
+)
+xrpl_tx_results_total = Counter(
+    "xrpl_tx_results_total", "Transaction results (preliminary engine result or validated result)", ["stage", "result"]
+)
+xrpl_submissions_in_flight = Gauge(
+    "xrpl_submissions_in_flight", "submit_tx calls in progress per signing wallet", ["wallet"]
+)
+xrpl_reads_total = Counter(
+    "xrpl_reads_total", "Single-flight reads by outcome (sent, shared, cached)", ["method", "outcome"]
+)
+http_request_seconds = Histogram(
+    "http_request_seconds", "HTTP request latency by route", ["method", "route"]
+)
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+
+
+def instrument_client(client: Client) -> Client:
+    """Time every request the client sends (wraps its _request_impl)"""
+    request_impl = client._request_impl
+
+    async def timed_request_impl(request, **kwargs):
+        method = getattr(request.method, "value", request.method)   # GenericRequest uses a str
+        with xrpl_request_seconds.time(method=method):
+            return await request_impl(request, **kwargs)
+
+    client._request_impl = timed_request_impl
+    return client
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-route latency and status counts"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_seconds.observe(time.perf_counter() - start, method=scope["method"], route=path)
+            http_requests_total.inc(method=scope["method"], route=path, status=status)
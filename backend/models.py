@@ -26,11 +26,14 @@ CASE D: NOT Sold & Expired
   - APY: 100% → CYCLR
 """
 from datetime import datetime, timezone, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from enum import Enum
 from pydantic import BaseModel, Field
 from uuid import uuid4
 
+from config import settings
+from database import BurnIndex, Database, DepositIndex, ProductStore, QRCodeIndex, to_epoch
+
 
 # Expiry period
 EXPIRY_YEARS = 6
@@ -88,11 +91,12 @@ class Product(BaseModel):
     # Dates
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     sold_at: Optional[datetime] = None
-    expires_at: Optional[datetime] = None   # 6 years from sale
+    expires_at: Optional[datetime] = None   # 6 years from registration, reset at sale
     recycled_at: Optional[datetime] = None
     
     # Status
     status: ProductStatus = ProductStatus.REGISTERED
+    version: int = 0                        # Bumped by every update_product
     
     # Rewards (filled on recycle/expire)
     total_withdrawn: float = 0.0            # Total from AMM
@@ -121,6 +125,20 @@ class RegisterProductRequest(BaseModel):
     manufacturer_wallet: str
 
 
+class BatchProductItem(BaseModel):
+    """One product of a batch registration"""
+    name: str
+    description: str = ""
+    serial_number: str = ""
+    price: float                            # Selling price in CUSD
+
+
+class RegisterProductBatchRequest(BaseModel):
+    """STEP 1 for a production run: one manufacturer, many products"""
+    manufacturer_wallet: str
+    products: List[BatchProductItem]
+
+
 class SellProductRequest(BaseModel):
     """STEP 2: Record product sale to customer"""
     product_id: str
@@ -183,9 +201,32 @@ class ProductResponse(BaseModel):
     eco_fund_received: float
     cyclr_received: float
     
-    # Estimated current value (if still in AMM)
-    estimated_current_value: float = 0.0
-    estimated_apy: float = 0.0
+    # Estimated current value (if still in AMM), see yield_estimator.py
+    estimated_current_value: float = 0.0    # CUSD a withdrawal would return now
+    estimated_apy: float = 0.0              # annualized, in percent
+
+
+class ProductPageResponse(BaseModel):
+    """One page of products; pass next_cursor as after_id for the next one"""
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
+
+
+class BatchDeposit(BaseModel):
+    """One aggregated AMM deposit of a batch registration"""
+    success: bool
+    tx_hash: Optional[str] = None
+    product_count: int
+    cusd_deposited: float
+    lp_tokens_received: float = 0.0
+    error: Optional[str] = None
+
+
+class ProductBatchResponse(BaseModel):
+    """Response after a batch registration"""
+    registered: int
+    deposits: List[BatchDeposit]
+    products: List[ProductResponse]
 
 
 class RecycleResponse(BaseModel):
@@ -200,6 +241,26 @@ class RecycleResponse(BaseModel):
     error: Optional[str] = None
 
 
+class WalletBalancesRequest(BaseModel):
+    """Balances of many wallets at once"""
+    addresses: List[str]
+
+
+class WalletBalance(BaseModel):
+    """One wallet's balances, or why they could not be read"""
+    address: str
+    xrp_balance: Optional[float] = None
+    cusd_balance: Optional[float] = None
+    rusd_balance: Optional[float] = None    # Backward compatibility
+    ledger_index: Optional[int] = None      # validated ledger they were read from
+    error: Optional[str] = None
+
+
+class WalletBalancesResponse(BaseModel):
+    """Response of /wallets/balances, in request order"""
+    balances: List[WalletBalance]
+
+
 class HealthResponse(BaseModel):
     """Health check"""
     status: str
@@ -220,41 +281,141 @@ class AMMInfoResponse(BaseModel):
     error: Optional[str] = None
 
 
+class CaseTotals(BaseModel):
+    """Products settled under one case (A-D) and what they paid out"""
+    count: int = 0
+    total_withdrawn: float = 0.0
+    apy_earned: float = 0.0
+
+
+class PlatformStatsResponse(BaseModel):
+    """Platform-wide aggregates, kept current on every product write"""
+    total_products: int
+    products_by_status: Dict[str, int]
+    total_value_locked: float               # total_in_amm of REGISTERED + SOLD products
+    lp_tokens_outstanding: float
+    cases: Dict[str, CaseTotals]            # "A" … "D" (C includes recalls)
+
+
+class JobStatus(str, Enum):
+    """Background job lifecycle (async mode of /recycle and /purchase)"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobResponse(BaseModel):
+    """Background job state, as returned by the jobs endpoints"""
+    id: str = Field(default_factory=lambda: str(uuid4()))
+    kind: str                               # "recycle" or "purchase"
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None       # HTTP status the sync endpoint would have returned
+
+
 # ========================================
-# DATABASE (In-memory, replace with real DB)
+# DATABASE (SQLite, see database.py)
 # ========================================
 
-products_db: Dict[str, Product] = {}
+db = Database(settings.DATABASE_PATH)
+product_store = ProductStore(db)
+deposit_index = DepositIndex(db)
+burn_index = BurnIndex(db)
+qr_index = QRCodeIndex(db)
+
+def _columns(product: Product) -> Dict[str, Any]:
+    """Indexed columns for a product row"""
+    return {
+        "id": product.id,
+        "status": product.status.value,
+        "manufacturer_wallet": product.manufacturer_wallet,
+        "customer_wallet": product.customer_wallet,
+        "nft_id": product.nft_id,
+        "created_at": to_epoch(product.created_at),
+        "expires_at": to_epoch(product.expires_at),
+    }
+
+
+def _load(data: str) -> Product:
+    return Product.model_validate_json(data)
+
+
+# Called with every saved/updated product (expiry scheduler, caches, ...)
+_product_listeners: List[Callable[[Product], None]] = []
+
+
+def add_product_listener(callback: Callable[[Product], None]):
+    _product_listeners.append(callback)
+
+
+def _notify(product: Product):
+    for callback in _product_listeners:
+        callback(product)
 
 
 def save_product(product: Product) -> Product:
-    products_db[product.id] = product
+    product_store.put(_columns(product), product.model_dump_json())
+    _notify(product)
     return product
 
 
+def save_products(products: List[Product]) -> List[Product]:
+    """Bulk save (one transaction)"""
+    product_store.put_many([(_columns(p), p.model_dump_json()) for p in products])
+    for product in products:
+        _notify(product)
+    return products
+
+
 def get_product(product_id: str) -> Optional[Product]:
-    return products_db.get(product_id)
+    data = product_store.get(product_id)
+    return _load(data) if data else None
 
 
 def get_all_products() -> List[Product]:
-    return list(products_db.values())
+    return [_load(d) for d in product_store.all()]
+
+
+def get_products_page(
+    status: Optional[ProductStatus], after_id: Optional[str], limit: int
+) -> Optional[List[Product]]:
+    """Keyset page ordered by created_at (None if after_id is unknown)"""
+    page = product_store.page(status.value if status else None, after_id, limit)
+    return None if page is None else [_load(d) for d in page]
 
 
 def get_products_by_status(status: ProductStatus) -> List[Product]:
-    return [p for p in products_db.values() if p.status == status]
+    return [_load(d) for d in product_store.find("status", status.value)]
+
+
+def get_products_by_manufacturer(wallet: str) -> List[Product]:
+    return [_load(d) for d in product_store.find("manufacturer_wallet", wallet)]
+
+
+def get_products_by_customer(wallet: str) -> List[Product]:
+    return [_load(d) for d in product_store.find("customer_wallet", wallet)]
+
+
+def get_product_by_nft_id(nft_id: str) -> Optional[Product]:
+    rows = product_store.find("nft_id", nft_id)
+    return _load(rows[0]) if rows else None
 
 
 def get_expired_products() -> List[Product]:
     """Get sold products past expiry date"""
     now = datetime.now(timezone.utc)
     return [
-        p for p in products_db.values()
-        if p.status == ProductStatus.SOLD
-        and p.expires_at
-        and p.expires_at < now
+        _load(d) for d in product_store.expiring_before([ProductStatus.SOLD.value], now.timestamp())
     ]
 
 
 def update_product(product: Product) -> Product:
-    products_db[product.id] = product
+    product.version += 1
+    product_store.put(_columns(product), product.model_dump_json())
+    _notify(product)
     return product
@@ -0,0 +1,125 @@
+# qr_service.py
+"""
+QR Service - renders recycle QR codes off the event loop
+
+qrcode.make() + img.save() is pure-Python CPU work plus a blocking file
+write; run inside a handler it stalls every other request. Here:
+
+- rendering runs in a thread or process pool (QR_EXECUTOR, QR_WORKERS)
+- files are named by the sha256 of the URL they encode, so the same URL
+  is rendered once and concurrent requests for it share one render
+- QR_LAZY only records digest → URL at purchase time; the image is
+  rendered by the first GET /qrcodes/{filename}
+- QR_FORMAT=svg writes a vector path instead of rasterizing a PNG
+"""
+import asyncio
+import hashlib
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import settings
+from models import qr_index
+
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+_FILENAME = re.compile(r"^QR_([0-9a-f]{64})\.(png|svg)$")
+
+
+def _render(url: str, path: str, fmt: str):
+    """Runs in the pool: encode `url` and write it atomically to `path`"""
+    import qrcode   # only the render workers need it (and PIL behind it)
+    import qrcode.image.svg
+
+    if fmt == "svg":
+        img = qrcode.make(url, image_factory=qrcode.image.svg.SvgPathImage)
+    else:
+        img = qrcode.make(url)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        img.save(f)
+    os.replace(tmp, path)
+
+
+class QRService:
+    """Content-addressed QR code files"""
+
+    def __init__(self, directory: str, fmt: str, lazy: bool, executor: str, workers: int):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported QR format: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+        self.lazy = lazy
+        self._executor_kind = executor
+        self._workers = workers
+        self._executor: Optional[Executor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self._executor_kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="qr")
+        return self._executor
+
+    @staticmethod
+    def digest(url: str) -> str:
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    def filename(self, url: str) -> str:
+        return f"QR_{self.digest(url)}.{self.fmt}"
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    async def publish(self, url: str) -> str:
+        """Make the QR for `url` available; returns its filename"""
+        filename = self.filename(url)
+        qr_index.put(self.digest(url), url)
+        if not self.lazy:
+            await self._ensure(url, filename)
+        return filename
+
+    async def file_for(self, filename: str) -> Optional[str]:
+        """Path of a published QR, rendering it first if needed (None if unknown)"""
+        match = _FILENAME.match(filename)
+        if not match:
+            return None
+        path = self.path(filename)
+        if os.path.exists(path):
+            return path
+        url = qr_index.get(match.group(1))
+        if url is None:
+            return None
+        await self._ensure(url, filename, match.group(2))
+        return path
+
+    async def _ensure(self, url: str, filename: str, fmt: Optional[str] = None):
+        path = self.path(filename)
+        if os.path.exists(path):
+            return
+        inflight = self._inflight.get(filename)
+        if inflight is None:
+            os.makedirs(self.directory, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            inflight = loop.run_in_executor(self._pool(), _render, url, path, fmt or self.fmt)
+            self._inflight[filename] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(filename, None))
+        await asyncio.shield(inflight)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global service instance
+qr_service = QRService(
+    directory=settings.QR_DIR,
+    fmt=settings.QR_FORMAT,
+    lazy=settings.QR_LAZY,
+    executor=settings.QR_EXECUTOR,
+    workers=settings.QR_WORKERS
+)
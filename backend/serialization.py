@@ -0,0 +1,78 @@
+# serialization.py
+"""
+Pre-serialized product responses
+
+Building a ProductResponse field by field and letting FastAPI validate
+and serialize it again costs more than the SQLite read behind it. The
+encoded JSON of each product is cached here and reused until the product
+changes:
+
+- key: (product.version, stamp) - update_product bumps the version;
+  the stamp covers what changes without a write (days_until_expiry
+  ticks over once a day, the yield estimate moves with the pool)
+- entries are also dropped eagerly by the product listener
+
+RawJSONResponse sends those bytes as they are, so list endpoints only
+concatenate cached documents.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional, Tuple
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from models import Product
+
+
+class RawJSONResponse(Response):
+    """Response whose body is already-encoded JSON"""
+    media_type = "application/json"
+
+    def render(self, content: bytes) -> bytes:
+        return content
+
+
+class ProductEncodingCache:
+    """LRU of product_id → (key, encoded ProductResponse)"""
+
+    def __init__(
+        self,
+        build: Callable[[Product], BaseModel],
+        stamp: Callable[[Product], Any],
+        max_size: int
+    ):
+        self.build = build
+        self.stamp = stamp
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, Any], bytes]]" = OrderedDict()
+
+    def encode(self, product: Product) -> bytes:
+        key = (product.version, self.stamp(product))
+        entry = self._entries.get(product.id)
+        if entry is not None and entry[0] == key:
+            self._entries.move_to_end(product.id)
+            return entry[1]
+
+        data = self.build(product).model_dump_json().encode()
+        self._entries[product.id] = (key, data)
+        self._entries.move_to_end(product.id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return data
+
+    def encode_list(self, products: Iterable[Product]) -> bytes:
+        return b"[" + b",".join(self.encode(p) for p in products) + b"]"
+
+    def encode_lines(self, products: Iterable[Product]) -> bytes:
+        return b"".join(self.encode(p) + b"\n" for p in products)
+
+    def forget(self, product: Product):
+        """Product listener: drop the stale encoding"""
+        self._entries.pop(product.id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+def encode_cursor(cursor: Optional[str]) -> bytes:
+    return b"null" if cursor is None else b'"' + cursor.encode() + b'"'
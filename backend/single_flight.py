@@ -0,0 +1,99 @@
+# single_flight.py
+"""
+Single-flight reads - identical concurrent XRPL reads share one request
+
+A dashboard polling /wallet/{address} made every visitor send rippled
+their own AccountInfo + AccountLines. SingleFlight keys each read by
+the request itself (method and parameters, ledger_index included):
+
+- a read that is already in flight is awaited rather than sent again
+- a successful response is reused for a short per-method TTL
+  (XRPL_READ_TTLS); methods without one are only shared while in flight
+- everything is dropped once one of our txs validates in a newer ledger,
+  so our own balances are never served from before our last write
+
+Pool state (AMMInfo) has its own per-ledger cache, see amm_cache.py.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.models.requests.request import Request
+from xrpl.models.response import Response
+
+from metrics import xrpl_reads_total
+
+
+class SingleFlight:
+    """In-flight and recently completed reads, keyed by request"""
+
+    def __init__(self, ttls: Dict[str, float], max_entries: int):
+        self.ttls = dict(ttls)
+        self.max_entries = max_entries
+
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._done: Dict[Hashable, Tuple[float, Response]] = {}   # key → (expires at, response)
+        self._ledger_index = 0
+
+    @staticmethod
+    def _key(request: Request) -> Tuple[str, str]:
+        params = request.to_dict()
+        params.pop("id", None)
+        return params["method"], json.dumps(params, sort_keys=True, default=str)
+
+    async def request(self, client: Client, request: Request, ttl: Optional[float] = None) -> Response:
+        """`request`'s response; `ttl` overrides the method's TTL"""
+        key = self._key(request)
+        method = key[0]
+
+        cached = self._done.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                xrpl_reads_total.inc(method=method, outcome="cached")
+                return cached[1]
+            del self._done[key]
+
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            xrpl_reads_total.inc(method=method, outcome="sent")
+            inflight = self._inflight[key] = asyncio.ensure_future(client.request(request))
+            if ttl is None:
+                ttl = self.ttls.get(method, 0.0)
+            inflight.add_done_callback(lambda done: self._finish(key, done, ttl))
+        else:
+            xrpl_reads_total.inc(method=method, outcome="shared")
+        # One caller giving up must not cancel the read for the others
+        return await asyncio.shield(inflight)
+
+    def _finish(self, key: Tuple[str, str], done: asyncio.Future, ttl: float):
+        if self._inflight.get(key) is not done:
+            return                          # invalidated while in flight
+        del self._inflight[key]
+        if ttl <= 0 or done.cancelled() or done.exception() is not None:
+            return
+        response = done.result()
+        if not response.is_successful():
+            return
+        if len(self._done) >= self.max_entries:
+            self._evict()
+        self._done[key] = (time.monotonic() + ttl, response)
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones down to 3/4 of the limit"""
+        now = time.monotonic()
+        self._done = {k: v for k, v in self._done.items() if v[0] > now}
+        excess = len(self._done) - self.max_entries * 3 // 4
+        for key in list(self._done)[:max(0, excess)]:
+            del self._done[key]
+
+    def observe_ledger(self, ledger_index: int):
+        """A tx of ours validated in `ledger_index`; forget reads from before it"""
+        if ledger_index > self._ledger_index:
+            self._ledger_index = ledger_index
+            self.invalidate()
+
+    def invalidate(self):
+        self._done.clear()
+        self._inflight.clear()              # callers already waiting keep their future
@@ -0,0 +1,25 @@
+# conftest.py
+"""
+Test setup - throwaway database and the in-process fake ledger
+
+Settings are read when config is first imported, so the environment is
+set here, before any test module imports the app.
+
+Run from backend/:
+    python -m pytest tests
+"""
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="cyclr-tests-")
+
+os.environ.update({
+    "DATABASE_PATH": os.path.join(_workdir, "cyclr.db"),
+    "QR_DIR": os.path.join(_workdir, "qrcodes"),
+    "XRPL_RPC_URL": "fake://tests?close=0.05",
+    "EXPIRY_SCHEDULER_ENABLED": "false",
+    "BURN_WATCHER_ENABLED": "false",
+    "LOG_LEVEL": "WARNING",
+})
+os.environ.setdefault("RECYCLEFI_SEED", "sEdTM1uX8pu2do5XvTnutH6HsouMaM2")
+os.environ.setdefault("CYCLR_WALLET_SECRET", "sEdTM1uX8pu2do5XvTnutH6HsouMaM2")
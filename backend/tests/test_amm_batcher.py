@@ -0,0 +1,87 @@
+# test_amm_batcher.py
+"""AMMBatcher netting against a simulated single-asset XLS-30 pool"""
+import asyncio
+import math
+
+import pytest
+
+from amm_batcher import AMMBatcher
+
+
+class Pool:
+    """CUSD side of an XRP/CUSD pool; single-asset deposit / withdraw math of fake_rippled"""
+
+    def __init__(self, cusd: float, lp_supply: float, trading_fee: int = 500):
+        self.cusd = cusd
+        self.lp_supply = lp_supply
+        self.trading_fee = trading_fee
+        self.txs = 0
+
+    @property
+    def fee(self) -> float:
+        return self.trading_fee / 100_000
+
+    async def deposit(self, cusd: float):
+        self.txs += 1
+        minted = self.lp_supply * (math.sqrt(1 + cusd * (1 - self.fee / 2) / self.cusd) - 1)
+        self.cusd += cusd
+        self.lp_supply += minted
+        return {"success": True, "tx_hash": f"D{self.txs}", "lp_tokens_received": minted}
+
+    async def withdraw(self, lp: float):
+        self.txs += 1
+        out = self.cusd * (1 - (1 - lp / self.lp_supply) ** 2) * (1 - self.fee / 2)
+        self.cusd -= out
+        self.lp_supply -= lp
+        return {"success": True, "tx_hash": f"W{self.txs}", "cusd_received": out}
+
+    async def state(self):
+        return {
+            "amount2": {"value": str(self.cusd)},
+            "lp_token": {"value": str(self.lp_supply)},
+            "trading_fee": self.trading_fee
+        }
+
+
+def batcher(pool: Pool) -> AMMBatcher:
+    return AMMBatcher(0.01, 100, pool.deposit, pool.withdraw, pool.state)
+
+
+async def settle(pool: Pool, deposits, withdrawals):
+    b = batcher(pool)
+    return await asyncio.gather(
+        *(b.deposit(c, f"d{i}", "manufacturer") for i, c in enumerate(deposits)),
+        *(b.withdraw(lp, f"w{i}") for i, lp in enumerate(withdrawals))
+    )
+
+
+@pytest.mark.parametrize("deposits, withdrawals", [
+    ([50.0, 80.0, 20.0], [30.0, 10.0]),         # net deposit
+    ([10.0], [60.0, 45.0]),                     # net withdrawal
+    ([50.0, 80.0, 20.0], []),                   # deposits only
+    ([], [30.0, 10.0]),                         # withdrawals only
+])
+def test_batched_grants_match_unbatched(deposits, withdrawals):
+    batched = asyncio.run(settle(Pool(100_000.0, 50_000.0), deposits, withdrawals))
+
+    alone = Pool(100_000.0, 50_000.0)
+    expected = [asyncio.run(alone.deposit(c))["lp_tokens_received"] for c in deposits]
+    expected += [asyncio.run(alone.withdraw(lp))["cusd_received"] for lp in withdrawals]
+
+    got = [r["lp_tokens_received"] for r in batched[:len(deposits)]]
+    got += [r["cusd_received"] for r in batched[len(deposits):]]
+    assert all(r["success"] and r["batch_size"] == len(batched) for r in batched)
+    assert got == pytest.approx(expected, rel=1e-3)
+
+
+def test_empty_pool_falls_back_to_one_tx_per_request():
+    pool = Pool(0.0, 0.0)
+    pool.deposit = lambda cusd: asyncio.sleep(0, {"success": True, "tx_hash": "D", "lp_tokens_received": cusd})
+    pool.withdraw = lambda lp: asyncio.sleep(0, {"success": True, "tx_hash": "W", "cusd_received": lp})
+
+    results = asyncio.run(settle(pool, [5.0, 7.0], [3.0]))
+
+    assert [r["success"] for r in results] == [True, True, True]
+    assert [r.get("lp_tokens_received") for r in results[:2]] == [5.0, 7.0]
+    assert results[2]["cusd_received"] == 3.0
+    assert [r["product_id"] for r in results] == ["d0", "d1", "w0"]
@@ -0,0 +1,45 @@
+# test_burn_watcher.py
+"""BurnWatcher.lookup (the Tx fallback)"""
+import asyncio
+
+from xrpl.core.addresscodec import decode_classic_address
+from xrpl.models.response import Response, ResponseStatus
+from xrpl.wallet import Wallet
+
+import burn_watcher
+from burn_watcher import BurnWatcher
+from models import burn_index
+
+
+def nft_id(issuer: str, sequence: int) -> str:
+    return f"0008{0:04X}{decode_classic_address(issuer).hex().upper()}{0:08X}{sequence:08X}"
+
+
+class TxClient:
+    def __init__(self, burned: str, burner: str):
+        self.result = {
+            "hash": burned, "ledger_index": 7, "validated": True,
+            "tx_json": {"TransactionType": "NFTokenBurn", "NFTokenID": burned, "Account": burner},
+            "meta": {"TransactionResult": "tesSUCCESS"},
+        }
+
+    async def request(self, request):
+        return Response(status=ResponseStatus.SUCCESS, result=self.result)
+
+
+def test_lookup_records_only_watched_burns(monkeypatch):
+    ours, theirs, burner = (Wallet.create().classic_address for _ in range(3))
+    burned = []
+    watcher = BurnWatcher(account_fn=lambda: ours, taxons=[], on_burn=burned.append)
+
+    foreign = nft_id(theirs, 1)
+    monkeypatch.setattr(burn_watcher, "get_client", lambda: TxClient(foreign, burner))
+    burn = asyncio.run(watcher.lookup("ignored"))
+    assert burn["nft_id"] == foreign and burn["burner"] == burner
+    assert burn_index.get(foreign) is None and burned == []
+
+    own = nft_id(ours, 2)
+    monkeypatch.setattr(burn_watcher, "get_client", lambda: TxClient(own, burner))
+    burn = asyncio.run(watcher.lookup("ignored"))
+    assert burn_index.get(own) is not None and burn["nft_id"] == own
+    assert [b["nft_id"] for b in burned] == [own]
@@ -0,0 +1,36 @@
+# test_catalog.py
+"""ProductCatalog running aggregates"""
+from catalog import ProductCatalog
+from models import Product, ProductStatus
+
+
+def product(**fields) -> Product:
+    return Product(name="catalog test", price=100.0, manufacturer_wallet="rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe", **fields)
+
+
+def test_totals_do_not_drift_over_updates():
+    catalog = ProductCatalog()
+    items = [product(total_in_amm=0.1 * (i + 1), total_lp_tokens=1 / 3) for i in range(100)]
+    for item in items:
+        catalog.upsert(item)
+    for step in range(1000):
+        item = items[step % len(items)]
+        item.total_in_amm += 0.1
+        catalog.upsert(item)
+    for item in items:
+        item.status = ProductStatus.RECALLED
+        catalog.upsert(item)
+
+    active = (ProductStatus.REGISTERED, ProductStatus.SOLD)
+    assert catalog.count(active) == 0
+    assert catalog.total("total_in_amm", active) == 0.0
+    assert catalog.total("total_lp_tokens", active) == 0.0
+
+
+def test_recall_counts_as_case_c():
+    catalog = ProductCatalog()
+    catalog.upsert(product(status=ProductStatus.RECALLED, total_withdrawn=5.25))
+    catalog.upsert(product(status=ProductStatus.RECYCLED, total_withdrawn=4.75))
+
+    assert catalog.case_totals("C", ["total_withdrawn"]) == {"count": 2, "total_withdrawn": 10.0}
+    assert catalog.case_totals("A", ["total_withdrawn"]) == {"count": 0, "total_withdrawn": 0.0}
@@ -0,0 +1,75 @@
+# test_expiry.py
+"""ExpiryScheduler: retries after transient failures, not after rejections"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from expiry import ExpiryScheduler, ExpiryRejected
+from models import Product, save_product
+
+
+def due_product(**fields) -> Product:
+    return save_product(Product(
+        name="expiry test",
+        price=100.0,
+        manufacturer_wallet="rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe",
+        expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+        **fields
+    ))
+
+
+def run_scheduler(expire_fn, seconds: float = 0.5) -> ExpiryScheduler:
+    async def run():
+        scheduler = ExpiryScheduler(
+            expire_fn=expire_fn, window=100, batch_size=10, concurrency=2, retry_seconds=0.05
+        )
+        scheduler.start()
+        await asyncio.sleep(seconds)
+        await scheduler.stop()
+        return scheduler
+    return asyncio.run(run())
+
+
+def calls_for(product: Product, result):
+    """expire_fn returning/raising `result` for `product`, recording its calls"""
+    calls = []
+
+    async def expire_fn(p: Product) -> bool:
+        if p.id != product.id:
+            return True
+        calls.append(p.id)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return expire_fn, calls
+
+
+def test_transient_failure_is_retried():
+    product = due_product(total_lp_tokens=10.0)
+    expire_fn, calls = calls_for(product, False)
+    run_scheduler(expire_fn)
+    assert len(calls) > 1
+
+
+def test_rejected_product_is_not_retried():
+    product = due_product(total_lp_tokens=10.0)
+    expire_fn, calls = calls_for(product, ExpiryRejected("no LP tokens"))
+    scheduler = run_scheduler(expire_fn)
+    assert calls == [product.id]
+    assert product.id not in scheduler._scheduled
+
+
+def test_product_without_lp_tokens_is_rejected_once():
+    import main
+
+    product = due_product(total_lp_tokens=0.0)
+    calls = []
+
+    async def expire_fn(p: Product) -> bool:
+        if p.id != product.id:
+            return True
+        calls.append(p.id)
+        return await main._expire_due(p)
+
+    run_scheduler(expire_fn)
+    assert calls == [product.id]
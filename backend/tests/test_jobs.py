@@ -0,0 +1,33 @@
+# test_jobs.py
+"""JobQueue history pruning"""
+import asyncio
+
+from jobs import JobQueue
+from models import JobStatus
+
+
+def test_running_job_does_not_stop_pruning():
+    async def run():
+        jobs = JobQueue(workers=2, history_limit=3)
+        jobs.start()
+        hang = asyncio.Event()
+
+        async def hung():
+            await hang.wait()
+            return {}
+
+        async def quick():
+            return {}
+
+        first = jobs.submit("hung", hung)
+        finished = []
+        for _ in range(6):
+            finished.append(jobs.submit("quick", quick))
+            await asyncio.sleep(0.01)
+        await jobs.stop()
+        return jobs, first, finished
+
+    jobs, first, finished = asyncio.run(run())
+
+    assert jobs.get(first.id).status == JobStatus.RUNNING
+    assert [jobs.get(j.id) is not None for j in finished] == [False] * 4 + [True] * 2
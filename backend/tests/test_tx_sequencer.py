@@ -0,0 +1,81 @@
+# test_tx_sequencer.py
+"""submit_tx under concurrent failures: no stalled pipeline, no duplicate sequences"""
+import asyncio
+import time
+
+import pytest
+from xrpl.asyncio.transaction.reliable_submission import XRPLReliableSubmissionException
+from xrpl.models import CheckCancel, Payment
+from xrpl.wallet import Wallet
+
+import tx_sequencer
+from fake_rippled import FakeRippledClient
+from tx_sequencer import submit_tx
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(tx_sequencer, "POLL_INTERVAL", 0.02)
+
+
+def payment(wallet: Wallet, destination: str) -> Payment:
+    return Payment(account=wallet.classic_address, destination=destination, amount="1000")
+
+
+def validated_sequences(results) -> list:
+    return [r.result["tx_json"]["Sequence"] for r in results]
+
+
+def test_rejected_number_is_filled_not_stalled():
+    async def run():
+        client = FakeRippledClient("fake://sequencer?close=0.2&latency_ms=5")
+        wallet, other = Wallet.create(), Wallet.create()
+        first = (await submit_tx(payment(wallet, other.classic_address), client, wallet)).result["tx_json"]["Sequence"]
+
+        # The fake ledger has no Checks: temDISABLED, its number is never consumed
+        bad = CheckCancel(account=wallet.classic_address, check_id="0" * 64)
+        started = time.monotonic()
+        results = await asyncio.gather(
+            submit_tx(bad, client, wallet),
+            *(submit_tx(payment(wallet, other.classic_address), client, wallet) for _ in range(4)),
+            return_exceptions=True
+        )
+        elapsed = time.monotonic() - started
+
+        filler = [
+            entry for entry in client.ledger._txs.values()
+            if entry["tx_json"]["TransactionType"] == "AccountSet"
+        ]
+        await client.close()
+        return first, results, elapsed, filler
+
+    first, results, elapsed, filler = asyncio.run(run())
+    assert isinstance(results[0], XRPLReliableSubmissionException)
+    assert "tem" in str(results[0])
+    # The payments kept the numbers they were pipelined with ...
+    assert sorted(validated_sequences(results[1:])) == [first + 2, first + 3, first + 4, first + 5]
+    # ... because the rejected one was filled, long before LastLedgerSequence (20 closes = 4 s)
+    assert [entry["tx_json"]["Sequence"] for entry in filler] == [first + 1]
+    assert elapsed < 2.0
+
+
+def test_concurrent_past_seq_resyncs_once_without_duplicates():
+    async def run():
+        client = FakeRippledClient("fake://sequencer?close=0.1&latency_ms=5")
+        wallet, other = Wallet.create(), Wallet.create()
+        await submit_tx(payment(wallet, other.classic_address), client, wallet)
+
+        # Another signer used the account: every locally cached number is now in the past
+        client.ledger.accounts[wallet.classic_address]["Sequence"] += 3
+        fetches = client.ledger.stats["rpc:account_info"]
+        results = await asyncio.gather(
+            *(submit_tx(payment(wallet, other.classic_address), client, wallet) for _ in range(6))
+        )
+        fetches = client.ledger.stats["rpc:account_info"] - fetches
+        await client.close()
+        return results, fetches
+
+    results, fetches = asyncio.run(run())
+    sequences = validated_sequences(results)
+    assert len(set(sequences)) == len(sequences)
+    assert fetches == 1
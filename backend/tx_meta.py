@@ -0,0 +1,59 @@
+# tx_meta.py
+"""
+Transaction metadata helpers
+
+Amounts moved by a validated transaction are in its metadata
+(AccountRoot and RippleState Balance deltas), so there is no need to
+read balances before/after and wait for the ledger to settle.
+"""
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from xrpl.utils import get_balance_changes, drops_to_xrp
+
+
+def account_deltas(meta: Dict[str, Any], account: str) -> Dict[str, Decimal]:
+    """
+    Net balance changes of `account`, keyed by "XRP" or "<currency>.<issuer>".
+    XRP deltas are in XRP and include the fee when `account` sent the tx.
+    """
+    deltas: Dict[str, Decimal] = {}
+    if not isinstance(meta, dict) or "AffectedNodes" not in meta:
+        return deltas
+
+    for change in get_balance_changes(meta):
+        if change["account"] != account:
+            continue
+        for balance in change["balances"]:
+            key = balance["currency"] if balance["currency"] == "XRP" else f"{balance['currency']}.{balance['issuer']}"
+            deltas[key] = deltas.get(key, Decimal(0)) + Decimal(balance["value"])
+    return deltas
+
+
+def xrp_received(result: Dict[str, Any], account: str) -> float:
+    """XRP credited to `account` by the tx, with the fee it paid added back"""
+    delta = account_deltas(result.get("meta", {}), account).get("XRP", Decimal(0))
+    tx = result.get("tx_json") or result
+    if tx.get("Account") == account and tx.get("Fee"):
+        delta += Decimal(drops_to_xrp(str(tx["Fee"])))
+    return float(delta)
+
+
+def token_received(result: Dict[str, Any], account: str, currency: str, issuer: Optional[str] = None) -> float:
+    """Issued-currency amount credited to `account` (any issuer if none given)"""
+    total = Decimal(0)
+    for key, value in account_deltas(result.get("meta", {}), account).items():
+        if key == "XRP":
+            continue
+        code, _, key_issuer = key.partition(".")
+        if code == currency and (issuer is None or key_issuer == issuer):
+            total += value
+    return float(total)
+
+
+def lp_tokens_received(meta: Dict[str, Any], account: str) -> float:
+    """LP tokens credited to `account` (AMM LP currency codes start with 03)"""
+    for key, value in account_deltas(meta, account).items():
+        if key.startswith("03"):
+            return float(value)
+    return 0.0
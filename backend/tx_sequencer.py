@@ -0,0 +1,274 @@
+# tx_sequencer.py
+"""
+Per-wallet Sequence allocation - lets one signing wallet pipeline transactions
+
+autofill() fetches the account Sequence with an AccountInfo round trip for
+every transaction, and submit_and_wait() holds that number until the tx
+validates, so RECYCLEFI / CYCLR could only get one tx into each ledger.
+
+Here each signing wallet gets a WalletSequencer that reads the Sequence
+once and hands out numbers locally. Any number of transactions can then
+be signed, submitted and awaited concurrently. On tefPAST_SEQ (we are
+behind the ledger) or a terPRE_SEQ that never fills its gap, the wallet
+resyncs from the open ledger and the transaction is retried with a fresh
+number.
+
+A number handed out but never consumed on-ledger (tem/tef/tel, an
+expired tx) is given back. The next allocation reuses it, and if txs
+already pipelined behind it are waiting, a no-op AccountSet fills it
+right away instead of leaving them held until their LastLedgerSequence.
+Numbers still held by an in-flight tx are never handed out again, and
+concurrent failures from the same epoch trigger a single resync.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import replace
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from xrpl.asyncio.clients import Client
+from xrpl.asyncio.ledger import get_latest_validated_ledger_sequence
+from xrpl.asyncio.transaction import autofill, sign, submit
+from xrpl.asyncio.transaction.reliable_submission import XRPLReliableSubmissionException
+from xrpl.clients import XRPLRequestFailureException
+from xrpl.models import AccountInfo, AccountSet, Transaction
+from xrpl.models.requests import Tx
+from xrpl.models.response import Response
+from xrpl.wallet import Wallet
+
+from config import settings
+from metrics import (
+    xrpl_submissions_in_flight, xrpl_submit_and_wait_seconds,
+    xrpl_tx_results_total, xrpl_tx_step_seconds,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Seconds between Tx polls while waiting for validation
+POLL_INTERVAL = settings.TX_POLL_INTERVAL
+
+# How many times a tx is re-sequenced after tefPAST_SEQ / expired terPRE_SEQ
+MAX_RESEQUENCE = 3
+
+
+class SequenceExpired(XRPLReliableSubmissionException):
+    """The tx can never validate (LastLedgerSequence passed) - safe to re-sequence"""
+
+
+class WalletSequencer:
+    """Local Sequence counter for one signing wallet"""
+
+    def __init__(self, address: str):
+        self.address = address
+        self._next: int | None = None
+        self._free: List[int] = []          # given back, not consumed on-ledger (min-heap)
+        self._held: Set[int] = set()        # handed out, tx still in flight
+        self._floor = 0                     # below this, consumed on-ledger (last fetch)
+        self._epoch = 0                     # bumped by every resync
+        self._lock = asyncio.Lock()
+        self.filling = False                # a gap filler is running
+
+    async def allocate(self, client: Client, only_free: bool = False) -> Optional[Tuple[int, int]]:
+        """(sequence, epoch) - a given-back number first; None if only_free and there is none"""
+        async with self._lock:
+            if self._next is None:
+                self._next = self._floor = await self._fetch(client)
+            if self._free:
+                seq = heapq.heappop(self._free)
+            elif only_free:
+                return None
+            else:
+                seq = self._next
+                self._next += 1
+            self._held.add(seq)
+            return seq, self._epoch
+
+    def finish(self, seq: int):
+        """The tx with `seq` is done with it (consumed on-ledger, or outcome unknown)"""
+        self._held.discard(seq)
+
+    def release(self, seq: int):
+        """`seq` was not consumed on-ledger; hand it out again"""
+        self._held.discard(seq)
+        if self._next is None or seq < self._floor:
+            return
+        if seq == self._next - 1:
+            self._next = seq
+        elif seq not in self._free:
+            heapq.heappush(self._free, seq)
+
+    def blocking(self) -> bool:
+        """True if a given-back number sits below a tx that is still in flight"""
+        return bool(self._free) and any(seq > self._free[0] for seq in self._held)
+
+    async def resync(self, client: Client, epoch: int):
+        """
+        Re-read the Sequence from the open ledger (includes queued txs),
+        unless another caller already did since `epoch`. Numbers still
+        held stay reserved; unheld numbers below our counter become free.
+        """
+        async with self._lock:
+            if epoch != self._epoch:
+                return
+            ledger_next = self._floor = await self._fetch(client)
+            self._epoch += 1
+            if self._next is None or ledger_next >= self._next:
+                self._next = ledger_next
+                self._free = []
+            else:
+                # Behind our counter: whatever nobody holds was lost (never
+                # reached the ledger) and is handed out again
+                self._free = [
+                    seq for seq in range(ledger_next, self._next) if seq not in self._held
+                ]
+                heapq.heapify(self._free)
+
+    async def _fetch(self, client: Client) -> int:
+        resp = await client.request(AccountInfo(account=self.address, ledger_index="current"))
+        if not resp.is_successful():
+            raise XRPLRequestFailureException(resp.result)
+        return int(resp.result["account_data"]["Sequence"])
+
+
+_sequencers: Dict[str, WalletSequencer] = {}
+
+# Called with the ledger index each time one of our txs validates
+_validated_listeners: List[Callable[[int], None]] = []
+
+
+def on_validated(callback: Callable[[int], None]):
+    _validated_listeners.append(callback)
+
+
+def get_sequencer(wallet: Wallet) -> WalletSequencer:
+    """One sequencer per address, shared by every module that signs for it"""
+    address = wallet.classic_address
+    if address not in _sequencers:
+        _sequencers[address] = WalletSequencer(address)
+    return _sequencers[address]
+
+
+async def _wait_for_validation(tx_hash: str, last_ledger_sequence: int, client: Client) -> Response:
+    while True:
+        await asyncio.sleep(POLL_INTERVAL)
+
+        resp = await client.request(Tx(transaction=tx_hash))
+        if resp.is_successful():
+            if resp.result.get("validated"):
+                for callback in _validated_listeners:
+                    callback(int(resp.result.get("ledger_index", 0)))
+                code = resp.result["meta"]["TransactionResult"]
+                xrpl_tx_results_total.inc(stage="validated", result=code)
+                if code != "tesSUCCESS":
+                    raise XRPLReliableSubmissionException(f"Transaction failed: {code}")
+                return resp
+        elif resp.result.get("error") != "txnNotFound":
+            raise XRPLRequestFailureException(resp.result)
+
+        current = await get_latest_validated_ledger_sequence(client)
+        if current >= last_ledger_sequence:
+            raise SequenceExpired(
+                f"Latest validated ledger {current} passed LastLedgerSequence {last_ledger_sequence}"
+            )
+
+
+async def submit_tx(transaction: Transaction, client: Client, wallet: Wallet) -> Response:
+    """
+    Drop-in for sign(autofill(tx)) + submit_and_wait() that takes its
+    Sequence from the wallet's local counter instead of AccountInfo.
+
+    Returns the validated Tx response; raises XRPLReliableSubmissionException
+    if the transaction does not succeed.
+    """
+    tx_type = transaction.transaction_type.value
+    xrpl_submissions_in_flight.inc(wallet=wallet.classic_address)
+    start = time.perf_counter()
+    try:
+        return await _submit_tx(transaction, client, wallet, tx_type)
+    finally:
+        xrpl_submissions_in_flight.dec(wallet=wallet.classic_address)
+        xrpl_submit_and_wait_seconds.observe(time.perf_counter() - start, tx_type=tx_type)
+
+
+async def _fill_gaps(client: Client, wallet: Wallet):
+    """No-op AccountSets on given-back numbers that later txs are held behind"""
+    sequencer = get_sequencer(wallet)
+    if sequencer.filling:
+        return
+    sequencer.filling = True
+    try:
+        while sequencer.blocking():
+            await _submit_tx(AccountSet(account=wallet.classic_address), client, wallet, "AccountSet", only_free=True)
+    except Exception as e:
+        logger.warning("Sequence gap filler failed", extra={"wallet": wallet.classic_address, "error": str(e)})
+    finally:
+        sequencer.filling = False
+
+
+def _give_back(sequencer: WalletSequencer, seq: int, client: Client, wallet: Wallet):
+    sequencer.release(seq)
+    if sequencer.blocking():
+        asyncio.ensure_future(_fill_gaps(client, wallet))
+
+
+async def _submit_tx(
+    transaction: Transaction,
+    client: Client,
+    wallet: Wallet,
+    tx_type: str,
+    only_free: bool = False
+) -> Optional[Response]:
+    sequencer = get_sequencer(wallet)
+
+    for attempt in range(MAX_RESEQUENCE + 1):
+        allocated = await sequencer.allocate(client, only_free)
+        if allocated is None:
+            return None                     # gap filler: someone else took the number
+        seq, epoch = allocated
+        try:
+            with xrpl_tx_step_seconds.time(step="autofill", tx_type=tx_type):
+                filled = await autofill(replace(transaction, sequence=seq), client)
+            with xrpl_tx_step_seconds.time(step="sign", tx_type=tx_type):
+                signed = sign(filled, wallet)
+            with xrpl_tx_step_seconds.time(step="submit", tx_type=tx_type):
+                prelim = await submit(signed, client)
+        except Exception:
+            _give_back(sequencer, seq, client, wallet)
+            raise
+        engine_result = prelim.result.get("engine_result", "")
+        xrpl_tx_results_total.inc(stage="preliminary", result=engine_result)
+
+        if engine_result == "tefPAST_SEQ" and attempt < MAX_RESEQUENCE:
+            sequencer.finish(seq)           # already used on-ledger
+            await sequencer.resync(client, epoch)
+            continue
+
+        if engine_result[:3] in ("tem", "tef", "tel"):
+            if engine_result in ("tefPAST_SEQ", "tefALREADY"):
+                sequencer.finish(seq)
+            else:
+                # Not applied and never will be: the number was not consumed on-ledger
+                _give_back(sequencer, seq, client, wallet)
+            message = prelim.result.get("engine_result_message", "")
+            raise XRPLReliableSubmissionException(f"{engine_result}: {message}")
+
+        # tes / tec / ter (incl. terPRE_SEQ, which rippled holds until the gap fills)
+        try:
+            with xrpl_tx_step_seconds.time(step="wait", tx_type=tx_type):
+                resp = await _wait_for_validation(signed.get_hash(), signed.last_ledger_sequence, client)
+        except SequenceExpired:
+            # Can never validate now, so its number is free again
+            _give_back(sequencer, seq, client, wallet)
+            if engine_result != "terPRE_SEQ" or attempt >= MAX_RESEQUENCE:
+                raise
+            await sequencer.resync(client, epoch)
+            continue
+        except BaseException:
+            sequencer.finish(seq)           # validated with a tec, or outcome unknown
+            raise
+        sequencer.finish(seq)
+        return resp
+
+    raise XRPLReliableSubmissionException("Could not find a valid Sequence")
@@ -0,0 +1,126 @@
+# xrpl_client.py
+"""
+Shared XRPL client - one connection pool for the whole backend
+
+xrpl-py's AsyncJsonRpcClient opens a fresh httpx client (new TCP + TLS
+handshake) for every request, and xrpl_helpers, XRPLService and main
+each had their own instance. get_client() returns a single client that
+every module shares:
+
+- "http" (default): JSON-RPC over one keep-alive httpx connection pool
+- "ws":             one persistent WebSocket, reopened on demand
+- RPC_URL=fake://…  an in-process fake rippled (see fake_rippled.py)
+
+Both cap the number of concurrent requests sent to rippled
+(XRPL_MAX_IN_FLIGHT). Subscriptions get their own WebSocket from
+stream_client(), since stream messages are tied to one connection.
+"""
+import asyncio
+from json import JSONDecodeError
+from typing import Optional
+
+import httpx
+from xrpl.asyncio.clients import AsyncJsonRpcClient, AsyncWebsocketClient
+from xrpl.asyncio.clients.client import REQUEST_TIMEOUT, Client
+from xrpl.asyncio.clients.exceptions import XRPLRequestFailureException
+from xrpl.asyncio.clients.utils import json_to_response, request_to_json_rpc
+from xrpl.models.requests.request import Request
+from xrpl.models.response import Response
+
+from config import settings
+from metrics import instrument_client
+
+
+class PooledJsonRpcClient(AsyncJsonRpcClient):
+    """JSON-RPC client that reuses warm HTTP connections"""
+
+    def __init__(self, url: str, max_connections: int, max_in_flight: int):
+        super().__init__(url)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    def _session(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(limits=self._limits, timeout=REQUEST_TIMEOUT)
+        return self._http
+
+    async def _request_impl(self, request: Request, *, timeout: float = REQUEST_TIMEOUT) -> Response:
+        async with self._slots:
+            response = await self._session().post(
+                self.url,
+                json=request_to_json_rpc(request),
+                timeout=timeout
+            )
+        try:
+            return json_to_response(response.json())
+        except JSONDecodeError:
+            raise XRPLRequestFailureException({
+                "error": response.status_code,
+                "error_message": response.text,
+            })
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+class PersistentWebsocketClient(AsyncWebsocketClient):
+    """WebSocket client that opens (and reopens) its connection on demand"""
+
+    def __init__(self, url: str, max_in_flight: int):
+        super().__init__(url)
+        self._open_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_in_flight)
+
+    async def _request_impl(self, request: Request, *, timeout: float = REQUEST_TIMEOUT) -> Response:
+        if not self.is_open():
+            async with self._open_lock:
+                if not self.is_open():
+                    await self.open()
+        async with self._slots:
+            return await super()._request_impl(request, timeout=timeout)
+
+    async def close(self):
+        if self.is_open():
+            await super().close()
+
+
+_client: Optional[Client] = None
+
+
+def get_client() -> Client:
+    """The process-wide XRPL client (created on first use)"""
+    global _client
+    if _client is None:
+        if settings.RPC_URL.startswith("fake://"):
+            # Offline stand-in (benchmarks, load tests)
+            from fake_rippled import FakeRippledClient
+            _client = FakeRippledClient(settings.RPC_URL)
+        elif settings.XRPL_TRANSPORT == "ws":
+            _client = PersistentWebsocketClient(settings.WS_URL, settings.XRPL_MAX_IN_FLIGHT)
+        else:
+            _client = PooledJsonRpcClient(
+                settings.RPC_URL, settings.XRPL_MAX_CONNECTIONS, settings.XRPL_MAX_IN_FLIGHT
+            )
+        if settings.METRICS_ENABLED:
+            instrument_client(_client)
+    return _client
+
+
+def stream_client():
+    """A new, unopened WebSocket client for subscriptions (not shared)"""
+    if settings.RPC_URL.startswith("fake://"):
+        from fake_rippled import FakeStreamClient
+        return FakeStreamClient(get_client().ledger)
+    return AsyncWebsocketClient(settings.WS_URL)
+
+
+async def close_client():
+    """Release pooled connections (the client reconnects if used again)"""
+    if _client is not None:
+        await _client.close()
@@ -1,9 +1,9 @@
 # xrpl_helpers.py — FIXED: RecycleFi receives payment first, then distributes
 
-import os
-import qrcode
+import asyncio
+import logging
+import time
 from datetime import datetime, timedelta
-from xrpl.asyncio.clients import AsyncJsonRpcClient
 from xrpl.models import (
     NFTokenMint, NFTokenMintFlag, Memo,
     AMMDeposit, AMMDepositFlag, IssuedCurrencyAmount,
@@ -11,26 +11,34 @@ from xrpl.models import (
 )
 
 from xrpl.models.currencies import XRP, IssuedCurrency
-from xrpl.asyncio.transaction import autofill, sign, submit_and_wait
+from xrpl.models.requests import AccountTx
+from xrpl.wallet import Wallet
+from tx_sequencer import submit_tx
 from xrpl.utils import xrp_to_drops
 from config import settings
+from xrpl_client import get_client
+from models import db, deposit_index
+from tx_meta import lp_tokens_received
+from qr_service import qr_service
 
-client = AsyncJsonRpcClient(settings.RPC_URL)
+logger = logging.getLogger(__name__)
 
 # CUSD — Our stablecoin for the circular economy
 CUSD_HEX = "4355534400000000000000000000000000000000"
 CUSD_ISSUER = "rpWYyReCdfisZEd99q14gg96NrAEpcauMt"
 
 # WE ARE RECYCLEFI — this is our master wallet
-def get_recyclefi_wallet():
-    from xrpl.wallet import Wallet
-    if not settings.RECYCLEFI_SEED:
-        raise ValueError("RECYCLEFI_SEED is missing in .env!")
-    wallet = Wallet.from_seed(settings.RECYCLEFI_SEED.strip())
-    print(f"RECYCLEFI WALLET LOADED: {wallet.classic_address}")
-    return wallet
+_recyclefi: Wallet | None = None
 
-RECYCLEFI = get_recyclefi_wallet()
+def get_recyclefi_wallet() -> Wallet:
+    """RecycleFi wallet, derived from RECYCLEFI_SEED on first use (the app's lifespan)"""
+    global _recyclefi
+    if _recyclefi is None:
+        if not settings.RECYCLEFI_SEED:
+            raise ValueError("RECYCLEFI_SEED is missing in .env!")
+        _recyclefi = Wallet.from_seed(settings.RECYCLEFI_SEED.strip())
+        logger.info("RecycleFi wallet loaded", extra={"wallet": _recyclefi.classic_address})
+    return _recyclefi
 
 # Assets
 XRP_ASSET = XRP()
@@ -67,6 +75,86 @@ def _extract_nft_id_from_meta(response_result: dict) -> str:
     raise ValueError(f"NFT ID not found in meta: {meta}")
 
 
+def _nft_id_from_memos(tx: dict) -> str | None:
+    """NFT ID stored in the MemoData of one of our AMMDeposits"""
+    for memo in tx.get("Memos", []):
+        data = memo.get("Memo", {}).get("MemoData", "")
+        try:
+            text = bytes.fromhex(data).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            continue
+        if len(text) == 64:
+            return text.upper()
+    return None
+
+
+# ========================================
+# NFT → AMM DEPOSIT INDEX
+# ========================================
+
+DEPOSIT_CURSOR_KEY = "deposit_index:last_ledger"
+_backfill_lock = asyncio.Lock()
+
+
+async def backfill_deposit_index(page_size: int = 400) -> int:
+    """
+    Page through RecycleFi's AccountTx (following markers) from the last
+    indexed ledger and record every AMMDeposit that carries an NFT ID memo.
+    Returns the number of deposits indexed.
+    """
+    client = get_client()
+    recyclefi = get_recyclefi_wallet()
+    async with _backfill_lock:
+        cursor = db.get_state(DEPOSIT_CURSOR_KEY)
+        last_ledger = int(cursor) if cursor else 0
+        marker = None
+        indexed = 0
+
+        while True:
+            resp = await client.request(AccountTx(
+                account=recyclefi.classic_address,
+                ledger_index_min=last_ledger + 1 if last_ledger else -1,
+                ledger_index_max=-1,
+                forward=True,
+                limit=page_size,
+                marker=marker
+            ))
+            if not resp.is_successful():
+                raise RuntimeError(f"AccountTx failed: {resp.result}")
+
+            for entry in resp.result.get("transactions", []):
+                tx = entry.get("tx") or entry.get("tx_json", {})
+                meta = entry.get("meta", {})
+                ledger_index = entry.get("ledger_index") or tx.get("ledger_index")
+                if ledger_index:
+                    last_ledger = max(last_ledger, int(ledger_index))
+
+                if tx.get("TransactionType") != "AMMDeposit":
+                    continue
+                if not isinstance(meta, dict) or meta.get("TransactionResult") != "tesSUCCESS":
+                    continue
+                nft_id = _nft_id_from_memos(tx)
+                if not nft_id:
+                    continue
+
+                deposit_index.put(
+                    nft_id=nft_id,
+                    tx_hash=entry.get("hash") or tx.get("hash"),
+                    account=recyclefi.classic_address,
+                    lp_tokens=lp_tokens_received(meta, recyclefi.classic_address),
+                    ledger_index=ledger_index
+                )
+                indexed += 1
+
+            marker = resp.result.get("marker")
+            if not marker:
+                break
+
+        if last_ledger:
+            db.set_state(DEPOSIT_CURSOR_KEY, str(last_ledger))
+        return indexed
+
+
 async def create_recyclable_item_v3(
     product_name: str,
     price_xrp: float,
@@ -97,25 +185,20 @@ async def create_recyclable_item_v3(
     company_share = price_xrp * 0.93      # 93% to company (was 94%, now 93% to balance fees)
     protocol_fee = price_xrp * 0.07       # 7% RecycleFi keeps (deposit 6% + operating 1%)
     
-    print(f"\n=== RECYCLEFI PURCHASE FLOW ===")
-    print(f"Product: {product_name}")
-    print(f"Total Price: {price_xrp} XRP (already in RecycleFi wallet)")
-    print(f"")
-    print(f"DISTRIBUTION:")
-    print(f"  → AMM Deposit: {deposit_xrp} XRP + {cusd_amount} CUSD (locked for yield)")
-    print(f"  → Company Payment: {company_share:.6f} XRP (sending now...)")
-    print(f"  → RecycleFi Fee: {protocol_fee:.6f} XRP (kept in our wallet)")
-    print(f"")
+    client = get_client()
+    recyclefi = get_recyclefi_wallet()
+    started = time.perf_counter()
+    logger.debug("Purchase flow started", extra={
+        "product_name": product_name, "price_xrp": price_xrp, "deposit_xrp": deposit_xrp,
+        "company_xrp": company_share, "protocol_fee_xrp": protocol_fee
+    })
 
     # Step 1: Mint the recycling NFT (proof of deposit)
-    print("[1/4] Minting Recycling NFT...")
-
     # AUTO-RECYCLE IN seconds=30 — THIS IS THE MAGIC
     expiry_timestamp = int((datetime.now() + timedelta(seconds=30)).timestamp())
-    print(f"AUTO-RECYCLE ENABLED: NFT expires in seconds=30 → anyone can burn & claim")
 
     mint_tx = NFTokenMint(
-        account=RECYCLEFI.classic_address,
+        account=recyclefi.classic_address,
         nftoken_taxon=2025,
         flags=NFTokenMintFlag.TF_TRANSFERABLE | NFTokenMintFlag.TF_BURNABLE,
         uri=f"ipfs://recyclefi/{product_name.lower().replace(' ', '-')}".encode().hex(),
@@ -123,19 +206,17 @@ async def create_recyclable_item_v3(
         amount="0",
         expiration=expiry_timestamp  # ← THIS IS THE AUTO-RECYCLE TRIGGER
     )
-    signed = sign(await autofill(mint_tx, client), RECYCLEFI)
-    resp = await submit_and_wait(signed, client)
+    resp = await submit_tx(mint_tx, client, recyclefi)
 
     if resp.result.get("meta", {}).get("TransactionResult") != "tesSUCCESS":
         raise RuntimeError("NFT mint failed")
 
     nft_id = _extract_nft_id_from_meta(resp.result)
-    print(f"      ✓ NFT Minted: {nft_id}")
+    logger.debug("Purchase: NFT minted", extra={"nft_id": nft_id, "tx_hash": resp.result.get("hash")})
 
     # Step 2: Lock deposit into AMM pool (this generates yield)
-    print(f"[2/4] Locking {deposit_xrp} XRP + {cusd_amount} CUSD into AMM...")
     deposit_tx = AMMDeposit(
-        account=RECYCLEFI.classic_address,
+        account=recyclefi.classic_address,
         asset=XRP_ASSET,
         asset2=CUSD_ASSET,
         amount=xrp_to_drops(deposit_xrp),
@@ -151,43 +232,43 @@ async def create_recyclable_item_v3(
             "memo_format": "746578742F706C61696E".encode().hex()
         })]
     )
-    signed = sign(await autofill(deposit_tx, client), RECYCLEFI)
-    await submit_and_wait(signed, client)
-    print(f"      ✓ AMM Deposit successful — yield engine activated")
+    deposit_resp = await submit_tx(deposit_tx, client, recyclefi)
+    deposit_index.put(
+        nft_id=nft_id,
+        tx_hash=deposit_resp.result.get("hash"),
+        account=recyclefi.classic_address,
+        lp_tokens=lp_tokens_received(deposit_resp.result.get("meta", {}), recyclefi.classic_address),
+        ledger_index=deposit_resp.result.get("ledger_index")
+    )
+    logger.debug("Purchase: AMM deposit validated", extra={"nft_id": nft_id, "tx_hash": deposit_resp.result.get("hash")})
 
     # Step 3: PAY THE COMPANY (this is the fix!)
-    print(f"[3/4] Paying company {company_share:.6f} XRP...")
     company_payment = Payment(
-        account=RECYCLEFI.classic_address,
+        account=recyclefi.classic_address,
         destination=company_wallet,
         amount=xrp_to_drops(company_share)
     )
-    signed = sign(await autofill(company_payment, client), RECYCLEFI)
-    company_tx_result = await submit_and_wait(signed, client)
+    company_tx_result = await submit_tx(company_payment, client, recyclefi)
     
     if company_tx_result.result.get("meta", {}).get("TransactionResult") != "tesSUCCESS":
         raise RuntimeError(f"Company payment failed: {company_tx_result}")
     
     company_tx_hash = company_tx_result.result.get("hash")
-    print(f"      ✓ Company paid! TX: {company_tx_hash}")
+    logger.debug("Purchase: company paid", extra={"nft_id": nft_id, "tx_hash": company_tx_hash})
 
     # Step 4: Generate QR code for recycling
-    print(f"[4/4] Generating QR code...")
     recycle_url = f"{settings.RECYCLE_DAPP_URL}?nft={nft_id}"
-    img = qrcode.make(recycle_url)
-    os.makedirs("qrcodes", exist_ok=True)
-    filename = f"QR_{nft_id[-8:]}.png"
-    path = os.path.join("qrcodes", filename)
-    img.save(path)
-    print(f"      ✓ QR Code: {path}")
-    print(f"      ✓ Recycle URL: {recycle_url}")
-    
-    print(f"\n✅ PURCHASE COMPLETE")
-    print(f"   NFT: {nft_id}")
-    print(f"   Company received: {company_share:.6f} XRP")
-    print(f"   RecycleFi kept: {protocol_fee:.6f} XRP")
-    print(f"   Locked in AMM: {deposit_xrp} XRP + {cusd_amount} CUSD")
-    print(f"   Company TX: https://test.bithomp.com/explorer/{company_tx_hash}\n")
+    filename = await qr_service.publish(recycle_url)
+    path = qr_service.path(filename)
+
+    logger.info("Purchase complete", extra={
+        "nft_id": nft_id,
+        "company_xrp": company_share,
+        "deposit_xrp": deposit_xrp,
+        "tx_hash": company_tx_hash,
+        "qr_code": path,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
 
     return {
         "purchase_id": f"RECYCLEFI-{int(datetime.now().timestamp())}",
@@ -5,26 +5,35 @@ Including AMM operations for APY generation
 Uses CUSD (CYCLR's stablecoin) for product deposits
 """
 import asyncio
+import logging
 import os
 import json
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, Tuple
-from decimal import Decimal
+from functools import cached_property
+from typing import Optional, Dict, Any, List, Tuple
+from decimal import Decimal, ROUND_DOWN
 
-from xrpl.asyncio.clients import AsyncJsonRpcClient
+from xrpl.asyncio.clients import Client
 from xrpl.wallet import Wallet
 from xrpl.models import (
     Payment, Memo,
-    AMMDeposit, AMMWithdraw, AMMInfo,
+    AMMDeposit, AMMWithdraw,
     IssuedCurrencyAmount, IssuedCurrency,
     AccountInfo, AccountLines,
     NFTokenMint, NFTokenMintFlag,
 )
 from xrpl.models.currencies import XRP
-from xrpl.asyncio.transaction import sign_and_submit
 from xrpl.utils import xrp_to_drops, drops_to_xrp
 
 from config import settings
+from xrpl_client import get_client
+from amm_cache import PoolStateCache
+from amm_batcher import AMMBatcher
+from single_flight import SingleFlight
+from tx_sequencer import submit_tx, on_validated
+from tx_meta import lp_tokens_received, token_received
+
+logger = logging.getLogger(__name__)
 
 
 def currency_to_hex(currency: str) -> str:
@@ -39,11 +48,24 @@ def currency_to_hex(currency: str) -> str:
     return hex_code.ljust(40, '0')
 
 
+def iou_value(value: float) -> str:
+    """
+    Issued-currency amount string with at most 15 significant digits.
+    Rounded down so it never exceeds the balance it was read from.
+    """
+    amount = Decimal(repr(value))
+    if not amount:
+        return "0"
+    step = Decimal(1).scaleb(amount.adjusted() - 14)
+    return format(amount.quantize(step, rounding=ROUND_DOWN).normalize(), "f")
+
+
 class XRPLService:
     """Service for all XRPL operations"""
     
-    def __init__(self):
-        self.client = AsyncJsonRpcClient(settings.RPC_URL)
+    def __init__(self, client: Optional[Client] = None):
+        # Shared pooled client unless one is injected (see `client`)
+        self._client = client
         
         # CUSD currency (primary)
         self.cusd_currency_code = currency_to_hex(settings.CUSD_CURRENCY)
@@ -53,58 +75,147 @@ class XRPLService:
             "issuer": self.cusd_issuer
         }
         
+        # Identical concurrent reads (wallet balances) share one request
+        self.reads = SingleFlight(settings.XRPL_READ_TTLS, settings.XRPL_READ_CACHE_SIZE)
+        on_validated(self.reads.observe_ledger)
+        
+        # Net deposits/withdrawals over a short window (AMM_BATCH_WINDOW > 0)
+        self.amm_batcher = None
+        if settings.AMM_BATCH_WINDOW > 0:
+            self.amm_batcher = AMMBatcher(
+                window=settings.AMM_BATCH_WINDOW,
+                max_batch=settings.AMM_BATCH_MAX,
+                deposit_fn=lambda amount: self._submit_deposit(amount, "batch", "batch"),
+                withdraw_fn=lambda lp_tokens: self._submit_withdraw(lp_tokens, "batch"),
+                pool_state_fn=self.get_amm_state
+            )
+        
         # Backward compatibility aliases (RUSD -> CUSD)
         self.rusd_currency_code = self.cusd_currency_code
         self.rusd_currency = self.cusd_currency
-        
-        # Initialize wallets
+    
+    # Client, pool cache and wallets are built on first use, not at
+    # import; the app's lifespan calls load() so they exist before the
+    # first request.
+    
+    @cached_property
+    def client(self) -> Client:
+        return self._client or get_client()
+    
+    @cached_property
+    def amm_cache(self) -> PoolStateCache:
+        """Shared XRP/CUSD pool state, refreshed once per validated ledger"""
+        cache = PoolStateCache(
+            self.client,
+            XRP(),
+            IssuedCurrency(currency=self.cusd_currency_code, issuer=self.cusd_issuer),
+            max_age=settings.LEDGER_CLOSE_SECONDS
+        )
+        on_validated(cache.observe_ledger)
+        return cache
+    
+    @cached_property
+    def cyclr_wallet(self) -> Optional[Wallet]:
         if settings.CYCLR_WALLET_SECRET:
-            self.cyclr_wallet = Wallet.from_seed(settings.CYCLR_WALLET_SECRET)
-        else:
-            self.cyclr_wallet = None
-            
+            return Wallet.from_seed(settings.CYCLR_WALLET_SECRET)
+        return None
+    
+    @cached_property
+    def issuer_wallet(self) -> Optional[Wallet]:
         if hasattr(settings, 'CUSD_ISSUER_SECRET') and settings.CUSD_ISSUER_SECRET:
-            self.issuer_wallet = Wallet.from_seed(settings.CUSD_ISSUER_SECRET)
+            return Wallet.from_seed(settings.CUSD_ISSUER_SECRET)
         elif hasattr(settings, 'RUSD_ISSUER_SECRET') and settings.RUSD_ISSUER_SECRET:
-            self.issuer_wallet = Wallet.from_seed(settings.RUSD_ISSUER_SECRET)
-        else:
-            self.issuer_wallet = None
+            return Wallet.from_seed(settings.RUSD_ISSUER_SECRET)
+        return None
+    
+    def load(self):
+        """Create the client, pool cache and wallets now"""
+        self.amm_cache
+        self.cyclr_wallet
+        self.issuer_wallet
     
     # ========================================
     # ACCOUNT OPERATIONS
     # ========================================
     
+    async def _read_balance(
+        self,
+        address: str,
+        ledger_index: str = "current",
+        ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        XRP and CUSD balance of `address` in one ledger. AccountInfo and the
+        first AccountLines page are requested together; further pages are
+        read from the same ledger. Raises RuntimeError on a failed read.
+        """
+        info, lines = await asyncio.gather(
+            self.reads.request(self.client, AccountInfo(account=address, ledger_index=ledger_index), ttl),
+            self.reads.request(self.client, AccountLines(
+                account=address, peer=self.cusd_issuer, ledger_index=ledger_index
+            ), ttl)
+        )
+        for resp in (info, lines):
+            if not resp.is_successful():
+                raise RuntimeError(resp.result.get("error_message") or resp.result.get("error", "XRPL read failed"))
+        xrp_balance = float(drops_to_xrp(info.result["account_data"]["Balance"]))
+        
+        # Pin the next pages to the ledger the first one was read from
+        pinned = lines.result.get("ledger_index", ledger_index)
+        cusd_balance = 0.0
+        while True:
+            for line in lines.result.get("lines", []):
+                # Check both raw currency code and hex version
+                if ((line["currency"] == settings.CUSD_CURRENCY or
+                     line["currency"] == self.cusd_currency_code) and
+                        line["account"] == self.cusd_issuer):
+                    cusd_balance = float(line["balance"])
+            marker = lines.result.get("marker")
+            if not marker:
+                break
+            lines = await self.reads.request(self.client, AccountLines(
+                account=address, peer=self.cusd_issuer, ledger_index=pinned, marker=marker
+            ), ttl)
+            if not lines.is_successful():
+                raise RuntimeError(lines.result.get("error_message") or lines.result.get("error", "XRPL read failed"))
+        
+        return {
+            "address": address,
+            "xrp_balance": xrp_balance,
+            "cusd_balance": cusd_balance,
+            # Backward compatibility
+            "rusd_balance": cusd_balance,
+            "ledger_index": info.result.get("ledger_index") or info.result.get("ledger_current_index")
+        }
+    
     async def get_account_balance(self, address: str) -> Dict[str, Any]:
         """Get XRP and CUSD balance for an account"""
         try:
-            # Get XRP balance
-            account_info = await self.client.request(AccountInfo(account=address))
-            xrp_balance = float(drops_to_xrp(account_info.result["account_data"]["Balance"]))
-            
-            # Get CUSD balance (trust lines)
-            cusd_balance = 0.0
-            try:
-                account_lines = await self.client.request(AccountLines(account=address))
-                for line in account_lines.result.get("lines", []):
-                    # Check both raw currency code and hex version
-                    if ((line["currency"] == settings.CUSD_CURRENCY or 
-                         line["currency"] == self.cusd_currency_code) and 
-                        line["account"] == self.cusd_issuer):
-                        cusd_balance = float(line["balance"])
-                        break
-            except:
-                pass
-            
-            return {
-                "address": address,
-                "xrp_balance": xrp_balance,
-                "cusd_balance": cusd_balance,
-                # Backward compatibility
-                "rusd_balance": cusd_balance
-            }
+            return await self._read_balance(address)
         except Exception as e:
             return {"error": str(e)}
     
+    async def get_balances(self, addresses: List[str]) -> List[Dict[str, Any]]:
+        """
+        Balances of many accounts from the last validated ledger, at most
+        BALANCE_CONCURRENCY accounts in flight. Responses are kept for a
+        ledger close (dropped earlier when one of our txs validates), so
+        overlapping batches are served from the cache. A failed account
+        gets an "error" entry instead of failing the batch.
+        """
+        limit = asyncio.Semaphore(settings.BALANCE_CONCURRENCY)
+        
+        async def one(address: str) -> Dict[str, Any]:
+            async with limit:
+                try:
+                    return await self._read_balance(address, "validated", settings.LEDGER_CLOSE_SECONDS)
+                except Exception as e:
+                    return {"address": address, "error": str(e)}
+        
+        unique = list(dict.fromkeys(addresses))
+        results = dict(zip(unique, await asyncio.gather(*(one(a) for a in unique))))
+        return [results[a] for a in addresses]
+    
     # ========================================
     # CUSD TOKEN OPERATIONS
     # ========================================
@@ -132,11 +243,11 @@ class XRPLService:
             })] if memo else []
         )
         
-        response = await sign_and_submit(payment, wallet=from_wallet, client=self.client)
+        response = await submit_tx(payment, self.client, from_wallet)
         
         return {
             "success": response.is_successful(),
-            "tx_hash": response.result.get("tx_json", {}).get("hash"),
+            "tx_hash": response.result.get("hash"),
             "amount": amount,
             "currency": "CUSD"
         }
@@ -149,18 +260,14 @@ class XRPLService:
     # AMM OPERATIONS - APY GENERATION
     # ========================================
     
+    async def get_amm_state(self) -> Dict[str, Any]:
+        """Raw `amm` object from AMMInfo (cached per validated ledger)"""
+        return await self.amm_cache.get()
+    
     async def get_amm_info(self) -> Dict[str, Any]:
         """Get current AMM pool info (XRP/CUSD)"""
         try:
-            amm_info = await self.client.request(AMMInfo(
-                asset=XRP(),
-                asset2=IssuedCurrency(
-                    currency=self.cusd_currency_code,
-                    issuer=self.cusd_issuer
-                )
-            ))
-            
-            amm = amm_info.result.get("amm", {})
+            amm = await self.get_amm_state()
             
             return {
                 "success": True,
@@ -201,6 +308,12 @@ class XRPLService:
         if not self.cyclr_wallet:
             return {"success": False, "error": "CYCLR wallet not configured"}
         
+        if self.amm_batcher:
+            return await self.amm_batcher.deposit(amount, product_id, deposit_type)
+        return await self._submit_deposit(amount, product_id, deposit_type)
+    
+    async def _submit_deposit(self, amount: float, product_id: str, deposit_type: str) -> Dict[str, Any]:
+        """One single-sided CUSD AMMDeposit"""
         try:
             # Single-sided deposit of CUSD
             deposit = AMMDeposit(
@@ -210,25 +323,28 @@ class XRPLService:
                     currency=self.cusd_currency_code,
                     issuer=self.cusd_issuer
                 ),
-                amount2=IssuedCurrencyAmount(
+                amount=IssuedCurrencyAmount(
                     currency=self.cusd_currency_code,
                     issuer=self.cusd_issuer,
-                    value=str(amount)
+                    value=iou_value(amount)
                 ),
                 flags=0x00080000  # tfSingleAsset flag
             )
             
-            response = await sign_and_submit(deposit, wallet=self.cyclr_wallet, client=self.client)
+            response = await submit_tx(deposit, self.client, self.cyclr_wallet)
             
             if response.is_successful():
                 # Extract LP tokens received
                 lp_tokens = self._extract_lp_tokens(response.result)
                 
-                print(f"✅ AMM Deposit ({deposit_type}): {amount} CUSD → {lp_tokens} LP tokens")
+                logger.debug("AMM deposit", extra={
+                    "product_id": product_id, "deposit_type": deposit_type, "cusd": amount,
+                    "lp_tokens": lp_tokens, "tx_hash": response.result.get("hash")
+                })
                 
                 return {
                     "success": True,
-                    "tx_hash": response.result.get("tx_json", {}).get("hash"),
+                    "tx_hash": response.result.get("hash"),
                     "cusd_deposited": amount,
                     # Backward compatibility
                     "rusd_deposited": amount,
@@ -259,6 +375,12 @@ class XRPLService:
         if not self.cyclr_wallet:
             return {"success": False, "error": "CYCLR wallet not configured"}
         
+        if self.amm_batcher:
+            return await self.amm_batcher.withdraw(lp_tokens, product_id)
+        return await self._submit_withdraw(lp_tokens, product_id)
+    
+    async def _submit_withdraw(self, lp_tokens: float, product_id: str) -> Dict[str, Any]:
+        """One single-sided AMMWithdraw (LP tokens in, CUSD out)"""
         try:
             # Get AMM info for LP token details
             amm_info = await self.get_amm_info()
@@ -278,21 +400,30 @@ class XRPLService:
                 lp_token_in=IssuedCurrencyAmount(
                     currency=lp_token.get("currency", ""),
                     issuer=lp_token.get("issuer", ""),
-                    value=str(lp_tokens)
+                    value=iou_value(lp_tokens)
                 ),
-                flags=0x00080000  # tfSingleAsset - withdraw as CUSD only
+                # Asset to receive; a zero value means "whatever the LP is worth"
+                amount=IssuedCurrencyAmount(
+                    currency=self.cusd_currency_code,
+                    issuer=self.cusd_issuer,
+                    value="0"
+                ),
+                flags=0x00200000  # tfOneAssetLPToken - burn LPTokenIn, withdraw as CUSD only
             )
             
-            response = await sign_and_submit(withdraw, wallet=self.cyclr_wallet, client=self.client)
+            response = await submit_tx(withdraw, self.client, self.cyclr_wallet)
             
             if response.is_successful():
                 cusd_received = self._extract_cusd_received(response.result)
                 
-                print(f"✅ AMM Withdrawal: {lp_tokens} LP → {cusd_received} CUSD")
+                logger.debug("AMM withdrawal", extra={
+                    "product_id": product_id, "lp_tokens": lp_tokens, "cusd": cusd_received,
+                    "tx_hash": response.result.get("hash")
+                })
                 
                 return {
                     "success": True,
-                    "tx_hash": response.result.get("tx_json", {}).get("hash"),
+                    "tx_hash": response.result.get("hash"),
                     "lp_tokens_burned": lp_tokens,
                     "cusd_received": cusd_received,
                     # Backward compatibility
@@ -310,40 +441,13 @@ class XRPLService:
     
     def _extract_lp_tokens(self, result: Dict) -> float:
         """Extract LP tokens received from AMM deposit result"""
-        try:
-            meta = result.get("meta", {})
-            for node in meta.get("AffectedNodes", []):
-                modified = node.get("ModifiedNode", {})
-                if modified.get("LedgerEntryType") == "RippleState":
-                    final = modified.get("FinalFields", {})
-                    if "LPTokenBalance" in str(final):
-                        # Parse LP token amount
-                        balance = final.get("Balance", {})
-                        if isinstance(balance, dict):
-                            return abs(float(balance.get("value", 0)))
-            return 0.0
-        except:
-            return 0.0
+        return lp_tokens_received(result.get("meta", {}), self.cyclr_wallet.classic_address)
     
     def _extract_cusd_received(self, result: Dict) -> float:
-        """Extract CUSD received from AMM withdraw result"""
-        try:
-            meta = result.get("meta", {})
-            for node in meta.get("AffectedNodes", []):
-                modified = node.get("ModifiedNode", {})
-                if modified.get("LedgerEntryType") == "RippleState":
-                    fields = modified.get("FinalFields", {})
-                    prev_fields = modified.get("PreviousFields", {})
-                    
-                    # Check if this is CUSD (check both raw and hex)
-                    currency = fields.get("HighLimit", {}).get("currency", "")
-                    if currency == settings.CUSD_CURRENCY or currency == self.cusd_currency_code:
-                        final_bal = float(fields.get("Balance", {}).get("value", 0))
-                        prev_bal = float(prev_fields.get("Balance", {}).get("value", 0))
-                        return abs(final_bal - prev_bal)
-            return 0.0
-        except:
-            return 0.0
+        """Extract CUSD received from AMM withdraw result (metadata RippleState delta)"""
+        return token_received(
+            result, self.cyclr_wallet.classic_address, self.cusd_currency_code, self.cusd_issuer
+        )
     
     # Backward compatibility alias
     def _extract_rusd_received(self, result: Dict) -> float:
@@ -368,6 +472,9 @@ class XRPLService:
         - 20% to manufacturer
         - 20% to recycler
         - 20% to ecological fund
+        
+        With CONCURRENT_REWARD_DISTRIBUTION the payouts are submitted together
+        and awaited concurrently (~one ledger close per product).
         """
         if not self.cyclr_wallet:
             return {"success": False, "error": "CYCLR wallet not configured"}
@@ -392,11 +499,7 @@ class XRPLService:
             ("eco_fund", eco_fund_wallet, eco_amount),
         ]
         
-        for name, wallet, amount in payments:
-            if not wallet or not wallet.startswith("r") or amount <= 0:
-                results["payments"][name] = {"skipped": True, "reason": "Invalid wallet or zero amount"}
-                continue
-            
+        async def pay(name: str, wallet: str, amount: float) -> Dict[str, Any]:
             try:
                 payment_result = await self.send_rusd(
                     from_wallet=self.cyclr_wallet,
@@ -404,15 +507,34 @@ class XRPLService:
                     amount=amount,
                     memo=f"CYCLR-{name}-reward-{product_id[:8]}"
                 )
-                results["payments"][name] = {
+                return {
                     "amount": amount,
                     "tx_hash": payment_result.get("tx_hash"),
                     "success": payment_result.get("success", False)
                 }
             except Exception as e:
-                results["payments"][name] = {"error": str(e)}
-            
-            await asyncio.sleep(1)  # Rate limiting
+                return {"error": str(e)}
+        
+        to_send = []
+        for name, wallet, amount in payments:
+            if not wallet or not wallet.startswith("r") or amount <= 0:
+                results["payments"][name] = {"skipped": True, "reason": "Invalid wallet or zero amount"}
+            else:
+                to_send.append((name, wallet, amount))
+        
+        if settings.CONCURRENT_REWARD_DISTRIBUTION:
+            # Sequences are allocated in list order, so the payouts are signed with
+            # consecutive numbers and all land in (about) the same ledger
+            outcomes = await asyncio.gather(*(pay(*p) for p in to_send))
+            for (name, _, _), outcome in zip(to_send, outcomes):
+                results["payments"][name] = outcome
+        else:
+            for name, wallet, amount in to_send:
+                results["payments"][name] = await pay(name, wallet, amount)
+                await asyncio.sleep(1)  # Rate limiting
+        
+        # Keep the user/manufacturer/recycler/eco_fund ordering of the response
+        results["payments"] = {name: results["payments"][name] for name, _, _ in payments}
         
         results["success"] = all(
             p.get("success", False) or p.get("skipped", False) 
@@ -463,14 +585,14 @@ class XRPLService:
             ]
         )
         
-        response = await sign_and_submit(mint, wallet=self.cyclr_wallet, client=self.client)
+        response = await submit_tx(mint, self.client, self.cyclr_wallet)
         
         if response.is_successful():
             nft_id = self._extract_nft_id(response.result)
             return {
                 "success": True,
                 "nft_id": nft_id,
-                "tx_hash": response.result.get("tx_json", {}).get("hash")
+                "tx_hash": response.result.get("hash")
             }
         else:
             return {
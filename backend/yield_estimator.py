@@ -0,0 +1,128 @@
+# yield_estimator.py
+"""
+Live yield estimates - what each active product's LP tokens are worth now
+
+ProductResponse declared estimated_current_value and estimated_apy but
+always sent 0. Valuing one product needs the pool state, and doing that
+per product (an AMMInfo each, or a Python loop over the catalog) does
+not scale to a listing. Instead:
+
+- one pool snapshot per validated ledger (PoolStateCache), taken by
+  refresh() before products are served
+- one NumPy pass over the catalog columns values every REGISTERED / SOLD
+  product against that snapshot; it is redone when the snapshot or the
+  catalog changes, not per product
+- estimate() is then a lookup by catalog row
+
+Current value is what a single-sided withdrawal of the product's LP
+tokens would return in CUSD (the withdrawal recycle / expiry makes).
+The APY annualizes (value - total_in_amm) over the capital's time in
+the pool: the manufacturer deposit since created_at, the customer
+escrow since sold_at.
+
+NumPy is imported on the first computation, not with the module, so it
+stays off the startup import path.
+"""
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from catalog import ProductCatalog, STATUSES
+from models import ProductStatus
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+ACTIVE = (ProductStatus.REGISTERED, ProductStatus.SOLD)
+
+YEAR_SECONDS = 365 * 24 * 3600
+# Younger capital is annualized as if it were this old, so the fees of a
+# fresh deposit don't turn into a -1000% APY
+MIN_AGE_SECONDS = 24 * 3600
+
+NO_ESTIMATE = (0.0, 0.0)
+
+
+def withdrawal_value(lp_tokens: "np.ndarray", pool_cusd: float, lp_supply: float, fee: float) -> "np.ndarray":
+    """CUSD out of a single-sided AMMWithdraw of `lp_tokens` (XLS-30, fee as a fraction)"""
+    import numpy as np
+
+    share = np.clip(lp_tokens / lp_supply, 0.0, 1.0)
+    return pool_cusd * (1.0 - (1.0 - share) ** 2) * (1.0 - fee / 2)
+
+
+class YieldEstimator:
+    """Per-product (current value, APY) for the catalog, against one pool snapshot"""
+
+    def __init__(self, catalog: ProductCatalog, pool_state_fn: Callable[[], Awaitable[Dict[str, Any]]]):
+        self.catalog = catalog
+        self.pool_state_fn = pool_state_fn
+
+        self._pool: Optional[Dict[str, Any]] = None     # AMMInfo `amm` object
+        self._snapshot = 0                              # bumped when the pool state changes
+        self._key: Optional[Tuple[int, int]] = None     # (snapshot, catalog version) computed
+        self._value: Sequence[float] = ()
+        self._apy: Sequence[float] = ()
+
+    async def refresh(self):
+        """Take the current pool snapshot (cached per ledger); keeps the last one on failure"""
+        try:
+            amm = await self.pool_state_fn()
+        except Exception as e:
+            logger.warning("Yield estimate: pool state unavailable", extra={"error": str(e)})
+            return
+        if amm is not self._pool:
+            self._pool = amm
+            self._snapshot += 1
+
+    def estimate(self, product_id: str) -> Tuple[float, float]:
+        """(estimated_current_value, estimated_apy in %) of a product"""
+        row = self.catalog.row(product_id)
+        if row is None or self._pool is None:
+            return NO_ESTIMATE
+        if self._key != (self._snapshot, self.catalog.version):
+            self._compute()
+        if row >= len(self._value):
+            return NO_ESTIMATE
+        return float(self._value[row]), float(self._apy[row])
+
+    def _compute(self):
+        import numpy as np
+
+        started = time.perf_counter()
+        amm = self._pool
+        pool_cusd = float(amm.get("amount2", {}).get("value", 0))
+        lp_supply = float(amm.get("lp_token", {}).get("value", 0))
+        fee = amm.get("trading_fee", 0) / 100_000
+
+        column = lambda field: np.array(self.catalog.column(field))
+        status = column("status")
+        lp_tokens = column("total_lp_tokens")
+        active = np.isin(status, [STATUSES.index(s) for s in ACTIVE]) & (lp_tokens > 0)
+
+        value = np.zeros(len(status))
+        apy = np.zeros(len(status))
+        if lp_supply > 0 and active.any():
+            value[active] = withdrawal_value(lp_tokens[active], pool_cusd, lp_supply, fee)
+
+            now = time.time()
+            sold_at = column("sold_at")
+            manufacturer_age = np.maximum(now - column("created_at"), MIN_AGE_SECONDS)
+            customer_age = np.where(sold_at > 0, np.maximum(now - sold_at, MIN_AGE_SECONDS), 0.0)
+            capital_years = (
+                column("manufacturer_deposit") * manufacturer_age + column("customer_escrow") * customer_age
+            ) / YEAR_SECONDS
+
+            earning = active & (capital_years > 0)
+            accrued = value - column("total_in_amm")
+            apy[earning] = accrued[earning] / capital_years[earning] * 100
+
+        self._value = np.round(value, 6)
+        self._apy = np.round(apy, 2)
+        self._key = (self._snapshot, self.catalog.version)
+        logger.debug("Yield estimates computed", extra={
+            "products": int(active.sum()), "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+        })